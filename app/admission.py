@@ -0,0 +1,193 @@
+import os
+import math
+import time
+import logging
+import asyncio
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from .metrics import observe
+
+load_dotenv()
+
+# 대기열에서 동시 실행 슬롯을 기다리는 최대 시간(초). 넘으면 503
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "60"))
+# 초당 요청 수 제한으로 기다려야 하는 최대 시간(초). 넘으면 429
+ADMISSION_MAX_RATE_WAIT = float(os.getenv("ADMISSION_MAX_RATE_WAIT", "10"))
+# 서버 워커 프로세스 수. 업스트림 한도는 서버 전체 기준이므로 워커별로 나눠 적용
+# run.py는 정한 워커 수를 워커가 물려받는 환경 변수로 내보낸다. uvicorn을 직접 실행할 때는 --workers 대신
+# WEB_CONCURRENCY로 워커 수를 지정해야 두 값이 일치한다 (uvicorn --workers의 기본값이 WEB_CONCURRENCY)
+ADMISSION_WORKERS = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+
+
+class Overloaded(Exception):
+    """업스트림 한도 초과로 요청을 받을 수 없는 경우 (status_code: 429 또는 503)"""
+
+    def __init__(self, upstream: str, status_code: int, retry_after: float, reason: str):
+        super().__init__(f"{upstream} 요청이 너무 많습니다 ({reason})")
+        self.upstream = upstream
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class UpstreamLimiter:
+    """업스트림 하나에 대한 동시 실행 수 + 토큰 버킷(초당 요청 수) + 대기열 길이 제한
+
+    rate가 0이면 초당 요청 수는 제한하지 않는다.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, rate: float, burst: int, max_queue: int,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT, max_rate_wait: float = ADMISSION_MAX_RATE_WAIT):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_rate_wait = max_rate_wait
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._active = 0
+        self._waiting = 0
+        self._avg_hold = 1.0  # 슬롯 점유 시간 이동 평균 (Retry-After 추정용)
+        # 누적 통계
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.rejected_rate = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _rate_wait(self) -> float:
+        # 토큰 하나를 얻기까지 기다려야 하는 시간 (예약된 토큰 포함)
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    def _queue_retry_after(self) -> float:
+        return self._avg_hold * (self._waiting + 1) / self.max_concurrency
+
+    def check(self):
+        """작업을 시작하기 전에 지금 받을 수 있는지 확인 (못 받으면 Overloaded)
+
+        이미지 전처리/업로드처럼 업스트림 호출 전에 드는 비용을 쓰기 전에 빠르게 거절하기 위함.
+        """
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise Overloaded(self.name, 503, self._queue_retry_after(), "대기열 가득 참")
+        rate_wait = self._rate_wait()
+        if rate_wait > self.max_rate_wait:
+            self.rejected_rate += 1
+            raise Overloaded(self.name, 429, rate_wait, "초당 요청 수 초과")
+
+    @asynccontextmanager
+    async def slot(self):
+        """동시 실행 슬롯과 토큰을 얻을 때까지 대기 후 실행"""
+        self.check()
+
+        queued_at = time.perf_counter()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            raise Overloaded(self.name, 503, self._queue_retry_after(), "대기 시간 초과")
+        finally:
+            self._waiting -= 1
+
+        try:
+            if self.rate > 0:
+                # 토큰을 먼저 예약하고(음수 허용) 부족한 만큼만 대기
+                rate_wait = self._rate_wait()
+                if rate_wait > self.max_rate_wait:
+                    self.rejected_rate += 1
+                    raise Overloaded(self.name, 429, rate_wait, "초당 요청 수 초과")
+                self._tokens -= 1
+                if rate_wait > 0:
+                    await asyncio.sleep(rate_wait)
+            observe(f"admission_wait_{self.name}", time.perf_counter() - queued_at)
+
+            self.admitted += 1
+            self._active += 1
+            started = time.monotonic()
+            try:
+                yield
+            finally:
+                self._active -= 1
+                self._avg_hold = self._avg_hold * 0.8 + (time.monotonic() - started) * 0.2
+        finally:
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "active": self._active,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "workers": ADMISSION_WORKERS,
+            "rate": self.rate,
+            "tokens": round(self._tokens, 2),
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "rejected_rate": self.rejected_rate
+        }
+
+
+def split_limits(max_concurrency: int, rate: float, burst: int, max_queue: int, workers: int) -> dict:
+    """서버 전체 한도를 워커 하나의 한도로 나눔
+
+    워커마다 최소 1개의 동시 실행 슬롯이 필요하므로 워커 수가 동시 실행 한도보다 많으면
+    서버 전체로는 워커 수만큼 동시에 호출될 수 있다 (한도가 워커당 1로 바뀜).
+    """
+    return {
+        "max_concurrency": max(1, math.ceil(max_concurrency / workers)),
+        "rate": rate / workers,
+        "burst": math.ceil(burst / workers),
+        "max_queue": math.ceil(max_queue / workers)
+    }
+
+
+def _limiter_from_env(name: str, prefix: str, max_concurrency: int, rate: float, max_queue: int) -> UpstreamLimiter:
+    rate = float(os.getenv(f"{prefix}_RPS", str(rate)))
+    burst = int(os.getenv(f"{prefix}_BURST", str(max(1, math.ceil(rate)))))
+    max_concurrency = int(os.getenv(f"{prefix}_MAX_CONCURRENCY", str(max_concurrency)))
+    max_queue = int(os.getenv(f"{prefix}_MAX_QUEUE", str(max_queue)))
+    limits = split_limits(max_concurrency, rate, burst, max_queue, ADMISSION_WORKERS)
+    if limits["max_concurrency"] * ADMISSION_WORKERS > max_concurrency:
+        logging.warning(
+            "%s 동시 실행 한도(%d)가 워커 수(%d)로 나누어 떨어지지 않아 서버 전체로는 최대 %d개가 동시에 실행될 수 있습니다 "
+            "(%s_MAX_CONCURRENCY를 워커 수의 배수로 설정하거나 워커 수를 줄이세요)",
+            name, max_concurrency, ADMISSION_WORKERS, limits["max_concurrency"] * ADMISSION_WORKERS, prefix
+        )
+    return UpstreamLimiter(name, **limits)
+
+
+# 업스트림별 한도 (환경 변수 {PREFIX}_MAX_CONCURRENCY / _RPS / _BURST / _MAX_QUEUE 로 변경, 서버 전체 기준)
+# ModelsLab은 접수 POST 동안만 슬롯을 점유하므로 동시 접수 요청 수/초당 접수 수 제한이다
+# (접수 후 결과를 기다리는 작업 수는 제한하지 않음: poll 스케줄러가 한 루프에서 함께 확인)
+upstream_limiters = {
+    "openai_chat": _limiter_from_env("openai_chat", "OPENAI_CHAT", 16, 5, 64),
+    "openai_image": _limiter_from_env("openai_image", "OPENAI_IMAGE", 4, 1, 32),
+    "modelslab_video": _limiter_from_env("modelslab_video", "MODELSLAB_VIDEO", 4, 2, 32),
+    "modelslab_controlnet": _limiter_from_env("modelslab_controlnet", "MODELSLAB_CONTROLNET", 4, 2, 32),
+}
+
+
+def admission_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in upstream_limiters.items()}
+
+
+def log_rejection(e: Overloaded):
+    logging.warning(f"요청 거절: {e} - status={e.status_code}, retry_after={e.retry_after_header}s")
@@ -5,109 +5,376 @@ import re
 import uuid
 import aiohttp
 import asyncio
+import time
 from datetime import datetime
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from .s3_util import upload_video_to_s3, download_and_upload_image_to_s3, upload_image_to_s3
+from .http_client import get_http_session
+from . import modelslab
+from .poll_scheduler import poll_scheduler
+from .admission import upstream_limiters, Overloaded
+from .resilience import UpstreamError, call_with_retry, is_retryable
+from .metrics import observe, track_stage
+from .result_cache import result_cache, make_cache_key
+from .blob_store import save_response, download_to_store
 
 # 환경 변수 로드
 load_dotenv()
 
-# OpenAI 비동기 클라이언트
+# OpenAI 비동기 클라이언트 (openai 패키지 import가 무거우므로 처음 사용할 때 생성)
 openai_api_key = os.getenv("CHAT_GPT_API_KEY")
 if not openai_api_key:
     logging.warning("CHAT_GPT_API_KEY 환경 변수가 설정되지 않았습니다. 일부 기능이 제한될 수 있습니다.")
-    openai_client = None
-else:
-    openai_client = AsyncOpenAI(api_key=openai_api_key)
+# OPENAI_BASE_URL: 호환 서버 주소 (로컬 벤치마크용 bench.fake_openai 등)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+_openai_client = None
+_openai_http = None  # 클라이언트가 쓰는 httpx 커넥션 풀 (warm-up에서 미리 연결)
+
+
+def get_openai_client():
+    """AsyncOpenAI 클라이언트 (API 키가 없으면 None)"""
+    global _openai_client, _openai_http
+    if _openai_client is None and openai_api_key:
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        _openai_http = DefaultAsyncHttpxClient()
+        # 재시도는 resilience.call_with_retry에서 일괄 처리
+        _openai_client = AsyncOpenAI(
+            api_key=openai_api_key, base_url=OPENAI_BASE_URL, max_retries=0, http_client=_openai_http
+        )
+    return _openai_client
+
+
+async def close_openai_client():
+    """앱 종료 시 OpenAI 클라이언트 커넥션 정리"""
+    global _openai_client, _openai_http
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = _openai_http = None
+
+
+async def warm_up_openai():
+    """openai import/클라이언트 생성을 스레드에서 미리 하고 API 서버 커넥션을 열어 둠"""
+    client = await asyncio.to_thread(get_openai_client)
+    if client is None:
+        return
+    # 응답 코드와 관계없이 DNS 조회/TLS 연결이 커넥션 풀에 남음
+    await _openai_http.head(str(client.base_url))
 
 modelslab_api_key = os.getenv("MODELSLAB_API_KEY")
 if not modelslab_api_key:
     logging.warning("MODELSLAB_API_KEY 환경 변수가 설정되지 않았습니다. 일부 기능이 제한될 수 있습니다.")
     modelslab_api_key = None
 
+# OpenAI 호출당 재시도 포함 최대 시간(초)
+OPENAI_CALL_DEADLINE = float(os.getenv("OPENAI_CALL_DEADLINE", "90"))
+
 
 class DiaryAIService:
     """일기 생성 AI 서비스"""
     
     @staticmethod
     async def generate_diary(text: str):
-        """텍스트를 바탕으로 일기와 이미지를 생성"""
-        if not openai_client:
+        """텍스트를 바탕으로 일기와 이미지를 생성
+
+        일기 본문(gpt-4o)과 그림(dall-e-3)은 서로 의존하지 않으므로 동시에 생성한다.
+        본문이 실패하면 그림 생성을 취소하고, 그림만 실패하면 본문은 그대로 반환한다.
+        단계별 소요 시간(ms)은 "timings"에 담아 반환.
+        """
+        if not openai_api_key:
             return {
                 "title": "API 키 미설정",
                 "content": "OpenAI API 키가 설정되지 않았습니다.",
                 "image_url": ""
             }
         
+        timings = {}
+        started = time.perf_counter()
+
+        async def timed(name: str, coro):
+            branch_started = time.perf_counter()
+            try:
+                return await coro
+            finally:
+                timings[name] = round((time.perf_counter() - branch_started) * 1000, 1)
+
+        text_task = asyncio.create_task(timed("diary_text", DiaryAIService._generate_diary_text(text)))
+        image_task = asyncio.create_task(timed("diary_image", DiaryAIService._generate_diary_image(text)))
+
         try:
-            # OpenAI Chat API로 일기 생성
-            response = await openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{
-                    "role": "user",
-                    "content": f"""
-                    {text}
-                    내용을 바탕으로 초등학생 그림일기를 작성해줘. ~했다. 식으로 적어줘
-
-                    예시처럼 **JSON만** 응답해줘. (맨 앞에 json, 설명, 코드블록, 마크다운, 줄바꿈 등 아무것도 붙이지 마!)
-                    {{
-                        "title": "제목 (15자 이내)",
-                        "content": "일기 내용 (최소 100자 이상, 최대 150자 이내)"
-                    }}
-                    """
-                }],
-                temperature=0.7,
-                max_tokens=300
-            )
-            diary_text = response.choices[0].message.content
             try:
-                # json 형식으로 파싱 후 저장
-                cleaned = re.sub(r"^```json|```$", "", diary_text).strip()
-                diary_dict = json.loads(cleaned)
-            except Exception as parse_error:
-                raise ValueError(f"OpenAI JSON 파싱 실패: {parse_error}")
-
-            # DALL·E-3 이미지 생성
-            image_response = await openai_client.images.generate(
-                model="dall-e-3",
-                prompt=f"""
-                {text}의 내용과 같은 한 귀여운 따뜻한 그림일기 일러스트.
-                초등학생이 쓴 일기에서 나온 장면처럼, 단순하고 밝은 만화 스타일. 
-                가족들과의 일상 경험을 표현,
-                내용에 들어가지 않는 가상의 인물들은 추가하지 마세요,
-                최대한 그림에 언어를 넣지 마세요.
-                종교 관련 이미지도 제외해주세요.
-                """,
-                size="1024x1024",
-                n=1
-            )
-            openai_image_url = image_response.data[0].url
-            
-            # OpenAI에서 받은 이미지를 S3에 임시 저장
-            s3_image_url = await download_and_upload_image_to_s3(openai_image_url, is_temp=True)
+                diary_dict = await text_task
+            except Overloaded:
+                # 한도 초과는 API에서 429/503으로 응답
+                raise
+            except Exception as e:
+                logging.error(f"일기 생성 실패: {str(e)}")
+                return {
+                    "title": "처리 실패",
+                    "content": "처리 실패",
+                    "image_url": ""
+                }
 
+            try:
+                s3_image_url = await image_task
+            except Exception as e:
+                # 그림이 실패해도 일기 본문은 반환
+                logging.error(f"일기 그림 생성 실패: {str(e)}")
+                s3_image_url = ""
+
+            timings["diary_total"] = round((time.perf_counter() - started) * 1000, 1)
+            logging.info(f"일기 생성 소요 시간(ms): {timings}")
             return {
                 "title": diary_dict.get("title", ""),
                 "content": diary_dict.get("content", ""),
-                "image_url": s3_image_url
+                "image_url": s3_image_url,
+                "timings": timings
             }
+        finally:
+            # 본문 실패나 요청 취소 시 남은 작업 정리
+            for task in (text_task, image_task):
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(text_task, image_task, return_exceptions=True)
 
-        except Exception as e:
-            logging.error(f"일기 생성 실패: {str(e)}")
-            return {
-                "title": "처리 실패",
-                "content": "처리 실패",
-                "image_url": ""
+    @staticmethod
+    async def stream_diary(text: str):
+        """일기 본문을 토큰 단위로 스트리밍하고 마지막에 그림 URL을 전달
+
+        (event, data) 튜플을 순서대로 yield 한다.
+        title/content: 토큰 조각, text: 최종 제목/본문, image: 그림 URL, done: 소요 시간, error: 실패
+        """
+        if not openai_api_key:
+            yield "error", {"message": "OpenAI API 키가 설정되지 않았습니다."}
+            return
+
+        timings = {}
+        started = time.perf_counter()
+        image_task = asyncio.create_task(DiaryAIService._generate_diary_image(text))
+
+        # 업스트림 스트림은 별도 태스크가 큐로 받아 두므로, 느린 클라이언트를 기다리는 동안 슬롯을 잡고 있지 않음
+        deltas = asyncio.Queue()
+
+        async def read_stream():
+            async with upstream_limiters["openai_chat"].slot():
+                # 스트림 연결까지만 재시도 (토큰을 보낸 뒤에는 다시 시작하지 않음)
+                stream = await call_with_retry(
+                    lambda: get_openai_client().chat.completions.create(
+                        model="gpt-4o",
+                        messages=DiaryAIService._diary_text_messages(text),
+                        temperature=0.7,
+                        max_tokens=300,
+                        stream=True
+                    ),
+                    upstream="openai_chat", label="일기 스트리밍 연결", deadline=OPENAI_CALL_DEADLINE
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        deltas.put_nowait(chunk.choices[0].delta.content)
+
+        text_task = asyncio.create_task(read_stream())
+        text_task.add_done_callback(lambda _: deltas.put_nowait(None))
+
+        try:
+            try:
+                parser = _DiaryStreamParser()
+                chunks = []
+                while (delta := await deltas.get()) is not None:
+                    if not chunks:
+                        timings["diary_first_token"] = round((time.perf_counter() - started) * 1000, 1)
+                    chunks.append(delta)
+                    for field, piece in parser.feed(delta):
+                        yield field, {"delta": piece}
+                await text_task
+                diary_dict = DiaryAIService._parse_diary_json("".join(chunks))
+                timings["diary_text"] = round((time.perf_counter() - started) * 1000, 1)
+            except Overloaded as e:
+                logging.warning(f"일기 스트리밍 생성 거절: {e}")
+                yield "error", {"message": str(e), "retry_after": e.retry_after_header}
+                return
+            except Exception as e:
+                logging.error(f"일기 스트리밍 생성 실패: {str(e)}")
+                yield "error", {"message": "처리 실패"}
+                return
+
+            yield "text", {
+                "title": diary_dict.get("title", ""),
+                "content": diary_dict.get("content", "")
             }
 
+            try:
+                s3_image_url = await image_task
+            except Exception as e:
+                # 그림이 실패해도 일기 본문은 이미 전달됨
+                logging.error(f"일기 그림 생성 실패: {str(e)}")
+                s3_image_url = ""
+            timings["diary_image"] = round((time.perf_counter() - started) * 1000, 1)
+
+            yield "image", {"image_url": s3_image_url}
+            timings["diary_total"] = round((time.perf_counter() - started) * 1000, 1)
+            yield "done", {"timings": timings}
+        finally:
+            # 본문 실패나 클라이언트 연결 종료 시 본문/그림 생성 취소
+            for task in (text_task, image_task):
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(text_task, image_task, return_exceptions=True)
+
+    @staticmethod
+    def _diary_text_messages(text: str) -> list:
+        return [{
+            "role": "user",
+            "content": f"""
+            {text}
+            내용을 바탕으로 초등학생 그림일기를 작성해줘. ~했다. 식으로 적어줘
+
+            예시처럼 **JSON만** 응답해줘. (맨 앞에 json, 설명, 코드블록, 마크다운, 줄바꿈 등 아무것도 붙이지 마!)
+            {{
+                "title": "제목 (15자 이내)",
+                "content": "일기 내용 (최소 100자 이상, 최대 150자 이내)"
+            }}
+            """
+        }]
+
+    @staticmethod
+    def _diary_image_prompt(text: str) -> str:
+        return f"""
+            {text}의 내용과 같은 한 귀여운 따뜻한 그림일기 일러스트.
+            초등학생이 쓴 일기에서 나온 장면처럼, 단순하고 밝은 만화 스타일. 
+            가족들과의 일상 경험을 표현,
+            내용에 들어가지 않는 가상의 인물들은 추가하지 마세요,
+            최대한 그림에 언어를 넣지 마세요.
+            종교 관련 이미지도 제외해주세요.
+            """
+
+    @staticmethod
+    def _parse_diary_json(diary_text: str) -> dict:
+        try:
+            # json 형식으로 파싱 후 저장
+            cleaned = re.sub(r"^```json|```$", "", diary_text).strip()
+            return json.loads(cleaned)
+        except Exception as parse_error:
+            raise ValueError(f"OpenAI JSON 파싱 실패: {parse_error}")
+
+    @staticmethod
+    async def _generate_diary_text(text: str) -> dict:
+        """OpenAI Chat API로 일기 제목/본문 생성"""
+        async def create():
+            async with upstream_limiters["openai_chat"].slot():
+                with track_stage("openai_chat"):
+                    return await get_openai_client().chat.completions.create(
+                        model="gpt-4o",
+                        messages=DiaryAIService._diary_text_messages(text),
+                        temperature=0.7,
+                        max_tokens=300
+                    )
+
+        response = await call_with_retry(create, upstream="openai_chat", label="일기 본문 생성", deadline=OPENAI_CALL_DEADLINE)
+        return DiaryAIService._parse_diary_json(response.choices[0].message.content)
+
+    @staticmethod
+    async def _generate_diary_image(text: str) -> str:
+        """DALL·E-3로 그림을 생성하여 S3에 임시 저장"""
+        async def generate():
+            async with upstream_limiters["openai_image"].slot():
+                with track_stage("openai_image"):
+                    return await get_openai_client().images.generate(
+                        model="dall-e-3",
+                        prompt=DiaryAIService._diary_image_prompt(text),
+                        size="1024x1024",
+                        n=1
+                    )
+
+        image_response = await call_with_retry(generate, upstream="openai_image", label="일기 그림 생성", deadline=OPENAI_CALL_DEADLINE)
+        openai_image_url = image_response.data[0].url
+        
+        # OpenAI에서 받은 이미지를 저장소에 임시 저장
+        with track_stage("diary_image_transfer"):
+            return await download_to_store(openai_image_url, "temp/diary")
+
+
+class _DiaryStreamParser:
+    """스트리밍 중인 {"title": "...", "content": "..."} JSON에서 문자열 값 조각을 추출"""
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+    _FIELDS = ("title", "content")
+
+    def __init__(self):
+        self._state = "key"  # key: 키 탐색, key_str: 키 문자열, value: 값 시작 대기, value_str: 값 문자열
+        self._key = []
+        self._field = None
+        self._escape = None  # 처리 중인 이스케이프 시퀀스
+
+    def feed(self, delta: str) -> list:
+        """새 토큰을 넣고 (필드명, 문자열 조각) 목록 반환"""
+        pieces = []
+        out = []
+        for ch in delta:
+            if self._state == "key":
+                if ch == '"':
+                    self._state = "key_str"
+                    self._key = []
+            elif self._state == "key_str":
+                if ch == '"':
+                    key = "".join(self._key)
+                    self._field = key if key in self._FIELDS else None
+                    self._state = "value"
+                else:
+                    self._key.append(ch)
+            elif self._state == "value":
+                if ch == '"':
+                    self._state = "value_str"
+                elif ch in ",}":
+                    self._state = "key"
+            elif self._state == "value_str":
+                if self._escape is not None:
+                    self._escape += ch
+                    if self._escape[0] == "u":
+                        if len(self._escape) < 5:
+                            continue
+                        try:
+                            out.append(chr(int(self._escape[1:], 16)))
+                        except ValueError:
+                            pass
+                    else:
+                        out.append(self._ESCAPES.get(ch, ch))
+                    self._escape = None
+                elif ch == "\\":
+                    self._escape = ""
+                elif ch == '"':
+                    if self._field and out:
+                        pieces.append((self._field, "".join(out)))
+                    out = []
+                    self._state = "key"
+                else:
+                    out.append(ch)
+        if self._state == "value_str" and self._field and out:
+            pieces.append((self._field, "".join(out)))
+        return pieces
+
 
 class VideoAIService:
     """영상화 AI 서비스"""
+
+    MODEL_ID = "seedance-i2v"
     
     @staticmethod
-    async def animate_image(image_url: str, prompt: str):
-        """사진을 영상화"""
+    async def cached_result(image_digest: str, prompt: str):
+        """같은 이미지(정규화된 이미지 해시)/프롬프트의 이전 결과 (없으면 None)"""
+        cached_url = await result_cache.get(make_cache_key(image_digest, prompt, VideoAIService.MODEL_ID))
+        if not cached_url:
+            return None
+        logging.info(f"영상화 캐시 적중: {cached_url}")
+        return {
+            "video_url": cached_url,
+            "status": "success",
+            "message": "영상화가 완료되었습니다."
+        }
+
+    @staticmethod
+    async def animate_image(image_url: str, prompt: str, on_progress=None, image_digest: str = None):
+        """사진을 영상화 (on_progress(stage, **info)로 진행 단계를 알림)
+
+        image_digest(정규화된 이미지 해시)가 주어지면 결과를 캐시에 저장한다 (조회는 임시 업로드 전에 cached_result로).
+        """
         # API 키 상태 확인
         if not modelslab_api_key:
             logging.error("MODELSLAB_API_KEY가 설정되지 않았습니다.")
@@ -117,156 +384,148 @@ class VideoAIService:
                 "message": "ModelsLab API 키가 설정되지 않았습니다."
             }
         
-        logging.info(f"ModelsLab API 키 상태: {'설정됨' if modelslab_api_key else '설정되지 않음'}")
-        logging.info(f"ModelsLab API 키 길이: {len(modelslab_api_key) if modelslab_api_key else 0}자")
-        
-        max_retries = 3
-        retry_delay = 2  # 초
-        
-        for attempt in range(max_retries):
-            try:
-                logging.info(f"영상화 시작 (시도 {attempt + 1}/{max_retries}): 이미지 URL: {image_url}, 프롬프트: {prompt[:100]}")
-                
-                # ModelsLab API로 영상화 요청 (URL만 받기)
-                video_url = await VideoAIService._call_modelslab_api(image_url, prompt)
-                
-                # ModelsLab에서 받은 비디오를 S3에 다운로드하여 저장
-                s3_video_url = await VideoAIService._download_and_upload_to_s3(video_url)
-                
-                logging.info(f"영상화 완료: S3 URL - {s3_video_url}")
-                
-                return {
-                    "video_url": s3_video_url,
-                    "status": "success", 
-                    "message": "영상화가 완료되었습니다."
-                }
-                
-            except Exception as e:
-                error_msg = str(e)
-                logging.error(f"영상화 실패 (시도 {attempt + 1}/{max_retries}): {error_msg}")
-                
-                # 마지막 시도가 아니고, 재시도 가능한 에러인 경우
-                if attempt < max_retries - 1 and "Failed to generate image" in error_msg:
-                    logging.info(f"{retry_delay}초 후 재시도합니다...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2  # 지수 백오프
-                    continue
-                else:
-                    return {
-                        "video_url": "",
-                        "status": "error",
-                        "message": f"영상화 처리 중 오류가 발생했습니다: {error_msg}"
-                    }
+        cache_key = make_cache_key(image_digest, prompt, VideoAIService.MODEL_ID) if image_digest else None
+
+        logging.info("영상화 시작: 이미지 URL: %s, 프롬프트: %.100s", image_url, prompt)
+
+        async def submit():
+            # 슬롯은 접수 POST 동안만 점유 (결과 대기는 poll 스케줄러가 모든 작업을 함께 처리)
+            async with upstream_limiters["modelslab_video"].slot():
+                return await VideoAIService._call_modelslab_api(image_url, prompt)
+
+        try:
+            # ModelsLab API로 영상화 요청 (접수 POST만 재시도: 접수된 작업을 다시 보내면 중복 과금)
+            result, track_id = await call_with_retry(
+                submit, upstream="modelslab_video", label="영상화 접수",
+                on_attempt=(lambda attempt: on_progress("submitting", attempt=attempt)) if on_progress else None
+            )
+            video_url = await VideoAIService._wait_modelslab_output(result, track_id, on_progress)
+
+            # ModelsLab에서 받은 비디오를 S3에 다운로드하여 저장 (다운로드만 다시 시도)
+            if on_progress:
+                on_progress("downloading")
+            with track_stage("video_transfer"):
+                s3_video_url = await call_with_retry(
+                    lambda: VideoAIService._download_and_upload_to_s3(video_url), label="비디오 다운로드"
+                )
+
+            logging.info(f"영상화 완료: S3 URL - {s3_video_url}")
+            if cache_key:
+                await result_cache.set(cache_key, s3_video_url)
+
+            return {
+                "video_url": s3_video_url,
+                "status": "success", 
+                "message": "영상화가 완료되었습니다."
+            }
+
+        except Overloaded:
+            # 한도 초과/서킷 차단은 API에서 429/503으로 응답
+            raise
+        except Exception as e:
+            error_msg = str(e)
+            logging.error(f"영상화 실패: {error_msg}")
+            return {
+                "video_url": "",
+                "status": "error",
+                "message": f"영상화 처리 중 오류가 발생했습니다: {error_msg}"
+            }
     
     @staticmethod
-    async def _call_modelslab_api(image_url: str, prompt: str) -> str:
-        """ModelsLab API를 호출하여 실제 영상화 수행"""
+    async def _call_modelslab_api(image_url: str, prompt: str) -> tuple:
+        """ModelsLab 영상화 요청 접수. (응답, 웹훅 track_id) 반환"""
         if not modelslab_api_key:
             raise ValueError("MODELSLAB_API_KEY 환경 변수가 설정되지 않았습니다.")
         
-        url = "https://modelslab.com/api/v7/video-fusion/image-to-video"
+        url = modelslab.api_url("/api/v7/video-fusion/image-to-video")
         
         headers = {
             "key": modelslab_api_key,
             "Content-Type": "application/json"
         }
         
+        # 웹훅이 설정되어 있으면 완료 시 콜백 받도록 요청
+        webhook_data, track_id = modelslab.webhook_fields()
         data = {
             "key": modelslab_api_key,
-            "model_id": "seedance-i2v",
+            "model_id": VideoAIService.MODEL_ID,
             "init_image": image_url,
-            "prompt": prompt
+            "prompt": prompt,
+            **webhook_data
         }
         
-        logging.info(f"ModelsLab API 호출 시작: {image_url}")
-        logging.info(f"ModelsLab API 요청 데이터: {{'key': '***', 'model_id': '{data['model_id']}', 'init_image': '{data['init_image']}', 'prompt': '{data['prompt']}'}}")
+        logging.info("ModelsLab API 호출 시작: %s (model_id: %s)", image_url, data["model_id"])
         
-        async with aiohttp.ClientSession() as session:
-            # 1. 영상화 요청
-            async with session.post(url, headers=headers, json=data) as response:
-                logging.info(f"ModelsLab API 응답 상태: {response.status}")
-                logging.info(f"ModelsLab API 응답 헤더: {dict(response.headers)}")
-                
-                if response.status != 200:
-                    error_text = await response.text()
-                    logging.error(f"ModelsLab API HTTP 오류: {response.status} - {error_text}")
-                    raise Exception(f"ModelsLab API HTTP 오류 ({response.status}): {error_text}")
+        session = get_http_session()
+        submit_started = time.perf_counter()
+        # 1. 영상화 요청
+        async with session.post(url, headers=headers, json=data) as response:
+            # 헤더는 DEBUG일 때만 포맷됨
+            logging.debug("ModelsLab API 응답 상태: %s, 헤더: %s", response.status, response.headers)
                 
-                result = await response.json()
-                logging.info(f"ModelsLab API 응답: {result}")
+            if response.status != 200:
+                error_text = await response.text()
+                logging.error(f"ModelsLab API HTTP 오류: {response.status} - {error_text}")
+                raise UpstreamError(f"ModelsLab API HTTP 오류 ({response.status}): {error_text}", status=response.status)
                 
-                # 2. 응답 처리
-                if result.get("status") == "error":
-                    error_message = result.get("message", "알 수 없는 오류")
-                    error_code = result.get("code", "unknown")
-                    logging.error(f"ModelsLab API 에러: {error_message} (코드: {error_code})")
-                    
-                    # 특정 에러에 대한 상세 정보
-                    if "Failed to generate image" in error_message:
-                        logging.error("이미지 생성 실패 - 가능한 원인: 이미지 형식, 크기, 내용 등")
-                        logging.error(f"이미지 URL: {image_url}")
-                        logging.error(f"프롬프트: {prompt}")
-                    
-                    raise Exception(f"ModelsLab API 에러: {error_message}")
+            result = await response.json()
+            observe("modelslab_video_submit", time.perf_counter() - submit_started)
+            logging.debug("ModelsLab API 응답: %s", result)
                 
-                elif result.get("status") == "processing":
-                    # 처리 중인 경우 polling으로 결과 대기
-                    task_id = result.get("id")
-                    if not task_id:
-                        raise Exception("ModelsLab API에서 task_id를 받지 못했습니다.")
+            # 2. 응답 처리
+            if result.get("status") == "error":
+                error_message = result.get("message", "알 수 없는 오류")
+                error_code = result.get("code", "unknown")
+                logging.error(f"ModelsLab API 에러: {error_message} (코드: {error_code})")
                     
-                    logging.info(f"ModelsLab API 처리 중 - task_id: {task_id}")
-                    # polling으로 결과 대기
-                    return await VideoAIService._poll_modelslab_result(session, modelslab_api_key, task_id)
+                # 특정 에러에 대한 상세 정보
+                if "Failed to generate image" in error_message:
+                    logging.error("이미지 생성 실패 - 가능한 원인: 이미지 형식, 크기, 내용 등")
+                    logging.error(f"이미지 URL: {image_url}")
+                    logging.error(f"프롬프트: {prompt}")
                     
-                elif result.get("output") and len(result.get("output", [])) > 0:
-                    # 바로 결과가 온 경우
-                    video_url = result.get("output")[0]
-                    logging.info(f"ModelsLab 비디오 URL 받음: {video_url}")
-                    return video_url
-                else:
-                    logging.error(f"ModelsLab API 응답에 output이 없음: {result}")
-                    raise Exception("ModelsLab API에서 비디오 URL을 받지 못했습니다.")
+                raise UpstreamError(f"ModelsLab API 에러: {error_message}")
+
+            return result, track_id
+
+    @staticmethod
+    async def _wait_modelslab_output(result: dict, track_id: str = None, on_progress=None) -> str:
+        """접수 응답에서 비디오 URL을 얻음 (처리 중이면 완료까지 대기)"""
+        if result.get("status") == "processing":
+            # 처리 중인 경우 polling으로 결과 대기
+            task_id = result.get("id")
+            if not task_id:
+                raise Exception("ModelsLab API에서 task_id를 받지 못했습니다.")
+
+            logging.info("ModelsLab API 처리 중 - task_id: %s, eta: %s", task_id, result.get("eta"))
+            if on_progress:
+                on_progress("processing", task_id=task_id)
+            # polling으로 결과 대기
+            return await VideoAIService._poll_modelslab_result(modelslab_api_key, task_id, result, track_id)
+
+        if result.get("output") and len(result.get("output", [])) > 0:
+            # 바로 결과가 온 경우
+            video_url = result.get("output")[0]
+            logging.info(f"ModelsLab 비디오 URL 받음: {video_url}")
+            return video_url
+
+        logging.error(f"ModelsLab API 응답에 output이 없음: {result}")
+        raise Exception("ModelsLab API에서 비디오 URL을 받지 못했습니다.")
     
     @staticmethod
-    async def _poll_modelslab_result(session: aiohttp.ClientSession, api_key: str, task_id: int) -> str:
-        """ModelsLab API 처리 결과를 polling으로 확인"""
-        fetch_url = f"https://modelslab.com/api/v7/video-fusion/fetch/{task_id}"
+    async def _poll_modelslab_result(api_key: str, task_id: int, submit_result: dict = None, track_id: str = None) -> str:
+        """ModelsLab API 처리 결과를 공용 poll 스케줄러(웹훅 수신 시 즉시)로 확인"""
+        fetch_url = modelslab.api_url(f"/api/v7/video-fusion/fetch/{task_id}")
         
         headers = {
             "key": api_key,
             "Content-Type": "application/json"
         }
         
-        max_attempts = 7  # 최대 1분 10초 대기 (10초 * 7)
-        
-        for attempt in range(max_attempts):
-            logging.info(f"ModelsLab 결과 확인 시도 {attempt + 1}/{max_attempts}")
-            
-            await asyncio.sleep(10)  # 10초 대기
-            
-            async with session.post(fetch_url, headers=headers) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"ModelsLab fetch API 오류 ({response.status}): {error_text}")
-                
-                result = await response.json()
-                logging.info(f"Polling 응답: {result}")
-                
-                if result.get("status") == "error":
-                    error_message = result.get("message", "알 수 없는 오류")
-                    logging.error(f"ModelsLab API polling 에러: {error_message}")
-                    raise Exception(f"ModelsLab API 처리 실패: {error_message}")
-                
-                elif result.get("output") and len(result.get("output", [])) > 0:
-                    video_url = result.get("output")[0]
-                    logging.info(f"ModelsLab 비디오 URL 받음: {video_url}")
-                    return video_url
-                
-                elif result.get("status") != "processing":
-                    raise Exception(f"ModelsLab API 처리 실패: {result.get('message', '알 수 없는 오류')}")
-        
-        raise Exception("ModelsLab API 처리 시간 초과 (1분)")
+        with track_stage("modelslab_video_wait"):
+            return await poll_scheduler.wait(
+                task_id, fetch_url, headers, submit_result, track_id, label="ModelsLab"
+            )
     
     @staticmethod
     async def _download_and_upload_to_s3(video_url: str) -> str:
@@ -274,31 +533,54 @@ class VideoAIService:
         try:
             logging.info(f"비디오 다운로드 시작: {video_url}")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(video_url) as response:
-                    if response.status != 200:
-                        raise Exception(f"비디오 다운로드 실패 ({response.status})")
-                    
-                    video_data = await response.read()
-                    logging.info(f"비디오 다운로드 완료: {len(video_data)} bytes")
+            session = get_http_session()
+            async with session.get(video_url) as response:
+                if response.status != 200:
+                    raise UpstreamError(f"비디오 다운로드 실패 ({response.status})", status=response.status)
                     
-                    # s3_util.py의 upload_video_to_s3 사용
-                    s3_url = upload_video_to_s3(video_data, is_temp=True)
+                # 다운로드와 동시에 저장소에 스트리밍 저장 (전체 영상을 메모리에 올리지 않음)
+                s3_url = await save_response(response, "temp/videos", "mp4")
                     
-                    logging.info(f"비디오 S3 업로드 완료: {s3_url}")
-                    return s3_url
+                logging.info(f"비디오 S3 업로드 완료: {s3_url}")
+                return s3_url
                     
         except Exception as e:
             logging.error(f"비디오 다운로드/업로드 실패: {str(e)}")
-            raise Exception(f"비디오 처리 실패: {str(e)}")
+            raise UpstreamError(f"비디오 처리 실패: {str(e)}", retryable=is_retryable(e))
 
 
 class CharacterAIService:
     """캐릭터화 AI 서비스"""
+
+    MODEL_ID = "fluxdev"
+    # 결과에 영향을 주는 ControlNet 파라미터 (캐시 키에도 포함)
+    PARAMS = {
+        "steps": "20",
+        "controlnet_type": "ghibli",
+        "controlnet_model": "ghibli"
+    }
     
     @staticmethod
-    async def characterize_image(image_url: str, prompt: str = "Ghibli Studio style, Charming hand-drawn anime-style illustration"):
-        """이미지를 캐릭터화"""
+    async def cached_result(image_digest: str, prompt: str):
+        """같은 이미지(정규화된 이미지 해시)/프롬프트의 이전 결과 (없으면 None)"""
+        cached_url = await result_cache.get(
+            make_cache_key(image_digest, prompt, CharacterAIService.MODEL_ID, CharacterAIService.PARAMS)
+        )
+        if not cached_url:
+            return None
+        logging.info(f"캐릭터화 캐시 적중: {cached_url}")
+        return {
+            "character_image_url": cached_url,
+            "status": "success",
+            "message": "캐릭터화가 완료되었습니다."
+        }
+
+    @staticmethod
+    async def characterize_image(image_url: str, prompt: str = "Ghibli Studio style, Charming hand-drawn anime-style illustration", on_progress=None, image_digest: str = None):
+        """이미지를 캐릭터화 (on_progress(stage, **info)로 진행 단계를 알림)
+
+        image_digest(정규화된 이미지 해시)가 주어지면 결과를 캐시에 저장한다 (조회는 임시 업로드 전에 cached_result로).
+        """
         # API 키 상태 확인
         if not modelslab_api_key:
             logging.error("MODELSLAB_API_KEY가 설정되지 않았습니다.")
@@ -308,150 +590,144 @@ class CharacterAIService:
                 "message": "ModelsLab API 키가 설정되지 않았습니다."
             } 
         
-        logging.info(f"캐릭터화 시작: 이미지 URL: {image_url}, 프롬프트: {prompt[:100]}")
-        
-        max_retries = 3
-        retry_delay = 2  # 초
-        
-        for attempt in range(max_retries):
-            try:
-                logging.info(f"캐릭터화 시작 (시도 {attempt + 1}/{max_retries})")
-                
-                # ModelsLab API로 캐릭터화 요청
-                character_image_url = await CharacterAIService._call_modelslab_characterize_api(image_url, prompt)
-                
-                # ModelsLab에서 받은 이미지를 S3에 다운로드하여 저장
-                s3_character_image_url = await CharacterAIService._download_and_upload_character_to_s3(character_image_url)
-                
-                logging.info(f"캐릭터화 완료: S3 URL - {s3_character_image_url}")
-                
-                return {
-                    "character_image_url": s3_character_image_url,
-                    "status": "success", 
-                    "message": "캐릭터화가 완료되었습니다."
-                }
-                
-            except Exception as e:
-                error_msg = str(e)
-                logging.error(f"캐릭터화 실패 (시도 {attempt + 1}/{max_retries}): {error_msg}")
-                
-                # 마지막 시도가 아니고, 재시도 가능한 에러인 경우
-                if attempt < max_retries - 1 and "Failed to generate image" in error_msg:
-                    logging.info(f"{retry_delay}초 후 재시도합니다...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2  # 지수 백오프
-                    continue
-                else:
-                    return {
-                        "character_image_url": "",
-                        "status": "error",
-                        "message": f"캐릭터화 처리 중 오류가 발생했습니다: {error_msg}"
-                    }
+        logging.info("캐릭터화 시작: 이미지 URL: %s, 프롬프트: %.100s", image_url, prompt)
+
+        cache_key = make_cache_key(
+            image_digest, prompt, CharacterAIService.MODEL_ID, CharacterAIService.PARAMS
+        ) if image_digest else None
+
+        async def submit():
+            # 슬롯은 접수 POST 동안만 점유 (결과 대기는 poll 스케줄러가 모든 작업을 함께 처리)
+            async with upstream_limiters["modelslab_controlnet"].slot():
+                return await CharacterAIService._call_modelslab_characterize_api(image_url, prompt)
+
+        try:
+            # ModelsLab API로 캐릭터화 요청 (접수 POST만 재시도: 접수된 작업을 다시 보내면 중복 과금)
+            result, track_id = await call_with_retry(
+                submit, upstream="modelslab_controlnet", label="캐릭터화 접수",
+                on_attempt=(lambda attempt: on_progress("submitting", attempt=attempt)) if on_progress else None
+            )
+            character_image_url = await CharacterAIService._wait_modelslab_characterize_output(result, track_id, on_progress)
+
+            # ModelsLab에서 받은 이미지를 S3에 다운로드하여 저장 (다운로드만 다시 시도)
+            if on_progress:
+                on_progress("downloading")
+            with track_stage("character_transfer"):
+                s3_character_image_url = await call_with_retry(
+                    lambda: CharacterAIService._download_and_upload_character_to_s3(character_image_url),
+                    label="캐릭터 이미지 다운로드"
+                )
+
+            logging.info(f"캐릭터화 완료: S3 URL - {s3_character_image_url}")
+            if cache_key:
+                await result_cache.set(cache_key, s3_character_image_url)
+
+            return {
+                "character_image_url": s3_character_image_url,
+                "status": "success", 
+                "message": "캐릭터화가 완료되었습니다."
+            }
+
+        except Overloaded:
+            # 한도 초과/서킷 차단은 API에서 429/503으로 응답
+            raise
+        except Exception as e:
+            error_msg = str(e)
+            logging.error(f"캐릭터화 실패: {error_msg}")
+            return {
+                "character_image_url": "",
+                "status": "error",
+                "message": f"캐릭터화 처리 중 오류가 발생했습니다: {error_msg}"
+            }
     
     @staticmethod
-    async def _call_modelslab_characterize_api(image_url: str, prompt: str) -> str:
-        """ModelsLab ControlNet API를 호출하여 캐릭터화 수행"""
+    async def _call_modelslab_characterize_api(image_url: str, prompt: str) -> tuple:
+        """ModelsLab ControlNet 캐릭터화 요청 접수. (응답, 웹훅 track_id) 반환"""
         if not modelslab_api_key:
             raise ValueError("MODELSLAB_API_KEY 환경 변수가 설정되지 않았습니다.")
         
-        url = "https://modelslab.com/api/v5/controlnet"
+        url = modelslab.api_url("/api/v5/controlnet")
         
         headers = {
             "Content-Type": "application/json"
         }
         
+        # 웹훅이 설정되어 있으면 완료 시 콜백 받도록 요청
+        webhook_data, track_id = modelslab.webhook_fields()
         data = {
-            "model_id": "fluxdev",
+            "model_id": CharacterAIService.MODEL_ID,
             "init_image": image_url,
             "prompt": prompt,
-            "steps": "20",
-            "controlnet_type": "ghibli",
-            "controlnet_model": "ghibli",
-            "key": modelslab_api_key
+            **CharacterAIService.PARAMS,
+            "key": modelslab_api_key,
+            **webhook_data
         }
         
-        logging.info(f"ModelsLab ControlNet API 호출 시작: {image_url}")
-        logging.info(f"ModelsLab ControlNet API 요청 데이터: {{'model_id': '{data['model_id']}', 'init_image': '{data['init_image']}', 'prompt': '{data['prompt']}', 'steps': '{data['steps']}', 'controlnet_type': '{data['controlnet_type']}', 'controlnet_model': '{data['controlnet_model']}', 'key': '***'}}")
+        logging.info("ModelsLab ControlNet API 호출 시작: %s (model_id: %s, params: %s)", image_url, data["model_id"], CharacterAIService.PARAMS)
         
-        async with aiohttp.ClientSession() as session:
-            # 캐릭터화 요청
-            async with session.post(url, headers=headers, json=data) as response:
-                logging.info(f"ModelsLab ControlNet API 응답 상태: {response.status}")
-                logging.info(f"ModelsLab ControlNet API 응답 헤더: {dict(response.headers)}")
-                
-                if response.status != 200:
-                    error_text = await response.text()
-                    logging.error(f"ModelsLab ControlNet API HTTP 오류: {response.status} - {error_text}")
-                    raise Exception(f"ModelsLab ControlNet API HTTP 오류 ({response.status}): {error_text}")
+        session = get_http_session()
+        submit_started = time.perf_counter()
+        # 캐릭터화 요청
+        async with session.post(url, headers=headers, json=data) as response:
+            # 헤더는 DEBUG일 때만 포맷됨
+            logging.debug("ModelsLab ControlNet API 응답 상태: %s, 헤더: %s", response.status, response.headers)
                 
-                result = await response.json()
-                logging.info(f"ModelsLab ControlNet API 응답: {result}")
+            if response.status != 200:
+                error_text = await response.text()
+                logging.error(f"ModelsLab ControlNet API HTTP 오류: {response.status} - {error_text}")
+                raise UpstreamError(f"ModelsLab ControlNet API HTTP 오류 ({response.status}): {error_text}", status=response.status)
                 
-                # 응답 처리
-                if result.get("status") == "error":
-                    error_message = result.get("message", "알 수 없는 오류")
-                    error_code = result.get("code", "unknown")
-                    logging.error(f"ModelsLab ControlNet API 에러: {error_message} (코드: {error_code})")
-                    raise Exception(f"ModelsLab ControlNet API 에러: {error_message}")
+            result = await response.json()
+            observe("modelslab_controlnet_submit", time.perf_counter() - submit_started)
+            logging.debug("ModelsLab ControlNet API 응답: %s", result)
                 
-                elif result.get("status") == "processing":
-                    # 처리 중인 경우 polling으로 결과 대기
-                    task_id = result.get("id")
-                    if not task_id:
-                        raise Exception("ModelsLab ControlNet API에서 task_id를 받지 못했습니다.")
-                    
-                    logging.info(f"ModelsLab ControlNet API 처리 중 - task_id: {task_id}")
-                    # polling으로 결과 대기
-                    return await CharacterAIService._poll_modelslab_characterize_result(session, modelslab_api_key, task_id)
-                    
-                elif result.get("output") and len(result.get("output", [])) > 0:
-                    # 바로 결과가 온 경우
-                    character_image_url = result.get("output")[0]
-                    logging.info(f"ModelsLab 캐릭터 이미지 URL 받음: {character_image_url}")
-                    return character_image_url
-                else:
-                    logging.error(f"ModelsLab ControlNet API 응답에 output이 없음: {result}")
-                    raise Exception("ModelsLab ControlNet API에서 캐릭터 이미지 URL을 받지 못했습니다.")
+            # 응답 처리
+            if result.get("status") == "error":
+                error_message = result.get("message", "알 수 없는 오류")
+                error_code = result.get("code", "unknown")
+                logging.error(f"ModelsLab ControlNet API 에러: {error_message} (코드: {error_code})")
+                raise UpstreamError(f"ModelsLab ControlNet API 에러: {error_message}")
+
+            return result, track_id
+
+    @staticmethod
+    async def _wait_modelslab_characterize_output(result: dict, track_id: str = None, on_progress=None) -> str:
+        """접수 응답에서 캐릭터 이미지 URL을 얻음 (처리 중이면 완료까지 대기)"""
+        if result.get("status") == "processing":
+            # 처리 중인 경우 polling으로 결과 대기
+            task_id = result.get("id")
+            if not task_id:
+                raise Exception("ModelsLab ControlNet API에서 task_id를 받지 못했습니다.")
+
+            logging.info("ModelsLab ControlNet API 처리 중 - task_id: %s, eta: %s", task_id, result.get("eta"))
+            if on_progress:
+                on_progress("processing", task_id=task_id)
+            # polling으로 결과 대기
+            return await CharacterAIService._poll_modelslab_characterize_result(modelslab_api_key, task_id, result, track_id)
+
+        if result.get("output") and len(result.get("output", [])) > 0:
+            # 바로 결과가 온 경우
+            character_image_url = result.get("output")[0]
+            logging.info(f"ModelsLab 캐릭터 이미지 URL 받음: {character_image_url}")
+            return character_image_url
+
+        logging.error(f"ModelsLab ControlNet API 응답에 output이 없음: {result}")
+        raise Exception("ModelsLab ControlNet API에서 캐릭터 이미지 URL을 받지 못했습니다.")
     
     @staticmethod
-    async def _poll_modelslab_characterize_result(session: aiohttp.ClientSession, api_key: str, task_id: int) -> str:
-        """ModelsLab ControlNet API 처리 결과를 polling으로 확인"""
-        fetch_url = f"https://modelslab.com/api/v5/controlnet/fetch/{task_id}"
+    async def _poll_modelslab_characterize_result(api_key: str, task_id: int, submit_result: dict = None, track_id: str = None) -> str:
+        """ModelsLab ControlNet API 처리 결과를 공용 poll 스케줄러(웹훅 수신 시 즉시)로 확인"""
+        fetch_url = modelslab.api_url(f"/api/v5/controlnet/fetch/{task_id}")
         
         headers = {
             "key": api_key,
             "Content-Type": "application/json"
         }
         
-        max_attempts = 7  # 최대 1분 10초 대기 (10초 * 7)
-        
-        for attempt in range(max_attempts):
-            logging.info(f"ModelsLab ControlNet 결과 확인 시도 {attempt + 1}/{max_attempts}")
-            
-            await asyncio.sleep(10)  # 10초 대기
-            
-            async with session.post(fetch_url, headers=headers) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"ModelsLab ControlNet fetch API 오류 ({response.status}): {error_text}")
-                
-                result = await response.json()
-                logging.info(f"ControlNet Polling 응답: {result}")
-                
-                if result.get("status") == "error":
-                    error_message = result.get("message", "알 수 없는 오류")
-                    logging.error(f"ModelsLab ControlNet API polling 에러: {error_message}")
-                    raise Exception(f"ModelsLab ControlNet API 처리 실패: {error_message}")
-                
-                elif result.get("output") and len(result.get("output", [])) > 0:
-                    character_image_url = result.get("output")[0]
-                    logging.info(f"ModelsLab 캐릭터 이미지 URL 받음: {character_image_url}")
-                    return character_image_url
-                
-                elif result.get("status") != "processing":
-                    raise Exception(f"ModelsLab ControlNet API 처리 실패: {result.get('message', '알 수 없는 오류')}")
-        
-        raise Exception("ModelsLab ControlNet API 처리 시간 초과 (1분)")
+        with track_stage("modelslab_controlnet_wait"):
+            return await poll_scheduler.wait(
+                task_id, fetch_url, headers, submit_result, track_id, label="ModelsLab ControlNet"
+            )
     
     @staticmethod
     async def _download_and_upload_character_to_s3(character_image_url: str) -> str:
@@ -459,21 +735,18 @@ class CharacterAIService:
         try:
             logging.info(f"캐릭터 이미지 다운로드 시작: {character_image_url}")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(character_image_url) as response:
-                    if response.status != 200:
-                        raise Exception(f"캐릭터 이미지 다운로드 실패 ({response.status})")
-                    
-                    character_image_data = await response.read()
-                    logging.info(f"캐릭터 이미지 다운로드 완료: {len(character_image_data)} bytes")
+            session = get_http_session()
+            async with session.get(character_image_url) as response:
+                if response.status != 200:
+                    raise UpstreamError(f"캐릭터 이미지 다운로드 실패 ({response.status})", status=response.status)
                     
-                    # s3_util.py의 upload_image_to_s3 사용 (character 디렉토리)
-                    s3_url = upload_image_to_s3(character_image_data, "character", "png")
+                # 다운로드와 동시에 저장소에 업로드 (character 디렉토리, CDN URL 반환)
+                s3_url = await save_response(response, "temp/character", "png", public=True)
                     
-                    logging.info(f"캐릭터 이미지 S3 업로드 완료: {s3_url}")
-                    return s3_url
+                logging.info(f"캐릭터 이미지 S3 업로드 완료: {s3_url}")
+                return s3_url
                     
         except Exception as e:
             logging.error(f"캐릭터 이미지 다운로드/업로드 실패: {str(e)}")
-            raise Exception(f"캐릭터 이미지 처리 실패: {str(e)}")
+            raise UpstreamError(f"캐릭터 이미지 처리 실패: {str(e)}", retryable=is_retryable(e))
 
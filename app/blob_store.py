@@ -0,0 +1,344 @@
+import os
+import uuid
+import asyncio
+import hashlib
+import logging
+import mimetypes
+from dotenv import load_dotenv
+from .http_client import get_http_session
+from .metrics import count_bytes
+
+load_dotenv()
+
+# 저장소 종류: s3 / local(로컬 파일시스템) / memory(프로세스 메모리, 테스트/벤치마크용)
+BLOB_STORE = os.getenv("BLOB_STORE", "s3").lower()
+# ModelsLab 입력용 임시 이미지(temp/images, temp/character)만 다른 저장소에 둘 때 (빈 값이면 BLOB_STORE 사용)
+# local/memory를 쓰면 앱의 /blobs/{local|memory}/ 경로로 제공되므로 BLOB_PUBLIC_BASE_URL이 외부에서 접근 가능해야 한다
+TEMP_BLOB_STORE = os.getenv("TEMP_BLOB_STORE", "").lower()
+BLOB_LOCAL_DIR = os.getenv("BLOB_LOCAL_DIR", "blob_data")
+# local/memory 저장소 객체의 URL 기준 주소 (예: https://api.example.com/blobs)
+# 저장소마다 종류 이름을 붙여 구분한다 (https://api.example.com/blobs/local/temp/images/uuid.jpg)
+BLOB_PUBLIC_BASE_URL = os.getenv("BLOB_PUBLIC_BASE_URL", "http://127.0.0.1:8000/blobs").rstrip("/")
+
+STREAM_CHUNK_SIZE = 64 * 1024
+# 로컬 파일 스트리밍 저장 시 스레드로 넘겨 한 번에 쓰는 크기
+LOCAL_WRITE_BUFFER_SIZE = 1024 * 1024
+
+_CONTENT_TYPES = {"png": "image/png", "jpg": "image/jpeg", "jpeg": "image/jpeg", "webp": "image/webp", "mp4": "video/mp4"}
+
+
+class BlobObject:
+    """저장소에서 읽은 객체 (body는 bytes 또는 memoryview)"""
+
+    __slots__ = ("body", "size", "content_type", "etag")
+
+    def __init__(self, body, size: int, content_type: str, etag: str):
+        self.body = body
+        self.size = size  # 범위 읽기여도 객체 전체 크기
+        self.content_type = content_type
+        self.etag = etag
+
+
+class BlobStore:
+    """객체 저장소 인터페이스 (키는 "temp/images/uuid.jpg" 같은 경로 형식)"""
+
+    name = "blob"
+
+    async def put(self, key: str, data: bytes, content_type: str):
+        raise NotImplementedError
+
+    async def put_stream(self, key: str, chunks, content_type: str) -> int:
+        """비동기 바이트 청크를 받는 대로 저장. 저장한 바이트 수 반환"""
+        raise NotImplementedError
+
+    async def get(self, key: str, start: int = 0, length: int = None):
+        """객체(또는 start부터 length 바이트) 읽기. 없으면 None"""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def delete_many(self, keys: list) -> list:
+        """여러 객체 삭제. 삭제하지 못한 키 목록 반환"""
+        return [key for key in keys if not await self.delete(key)]
+
+    def url(self, key: str) -> str:
+        """저장소 직접 URL"""
+        raise NotImplementedError
+
+    def public_url(self, key: str) -> str:
+        """외부 서비스(ModelsLab 등)가 접근할 URL"""
+        return self.url(key)
+
+    def key_from_url(self, url: str):
+        """url()/public_url()로 만든 URL이면 키, 아니면 None"""
+        base = self.url("")
+        return url[len(base):] if url.startswith(base) else None
+
+    def presign_upload(self, key: str, content_type: str, method: str, min_bytes: int, max_bytes: int) -> dict:
+        """클라이언트 직접 업로드 URL 발급 (지원하지 않는 저장소는 NotImplementedError)"""
+        raise NotImplementedError
+
+    async def warm_up(self):
+        """앱 시작 시 클라이언트 생성/연결 등 준비 (첫 요청 지연 방지)"""
+
+
+def _slice(body, start: int, length: int):
+    return body[start:] if length is None else body[start:start + length]
+
+
+def _etag(data) -> str:
+    return hashlib.md5(data).hexdigest()
+
+
+class MemoryBlobStore(BlobStore):
+    """프로세스 메모리 저장소 (재시작하면 사라짐, 워커 간 공유 안 됨)"""
+
+    name = "memory"
+
+    def __init__(self, base_url: str = None):
+        self.base_url = base_url or f"{BLOB_PUBLIC_BASE_URL}/{self.name}"
+        self._objects = {}  # 키 -> (본문, Content-Type, ETag)
+
+    async def put(self, key: str, data: bytes, content_type: str):
+        self._objects[key] = (bytes(data), content_type, _etag(data))
+        count_bytes("out", self.name, len(data))
+
+    async def put_stream(self, key: str, chunks, content_type: str) -> int:
+        buffer = bytearray()
+        async for chunk in chunks:
+            buffer.extend(chunk)
+        await self.put(key, buffer, content_type)
+        return len(buffer)
+
+    async def get(self, key: str, start: int = 0, length: int = None):
+        stored = self._objects.get(key)
+        if stored is None:
+            return None
+        body, content_type, etag = stored
+        return BlobObject(_slice(memoryview(body), start, length), len(body), content_type, etag)
+
+    async def delete(self, key: str) -> bool:
+        self._objects.pop(key, None)
+        return True
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+class LocalBlobStore(BlobStore):
+    """로컬 파일시스템 저장소
+
+    쓰기는 임시 파일에 기록 후 rename(원자적 교체), 읽기는 요청한 범위만 bytes로 읽는다.
+    수명이 짧은 임시 파일을 S3 왕복 없이 다룰 때 사용.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = BLOB_LOCAL_DIR, base_url: str = None):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url or f"{BLOB_PUBLIC_BASE_URL}/{self.name}"
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"잘못된 키: {key}")
+        return path
+
+    def _write(self, key: str, data: bytes):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = f"{path}.{uuid.uuid4().hex}.part"
+        with open(partial_path, "wb") as output:
+            output.write(data)
+        os.replace(partial_path, path)
+
+    async def put(self, key: str, data: bytes, content_type: str):
+        await asyncio.to_thread(self._write, key, data)
+        count_bytes("out", self.name, len(data))
+
+    @staticmethod
+    def _open_partial(path: str, partial_path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(partial_path, "wb")
+
+    @staticmethod
+    def _commit(output, partial_path: str, path: str):
+        output.close()
+        os.replace(partial_path, path)
+
+    @staticmethod
+    def _discard(output, partial_path: str):
+        output.close()
+        try:
+            os.remove(partial_path)
+        except FileNotFoundError:
+            pass
+
+    async def put_stream(self, key: str, chunks, content_type: str) -> int:
+        # 디스크가 느릴 때 루프가 멈추지 않도록 파일 작업은 모두 스레드에서, 쓰기는 모아서 한 번에
+        path = self.path(key)
+        partial_path = f"{path}.{uuid.uuid4().hex}.part"
+        output = await asyncio.to_thread(self._open_partial, path, partial_path)
+        total = 0
+        buffer = bytearray()
+        try:
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                total += len(chunk)
+                if len(buffer) >= LOCAL_WRITE_BUFFER_SIZE:
+                    await asyncio.to_thread(output.write, buffer)
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(output.write, buffer)
+            await asyncio.to_thread(self._commit, output, partial_path, path)
+        except BaseException:
+            await asyncio.to_thread(self._discard, output, partial_path)
+            raise
+        count_bytes("out", self.name, total)
+        return total
+
+    def _read(self, key: str, start: int, length: int):
+        try:
+            with open(self.path(key), "rb") as source:
+                # 쓰기는 새 파일로 교체(os.replace)하므로 연 파일은 그 사이 교체/삭제되어도 열 때 내용 그대로 읽힘
+                # (mmap 뷰를 돌려주면 응답이 끝날 때까지 매핑과 파일이 열려 있으므로 필요한 범위만 bytes로 읽음)
+                stat = os.fstat(source.fileno())
+                source.seek(start)
+                body = source.read() if length is None else source.read(length)
+        except FileNotFoundError:
+            return None
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        return BlobObject(body, stat.st_size, content_type, f"{stat.st_size:x}-{stat.st_mtime_ns:x}")
+
+    async def get(self, key: str, start: int = 0, length: int = None):
+        return await asyncio.to_thread(self._read, key, start, length)
+
+    def _remove(self, key: str) -> bool:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+        return True
+
+    async def delete(self, key: str) -> bool:
+        try:
+            return await asyncio.to_thread(self._remove, key)
+        except OSError as e:
+            logging.error(f"로컬 파일 삭제 실패: {e}")
+            return False
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    async def warm_up(self):
+        await asyncio.to_thread(os.makedirs, self.root, exist_ok=True)
+
+
+_stores = {}
+
+
+def _create_store(kind: str) -> BlobStore:
+    if kind == "s3":
+        from .s3_util import S3BlobStore
+        return S3BlobStore()
+    if kind == "local":
+        return LocalBlobStore()
+    if kind == "memory":
+        return MemoryBlobStore()
+    raise ValueError(f"알 수 없는 저장소 종류: {kind}")
+
+
+def get_store(kind: str) -> BlobStore:
+    """종류별 저장소 (프로세스당 하나)"""
+    if kind not in _stores:
+        _stores[kind] = _create_store(kind)
+    return _stores[kind]
+
+
+def get_blob_store() -> BlobStore:
+    """결과물(영상, 캐릭터/일기 이미지)과 직접 업로드 원본을 두는 저장소"""
+    return get_store(BLOB_STORE)
+
+
+def get_temp_blob_store() -> BlobStore:
+    """ModelsLab 입력용 임시 이미지 저장소"""
+    return get_store(TEMP_BLOB_STORE or BLOB_STORE)
+
+
+def served_store(kind: str):
+    """/blobs/{kind}/ 경로로 제공할 저장소. 설정에서 쓰는 local/memory 저장소가 아니면 None"""
+    if kind not in ("local", "memory") or kind not in (BLOB_STORE, TEMP_BLOB_STORE or BLOB_STORE):
+        return None
+    return get_store(kind)
+
+
+def new_key(directory: str, ext: str) -> str:
+    # 예: temp/images/uuid.jpg
+    return f"{directory}/{uuid.uuid4().hex}.{ext}"
+
+
+def content_type_for(ext: str) -> str:
+    return _CONTENT_TYPES.get(ext.lower(), f"image/{ext}")
+
+
+async def upload_temp_image(image_bytes: bytes, directory: str, ext: str = "png") -> str:
+    """ModelsLab 입력용 이미지를 임시 저장소에 올리고 공개 URL 반환"""
+    store = get_temp_blob_store()
+    key = new_key(f"temp/{directory}", ext)
+    try:
+        await store.put(key, image_bytes, content_type_for(ext))
+    except Exception as e:
+        raise RuntimeError(f"{store.name} 업로드 실패: {e}")
+    return store.public_url(key)
+
+
+async def save_response(response, directory: str, ext: str, public: bool = False) -> str:
+    """aiohttp 응답 본문을 받는 대로 저장소에 스트리밍 저장하고 URL 반환
+
+    public이면 외부 접근용 URL(CDN), 아니면 저장소 직접 URL (스프링부트에서 CDN 변환 처리).
+    """
+    store = get_blob_store()
+    key = new_key(directory, ext)
+
+    async def chunks():
+        received = 0
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            received += len(chunk)
+            yield chunk
+        count_bytes("in", "upstream", received)
+
+    try:
+        size = await store.put_stream(key, chunks(), content_type_for(ext))
+    except Exception as e:
+        raise RuntimeError(f"{store.name} 업로드 실패: {e}")
+
+    logging.info(f"스트리밍 업로드 완료: {key} ({size} bytes)")
+    return store.public_url(key) if public else store.url(key)
+
+
+async def download_to_store(source_url: str, directory: str, ext: str = "png") -> str:
+    """URL을 다운로드하면서 저장소에 저장하고 저장소 URL 반환"""
+    try:
+        logging.info(f"이미지 다운로드 시작: {source_url}")
+
+        session = get_http_session()
+        async with session.get(source_url) as response:
+            if response.status != 200:
+                raise Exception(f"이미지 다운로드 실패 ({response.status})")
+            url = await save_response(response, directory, ext)
+            logging.info(f"이미지 업로드 완료: {url}")
+            return url
+
+    except Exception as e:
+        logging.error(f"이미지 다운로드/업로드 실패: {str(e)}")
+        raise Exception(f"이미지 처리 실패: {str(e)}")
+
+
+def locate_url(url: str):
+    """URL이 가리키는 (저장소, 키). 임시 저장소/기본 저장소 어느 쪽 URL도 아니면 None"""
+    for store in (get_temp_blob_store(), get_blob_store()):
+        key = store.key_from_url(url)
+        if key is not None:
+            return store, key
+    return None
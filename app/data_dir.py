@@ -0,0 +1,19 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 서버가 만드는 SQLite 파일(작업 상태, 결과 캐시, 임시 객체 기록)을 두는 디렉터리
+# 워커들이 같은 파일을 공유하므로 실행 위치와 상관없이 같은 경로가 되도록 기본값은 프로젝트 루트 아래 data/
+DATA_DIR = os.path.abspath(os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")))
+
+
+def data_path(name: str) -> str:
+    """DATA_DIR 아래 파일 경로"""
+    return os.path.join(DATA_DIR, name)
+
+
+def ensure_parent_dir(path: str):
+    """SQLite 파일을 열기 전에 상위 디렉터리 생성 (:memory:는 무시)"""
+    if path and path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
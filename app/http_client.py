@@ -0,0 +1,83 @@
+import os
+import logging
+import asyncio
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 커넥션 풀 설정 (환경 변수로 조정 가능)
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))  # 전체 동시 커넥션 수
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))  # 호스트별 동시 커넥션 수
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))  # 유휴 커넥션 유지 시간(초)
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))  # DNS 캐시 유지 시간(초)
+
+# 타임아웃 설정 (0이면 제한 없음)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", "0"))
+
+_session: aiohttp.ClientSession | None = None
+
+
+def _build_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        use_dns_cache=True,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=HTTP_TOTAL_TIMEOUT or None,
+        sock_connect=HTTP_CONNECT_TIMEOUT or None,
+        sock_read=HTTP_READ_TIMEOUT or None,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def init_http_session() -> aiohttp.ClientSession:
+    """앱 시작 시 공유 HTTP 세션 생성"""
+    global _session
+    if _session is None or _session.closed:
+        _session = _build_session()
+        logging.info(
+            f"공유 HTTP 세션 생성: limit={HTTP_POOL_LIMIT}, limit_per_host={HTTP_POOL_LIMIT_PER_HOST}, "
+            f"dns_ttl={HTTP_DNS_CACHE_TTL}s"
+        )
+    return _session
+
+
+async def close_http_session():
+    """앱 종료 시 공유 HTTP 세션 정리"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logging.info("공유 HTTP 세션 종료")
+    _session = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """공유 HTTP 세션 반환 (lifespan 밖에서 호출되면 지연 생성)"""
+    global _session
+    if _session is None or _session.closed:
+        _session = _build_session()
+    return _session
+
+
+async def preconnect(urls: list):
+    """업스트림 DNS 조회와 커넥션 생성을 미리 해 둠 (HEAD 응답 코드는 무시)
+
+    조회 결과는 커넥터 DNS 캐시(HTTP_DNS_CACHE_TTL)에, 커넥션은 keep-alive 풀에 남는다.
+    """
+    session = get_http_session()
+
+    async def connect(url: str):
+        async with session.head(url, allow_redirects=False) as response:
+            logging.info("업스트림 사전 연결: %s (%d)", url, response.status)
+
+    urls = list(dict.fromkeys(url for url in urls if url))
+    results = await asyncio.gather(*(connect(url) for url in urls), return_exceptions=True)
+    failed = [f"{url}: {result!r}" for url, result in zip(urls, results) if isinstance(result, BaseException)]
+    if failed:
+        raise RuntimeError(", ".join(failed))
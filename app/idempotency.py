@@ -0,0 +1,89 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from functools import partial
+from dotenv import load_dotenv
+
+load_dotenv()
+
+IDEMPOTENCY_REPLAY_TTL = int(os.getenv("IDEMPOTENCY_REPLAY_TTL", "600"))  # 완료된 응답 재사용 시간(초)
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# Idempotency-Key가 없어도 동일한 요청이 동시에 들어오면 하나로 합침
+IDEMPOTENCY_AUTO_COALESCE = os.getenv("IDEMPOTENCY_AUTO_COALESCE", "true").lower() == "true"
+
+
+class IdempotencyConflict(Exception):
+    """같은 키로 내용이 다른 요청이 들어온 경우"""
+
+
+class RequestCoalescer:
+    """진행 중인 요청 합치기(single-flight) + 완료된 응답 재사용"""
+
+    def __init__(self, replay_ttl: int = IDEMPOTENCY_REPLAY_TTL, max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        self.replay_ttl = replay_ttl
+        self.max_entries = max_entries
+        self.coalesced = 0
+        self.replayed = 0
+        self._inflight = {}  # key -> (task, fingerprint)
+        self._completed = OrderedDict()  # key -> (expires_at, fingerprint, value)
+
+    async def run(self, key: str, fingerprint: str, work, replayable=None) -> tuple:
+        """key로 work()를 한 번만 실행하고 (결과, 공유 여부)를 반환
+
+        replayable(result)가 참이면 완료된 결과를 replay_ttl 동안 같은 key 요청에 그대로 돌려준다.
+        work는 별도 태스크로 실행되므로 먼저 온 요청이 끊겨도 뒤따른 요청은 결과를 받는다.
+        """
+        self._purge()
+
+        entry = self._completed.get(key)
+        if entry:
+            if entry[1] != fingerprint:
+                raise IdempotencyConflict(key)
+            self.replayed += 1
+            return entry[2], True
+
+        inflight = self._inflight.get(key)
+        if inflight:
+            task, inflight_fingerprint = inflight
+            if inflight_fingerprint != fingerprint:
+                raise IdempotencyConflict(key)
+            self.coalesced += 1
+            logging.info(f"진행 중인 동일 요청에 합류: {key}")
+            return await asyncio.shield(task), True
+
+        task = asyncio.create_task(work())
+        self._inflight[key] = (task, fingerprint)
+        task.add_done_callback(partial(self._on_done, key, fingerprint, replayable))
+        return await asyncio.shield(task), False
+
+    def _on_done(self, key: str, fingerprint: str, replayable, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if replayable and replayable(result):
+            self._completed[key] = (time.time() + self.replay_ttl, fingerprint, result)
+            self._completed.move_to_end(key)
+            while len(self._completed) > self.max_entries:
+                self._completed.popitem(last=False)
+
+    def _purge(self):
+        now = time.time()
+        while self._completed:
+            key, (expires_at, _, _) = next(iter(self._completed.items()))
+            if expires_at > now:
+                break
+            self._completed.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._inflight),
+            "replayable": len(self._completed),
+            "coalesced": self.coalesced,
+            "replayed": self.replayed
+        }
+
+
+request_coalescer = RequestCoalescer()
@@ -0,0 +1,184 @@
+import os
+import io
+import logging
+import importlib.util
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 이미지 전처리 실행기 설정
+# process: 별도 프로세스에서 실행 (GIL 영향 없음), thread: 스레드 풀에서 실행 (PIL 디코딩/인코딩은 GIL 해제)
+IMAGE_EXECUTOR = os.getenv("IMAGE_EXECUTOR", "process").lower()
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(os.cpu_count() or 1, 4))))
+
+# 모델별 입력 해상도 상한 (긴 변 기준, 픽셀)
+# seedance-i2v는 최대 720p 영상을, fluxdev ControlNet은 1024px 전후 이미지를 생성하므로 그 이상은 전송 낭비
+IMAGE_MAX_SIDE = {
+    "video": int(os.getenv("VIDEO_IMAGE_MAX_SIDE", "1280")),
+    "character": int(os.getenv("CHARACTER_IMAGE_MAX_SIDE", "1024")),
+}
+IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "jpeg").lower()  # jpeg 또는 webp
+IMAGE_OUTPUT_QUALITY = int(os.getenv("IMAGE_OUTPUT_QUALITY", "90"))
+IMAGE_MIN_OUTPUT_QUALITY = int(os.getenv("IMAGE_MIN_OUTPUT_QUALITY", "60"))
+IMAGE_MAX_OUTPUT_BYTES = int(os.getenv("IMAGE_MAX_OUTPUT_BYTES", str(2 * 1024 * 1024)))
+
+_OUTPUT_EXT = {"jpeg": "jpg", "webp": "webp"}
+
+# HEIC/HEIF(아이폰 기본 형식)는 pillow-heif가 설치된 경우에만 지원
+HEIF_SUPPORTED = importlib.util.find_spec("pillow_heif") is not None
+_heif_registered = False
+
+_executor: Executor | None = None
+_executor_restarts = 0
+
+
+def preprocess_image(image_data: bytes, profile: str = "video") -> tuple:
+    """업로드 이미지를 모델 입력용으로 정규화 (CPU 작업, 이벤트 루프 밖에서 실행)
+
+    1. JPEG은 draft 모드로 목표 해상도 근처까지 축소 디코딩
+    2. EXIF 방향(8가지 모두) 적용
+    3. 긴 변을 모델 해상도 상한에 맞춰 축소
+    4. EXIF 없는 JPEG/WebP로 인코딩 (IMAGE_MAX_OUTPUT_BYTES를 넘으면 품질을 낮춰 재인코딩)
+
+    (이미지 바이트, 확장자)를 반환.
+    """
+    global _heif_registered
+    from PIL import Image, ImageOps
+
+    if HEIF_SUPPORTED and not _heif_registered:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+        _heif_registered = True
+
+    max_side = IMAGE_MAX_SIDE.get(profile, IMAGE_MAX_SIDE["video"])
+    output_format = IMAGE_OUTPUT_FORMAT if IMAGE_OUTPUT_FORMAT in _OUTPUT_EXT else "jpeg"
+
+    image = Image.open(io.BytesIO(image_data))
+    if image.format == "JPEG":
+        # DCT 스케일링으로 1/2, 1/4, 1/8 크기로 바로 디코딩 (요청 크기 이상은 유지)
+        image.draft("RGB", (max_side, max_side))
+
+    # EXIF orientation 적용 후 EXIF 제거
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode not in ("RGB", "RGBA") or (output_format == "jpeg" and image.mode == "RGBA"):
+        image = image.convert("RGBA")
+        if output_format == "jpeg":
+            # JPEG은 투명도를 지원하지 않으므로 흰 배경에 합성
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    quality = IMAGE_OUTPUT_QUALITY
+    while True:
+        output_buffer = io.BytesIO()
+        image.save(output_buffer, format=output_format.upper(), quality=quality)
+        if output_buffer.tell() <= IMAGE_MAX_OUTPUT_BYTES or quality <= IMAGE_MIN_OUTPUT_QUALITY:
+            break
+        quality = max(quality - 10, IMAGE_MIN_OUTPUT_QUALITY)
+
+    return output_buffer.getvalue(), _OUTPUT_EXT[output_format]
+
+
+def is_model_ready(info: dict, size: int, profile: str = "video") -> bool:
+    """전처리 없이 그대로 모델 입력으로 쓸 수 있는 이미지인지
+
+    EXIF가 없는(회전/위치 정보 없음) RGB JPEG이면서 해상도/용량이 전처리 결과 상한 이내인 경우.
+    """
+    max_side = IMAGE_MAX_SIDE.get(profile, IMAGE_MAX_SIDE["video"])
+    return (
+        info["format"] == "JPEG"
+        and info["width"] is not None
+        and info["mode"] in ("RGB", "L")
+        and not info["has_exif"]
+        and max(info["width"], info["height"]) <= max_side
+        and size <= IMAGE_MAX_OUTPUT_BYTES
+    )
+
+
+def _warmup() -> bool:
+    # 워커에서 PIL 코덱 플러그인과 전처리 경로(디코딩/회전/리샘플링/인코딩)를 미리 로드
+    from PIL import Image
+    Image.init()
+    sample = io.BytesIO()
+    Image.new("RGB", (64, 64), (128, 128, 128)).save(sample, format="JPEG")
+    preprocess_image(sample.getvalue())
+    return True
+
+
+def init_image_executor() -> Executor:
+    """전처리 실행기 생성 (이미 있으면 그대로 반환)"""
+    global _executor
+    if _executor is None:
+        if IMAGE_EXECUTOR == "thread":
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+        else:
+            # 스레드가 있는 프로세스를 fork하지 않도록 spawn 사용
+            _executor = ProcessPoolExecutor(
+                max_workers=IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        logging.info(f"이미지 전처리 실행기 생성: {IMAGE_EXECUTOR} x {IMAGE_WORKERS}")
+    return _executor
+
+
+async def warm_up_image_executor():
+    """워커 수만큼 _warmup을 실행해 첫 요청이 워커 생성/PIL 로드 비용을 내지 않게 함"""
+    executor = init_image_executor()
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(executor, _warmup) for _ in range(IMAGE_WORKERS)))
+
+
+def _is_broken(executor) -> bool:
+    # 워커 프로세스가 비정상 종료(OOM, 코덱 segfault 등)하면 풀 전체가 깨져 이후 submit이 모두 실패
+    return bool(getattr(executor, "_broken", False))
+
+
+def _replace_executor(broken: Executor) -> Executor:
+    """깨진 프로세스 풀을 정리하고 새로 생성 (여러 요청이 동시에 감지해도 한 번만 교체)"""
+    global _executor, _executor_restarts
+    if _executor is broken:
+        logging.error("이미지 전처리 프로세스 풀이 깨져 새로 만듭니다")
+        _executor = None
+        _executor_restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+    return init_image_executor()
+
+
+def image_executor_ready() -> bool:
+    """전처리 실행기 사용 가능 여부. 깨진 풀이면 새로 만들도록 교체하고 이번 확인은 False"""
+    if _executor is not None and _is_broken(_executor):
+        _replace_executor(_executor)
+        return False
+    return True
+
+
+def image_executor_stats() -> dict:
+    return {"kind": IMAGE_EXECUTOR, "workers": IMAGE_WORKERS, "restarts": _executor_restarts}
+
+
+def shutdown_image_executor():
+    """앱 종료 시 전처리 실행기 정리"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+async def preprocess_image_async(image_data: bytes, profile: str = "video") -> tuple:
+    """preprocess_image를 전처리 실행기에서 실행"""
+    executor = init_image_executor()
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, preprocess_image, image_data, profile)
+    except BrokenProcessPool:
+        # 다른 요청 처리 중 죽은 워커 때문일 수 있으므로 새 풀에서 한 번만 다시 시도
+        # (이 이미지가 워커를 죽인 경우 다시 깨지지만 풀은 다음 요청/readyz 확인 때 교체됨)
+        executor = _replace_executor(executor)
+        return await loop.run_in_executor(executor, preprocess_image, image_data, profile)
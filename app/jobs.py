@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from .admission import Overloaded
+from .data_dir import data_path, ensure_parent_dir
+from .tracing import current_trace_id
+
+load_dotenv()
+
+JOB_MAX_CONCURRENCY = int(os.getenv("JOB_MAX_CONCURRENCY", "32"))  # 동시에 실행할 백그라운드 작업 수
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))  # 완료된 작업 보관 시간(초)
+JOB_MAX_WAIT = float(os.getenv("JOB_MAX_WAIT", "30"))  # 롱폴링 최대 대기 시간(초)
+# 워커 간 공유 작업 상태 저장소 (빈 값이면 프로세스 메모리에만 저장: 워커가 여러 개면 다른 워커의 작업은 조회 불가)
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", data_path("jobs.sqlite3"))
+JOB_STORE_POLL_INTERVAL = float(os.getenv("JOB_STORE_POLL_INTERVAL", "0.5"))  # 다른 워커 작업 롱폴링 시 확인 주기(초)
+# 종료 시 실행 중인 작업이 끝나기를 기다리는 시간(초). 넘으면 취소하고 실패로 기록
+JOB_DRAIN_TIMEOUT = float(os.getenv("JOB_DRAIN_TIMEOUT", "180"))
+
+
+class Job:
+    """백그라운드에서 실행되는 영상화/캐릭터화 작업"""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.trace_id = current_trace_id()  # 작업을 접수한 요청의 trace id
+        self.status = "queued"  # queued / running / completed / failed
+        self.stage = "queued"
+        self.info = {}
+        self.result = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._changed = asyncio.Event()
+        self._on_change = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def update(self, stage: str, **info):
+        """서비스의 on_progress 콜백"""
+        self.stage = stage
+        self.info.update(info)
+        if self.status == "queued":
+            self.status = "running"
+        self._notify()
+
+    def finish(self, result: dict):
+        self.result = result
+        self.status = "completed" if result.get("status") == "success" else "failed"
+        self.stage = self.status
+        self._notify()
+
+    def _notify(self):
+        self.updated_at = time.time()
+        self._changed.set()
+        self._changed = asyncio.Event()
+        if self._on_change is not None:
+            self._on_change(self)
+
+    async def wait_changed(self, timeout: float):
+        """상태가 바뀌거나 timeout이 지날 때까지 대기"""
+        if self.finished or timeout <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "status": self.status,
+            "stage": self.stage,
+            "info": self.info,
+            "result": self.result,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+class StoredJob:
+    """다른 워커 프로세스가 실행 중인 작업 (공유 저장소에 기록된 상태를 읽어서 제공)"""
+
+    __slots__ = ("_manager", "_data")
+
+    def __init__(self, manager, data: dict):
+        self._manager = manager
+        self._data = data
+
+    @property
+    def finished(self) -> bool:
+        return self._data["status"] in ("completed", "failed")
+
+    async def wait_changed(self, timeout: float):
+        """저장소를 주기적으로 확인해 상태가 바뀌거나 timeout이 지날 때까지 대기"""
+        deadline = time.monotonic() + timeout
+        while not self.finished and time.monotonic() < deadline:
+            await asyncio.sleep(min(JOB_STORE_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+            data = await self._manager._load(self._data["job_id"])
+            if data is not None and data["updated_at"] != self._data["updated_at"]:
+                self._data = data
+                return
+
+    def to_dict(self) -> dict:
+        return self._data
+
+
+class JobManager:
+    """작업 저장소 및 백그라운드 실행기
+
+    작업은 접수한 워커 프로세스에서 실행되고, 상태가 바뀔 때마다 공유 SQLite 저장소에 기록되어
+    다른 워커로 들어온 /jobs 조회에도 응답할 수 있다.
+    """
+
+    def __init__(self, max_concurrency: int = JOB_MAX_CONCURRENCY, result_ttl: int = JOB_RESULT_TTL,
+                 path: str = JOB_STORE_PATH):
+        self._jobs = {}
+        self._tasks = set()
+        self._semaphore = None
+        self._max_concurrency = max_concurrency
+        self._result_ttl = result_ttl
+        self.path = path
+        self._db = None
+        self._db_executor = None
+        self._next_db_purge = 0.0
+
+    def _connect(self):
+        if self._db is None:
+            # 여러 워커가 같은 파일을 읽고 쓰므로 WAL 모드 + 잠금 대기 허용
+            ensure_parent_dir(self.path)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _db_save(self, job_id: str, data: str, updated_at: float):
+        db = self._connect()
+        db.execute("INSERT OR REPLACE INTO jobs (id, data, updated_at) VALUES (?, ?, ?)", (job_id, data, updated_at))
+        if updated_at >= self._next_db_purge:
+            self._next_db_purge = updated_at + 60
+            db.execute("DELETE FROM jobs WHERE updated_at < ?", (updated_at - self._result_ttl,))
+        db.commit()
+
+    def _db_load(self, job_id: str):
+        row = self._connect().execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _executor(self):
+        # 저장은 한 스레드에서 순서대로 (상태 갱신 순서가 뒤바뀌지 않게)
+        if self._db_executor is None:
+            self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+        return self._db_executor
+
+    def _save(self, job: Job):
+        """상태 변경을 저장소에 기록 (요청 경로를 막지 않도록 기다리지 않음)"""
+        data = json.dumps(job.to_dict(), ensure_ascii=False, default=str)
+        future = self._executor().submit(self._db_save, job.id, data, job.updated_at)
+        future.add_done_callback(_log_save_error)
+
+    async def _load(self, job_id: str):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor(), self._db_load, job_id)
+        except Exception as e:
+            logging.warning(f"작업 상태 조회 실패: {job_id} ({e})")
+            return None
+
+    def submit(self, kind: str, work) -> Job:
+        """work(job) 코루틴을 백그라운드에서 실행하고 Job 반환"""
+        self._purge()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        job = Job(kind)
+        if self.path:
+            job._on_change = self._save
+            self._save(job)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job, work))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job, work):
+        try:
+            async with self._semaphore:
+                result = await work(job)
+        except asyncio.CancelledError:
+            logging.warning(f"백그라운드 작업 중단 ({job.kind} {job.id}): 서버 종료")
+            job.finish({"status": "error", "message": "서버 종료로 작업이 중단되었습니다. 다시 요청해 주세요."})
+            raise
+        except Overloaded as e:
+            # 업스트림 한도 초과/서킷 차단은 HTTP 429/503 대신 작업 결과로 전달
+            logging.warning(f"백그라운드 작업 거절 ({job.kind} {job.id}): {e}")
+            result = {"status": "error", "message": str(e), "status_code": e.status_code,
+                      "retry_after": e.retry_after_header}
+        except Exception as e:
+            logging.error(f"백그라운드 작업 실패 ({job.kind} {job.id}): {str(e)}")
+            result = {"status": "error", "message": f"작업 처리 중 오류가 발생했습니다: {str(e)}"}
+        job.finish(result)
+        logging.info(f"백그라운드 작업 종료 ({job.kind} {job.id}): {job.status}")
+
+    async def drain(self, timeout: float = JOB_DRAIN_TIMEOUT):
+        """종료 시 실행 중인 작업이 끝나기를 기다림
+
+        timeout 안에 끝나지 않은 작업은 취소하고 실패로 기록한다 (입력 임시 객체는 각 작업의 finally에서 해제).
+        마지막으로 저장 대기 중인 상태 기록을 모두 반영한다.
+        """
+        tasks = list(self._tasks)
+        if tasks:
+            logging.info("실행 중인 백그라운드 작업 %d개 종료 대기 (최대 %.0f초)", len(tasks), timeout)
+            started = time.monotonic()
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            logging.info("백그라운드 작업 정리 완료: %d개 완료, %d개 중단 (%.1f초)",
+                         len(tasks) - len(pending), len(pending), time.monotonic() - started)
+        if self._db_executor is not None:
+            await asyncio.to_thread(self._db_executor.shutdown, True)
+            self._db_executor = None
+
+    def stats(self) -> dict:
+        counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    async def get(self, job_id: str):
+        """이 워커의 작업, 없으면 공유 저장소에 기록된 다른 워커의 작업 (둘 다 없으면 None)"""
+        self._purge()
+        job = self._jobs.get(job_id)
+        if job is not None or not self.path:
+            return job
+        data = await self._load(job_id)
+        return StoredJob(self, data) if data is not None else None
+
+    def _purge(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and now - job.updated_at > self._result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+def _log_save_error(future):
+    if future.exception() is not None:
+        logging.warning(f"작업 상태 저장 실패: {future.exception()}")
+
+
+job_manager = JobManager()
@@ -0,0 +1,126 @@
+import os
+import time
+import signal
+import logging
+import asyncio
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 시작 직후 warm-up (PIL 코덱, 무거운 클라이언트 생성, 업스트림 DNS 조회/사전 연결)
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# warm-up 전체 제한 시간(초). 넘으면 남은 단계는 취소하고 준비 완료로 전환 (첫 요청만 느려짐)
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "20"))
+# 추가로 미리 연결할 주소 (쉼표 구분, 예: ModelsLab 결과 파일 CDN)
+WARMUP_URLS = [url.strip() for url in os.getenv("WARMUP_URLS", "").split(",") if url.strip()]
+# SIGTERM을 받으면 /readyz를 503으로 바꾸고 이 시간(초) 동안 요청을 계속 받은 뒤 종료 시작
+# (로드밸런서가 헬스 체크로 인스턴스를 빼는 데 걸리는 시간보다 길게). 0이면 바로 종료
+SHUTDOWN_DRAIN_DELAY = float(os.getenv("SHUTDOWN_DRAIN_DELAY", "10"))
+
+
+class Lifecycle:
+    """프로세스 준비 상태 관리 (/healthz, /readyz)
+
+    starting: warm-up 중 (트래픽을 받으면 첫 요청이 준비 비용을 냄)
+    ready: 트래픽 수신 가능
+    draining: 종료 중 (새 트래픽을 보내지 않아야 함)
+    """
+
+    def __init__(self):
+        self.state = "starting"
+        self.steps = {}  # 단계 이름 -> {"status", "ms", "error"}
+        self.warmup_ms = None
+        self._started = time.monotonic()
+        self._task = None
+        self._original_sigterm = None
+
+    def start(self, steps: dict):
+        """warm-up을 백그라운드로 시작 (steps: {이름: 인자 없는 코루틴 함수})"""
+        self._started = time.monotonic()
+        if not WARMUP_ENABLED:
+            self.state = "ready"
+            return
+        self._task = asyncio.create_task(self._warm_up(steps))
+
+    async def _run_step(self, name: str, step):
+        started = time.perf_counter()
+        try:
+            await step()
+            self.steps[name] = {"status": "ok"}
+        except asyncio.CancelledError:
+            self.steps[name] = {"status": "timeout"}
+            raise
+        except Exception as e:
+            # 준비 단계 실패는 치명적이지 않음 (해당 자원은 첫 사용 시 다시 초기화)
+            self.steps[name] = {"status": "error", "error": str(e)[:200]}
+            logging.warning("warm-up 단계 실패: %s (%s)", name, e)
+        finally:
+            self.steps[name]["ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def _warm_up(self, steps: dict):
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(self._run_step(name, step)) for name, step in steps.items()]
+        _, pending = await asyncio.wait(tasks, timeout=WARMUP_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        self.warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+        if self.state == "starting":
+            self.state = "ready"
+        logging.info("warm-up 완료: %.1fms %s", self.warmup_ms,
+                     ", ".join(f"{name}={step['status']}({step['ms']}ms)" for name, step in self.steps.items()))
+
+    def begin_drain(self):
+        """종료 시작: /readyz를 503으로 바꿔 로드밸런서가 새 요청을 보내지 않게 함"""
+        self.state = "draining"
+
+    def install_signal_handler(self, delay: float = SHUTDOWN_DRAIN_DELAY):
+        """SIGTERM을 받으면 바로 draining으로 바꾸고 delay초 뒤에 원래 처리기(uvicorn 종료)를 호출
+
+        uvicorn은 lifespan 종료 전에 연결을 받지 않으므로 stop()에서 바꾸면 로드밸런서가 draining을 볼 수 없다.
+        uvicorn이 시그널 처리기를 설치한 뒤(lifespan 시작 시) 호출해야 한다. 두 번째 SIGTERM은 바로 전달.
+        """
+        if delay <= 0 or threading.current_thread() is not threading.main_thread():
+            return
+        original = signal.getsignal(signal.SIGTERM)
+        if not callable(original):
+            return
+        loop = asyncio.get_running_loop()
+
+        def handle(sig, frame):
+            if self.state == "draining":
+                original(sig, frame)
+                return
+            self.begin_drain()
+            logging.info("SIGTERM 수신: %.0f초 동안 요청을 계속 받은 뒤 종료합니다", delay)
+            loop.call_soon_threadsafe(loop.call_later, delay, original, sig, frame)
+
+        signal.signal(signal.SIGTERM, handle)
+        self._original_sigterm = original
+
+    async def stop(self):
+        self.begin_drain()
+        if self._original_sigterm is not None and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self._original_sigterm)
+            self._original_sigterm = None
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "uptime": round(time.monotonic() - self._started, 1),
+            "warmup_ms": self.warmup_ms,
+            "steps": self.steps
+        }
+
+
+lifecycle = Lifecycle()
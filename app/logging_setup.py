@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from dotenv import load_dotenv
+from .tracing import current_trace_id
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json 또는 text
+# true면 이벤트 루프에서는 큐에 넣기만 하고 포맷/출력은 별도 스레드에서 수행
+LOG_QUEUE = os.getenv("LOG_QUEUE", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # 가득 차면 새 레코드는 버림
+# polling 같은 반복 로그: 같은 메시지는 LOG_SAMPLE_EVERY개 중 1개만, 분당 최대 LOG_RATE_PER_MINUTE개까지
+LOG_SAMPLE_EVERY = max(int(os.getenv("LOG_SAMPLE_EVERY", "1")), 1)
+LOG_RATE_PER_MINUTE = int(os.getenv("LOG_RATE_PER_MINUTE", "60"))
+
+# 반복 로그용 로거 (샘플링/속도 제한 적용)
+poll_logger = logging.getLogger("dearfam.poll")
+
+_listener = None
+_queue_handler = None
+_output = None
+
+
+class RateLimitFilter(logging.Filter):
+    """메시지 템플릿별 샘플링 + 분당 개수 제한 (WARNING 이상은 항상 통과)
+
+    지연 포맷(logging.info("... %s", value))을 쓰면 템플릿이 호출 위치마다 고정되므로
+    값이 달라도 같은 메시지로 묶인다. 버린 개수는 다음에 통과하는 레코드의 suppressed에 담긴다.
+    """
+
+    def __init__(self, sample_every: int = LOG_SAMPLE_EVERY, rate_per_minute: int = LOG_RATE_PER_MINUTE):
+        super().__init__()
+        self.sample_every = sample_every
+        self.rate_per_minute = rate_per_minute
+        self._state = {}  # 템플릿 -> [구간 시작, 구간 내 출력 수, 버린 수, 본 수]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        state = self._state.get(record.msg)
+        if state is None:
+            state = self._state[record.msg] = [now, 0, 0, 0]
+        if now - state[0] >= 60:
+            state[0], state[1] = now, 0
+        state[3] += 1
+        if (state[3] - 1) % self.sample_every or state[1] >= self.rate_per_minute:
+            state[2] += 1
+            return False
+        state[1] += 1
+        if state[2]:
+            record.suppressed = state[2]
+            state[2] = 0
+        return True
+
+
+class _ContextFilter(logging.Filter):
+    # 큐에 넣기 전(요청 컨텍스트 안)에 trace id를 레코드에 담음
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "trace_id"):
+            record.trace_id = current_trace_id()
+        return True
+
+
+class _LazyQueueHandler(QueueHandler):
+    """포맷하지 않고 레코드를 그대로 큐에 넣는 핸들러 (가득 차면 버림)"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 같은 프로세스 안의 큐이므로 직렬화용 사전 포맷이 필요 없음 (포맷은 리스너 스레드에서)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄에 하나의 JSON 레코드"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", None)
+        return f"{text} (+{suppressed}건 생략)" if suppressed else text
+
+
+def setup_logging():
+    """루트 로거 구성 (여러 번 호출해도 한 번만 적용)"""
+    global _listener, _queue_handler, _output
+    if _output is not None:
+        return
+
+    output = _output = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(_TextFormatter("%(levelname)s:%(name)s:%(message)s"))
+
+    if LOG_QUEUE:
+        _queue_handler = _LazyQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        handler = _queue_handler
+        _listener = QueueListener(_queue_handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    else:
+        handler = output
+    handler.addFilter(_ContextFilter())
+    if handler is not output:
+        # 리스너 종료 후 직접 출력할 때를 위해 (큐를 거친 레코드는 이미 trace id가 있음)
+        output.addFilter(_ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+
+    poll_logger.addFilter(RateLimitFilter())
+
+    # uvicorn 로그도 같은 경로/형식으로 출력
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+
+def shutdown_logging():
+    """큐에 남은 로그를 모두 출력하고 리스너 종료 (이후 로그는 바로 출력)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        logging.getLogger().handlers = [_output]
+
+
+def logging_stats() -> dict:
+    return {
+        "queue": LOG_QUEUE,
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0
+    }
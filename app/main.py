@@ -1,18 +1,271 @@
-from fastapi import FastAPI, File, UploadFile, Form
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, UploadFile, Form, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 import logging
+import hashlib
+import json
+import os
+import time
+import asyncio
+import re
+from typing import List, Literal
 from dotenv import load_dotenv
-from .ai_services import DiaryAIService, VideoAIService, CharacterAIService
-from .s3_util import upload_image_to_s3, delete_file_from_s3
+from .ai_services import DiaryAIService, VideoAIService, CharacterAIService, warm_up_openai, close_openai_client
+from .s3_util import shutdown_s3_executor
+from .blob_store import get_blob_store, served_store, upload_temp_image, new_key
+from .temp_janitor import temp_janitor
+from .http_client import init_http_session, close_http_session, preconnect
+from .lifecycle import lifecycle, WARMUP_URLS
+from .jobs import job_manager, JOB_MAX_WAIT
+from .result_cache import result_cache
+from . import modelslab
+from .poll_scheduler import poll_scheduler
+from .admission import upstream_limiters, Overloaded, admission_stats, log_rejection, ADMISSION_WORKERS
+from .resilience import get_circuit_breaker, circuit_stats
+from .tracing import TracingMiddleware, close_trace_output
+from .logging_setup import setup_logging, shutdown_logging, logging_stats
+from .metrics import MetricsMiddleware, stats_collector, render_metrics, track_stage, count_bytes, gauge, counter
+from .idempotency import request_coalescer, IdempotencyConflict, IDEMPOTENCY_AUTO_COALESCE
+from .image_processing import (
+    init_image_executor, warm_up_image_executor, shutdown_image_executor, preprocess_image_async, is_model_ready,
+    image_executor_ready, image_executor_stats, HEIF_SUPPORTED
+)
+from .upload_validation import (
+    UploadLimitMiddleware, UploadRejected, check_image, sniff_image, UPLOAD_MIN_BYTES, UPLOAD_MAX_BYTES, UPLOAD_SNIFF_BYTES
+)
 # 환경 변수 로드
 load_dotenv()
 
-# 로깅 설정
-logging.basicConfig(level=logging.INFO)
+# 로깅 설정 (구조화 JSON, 출력은 별도 스레드에서)
+setup_logging()
+
+# 일괄 캐릭터화: 요청당 최대 이미지 수, 요청 하나 안에서 동시에 처리할 이미지 수
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "20"))
+BATCH_MAX_CONCURRENCY = max(int(os.getenv("BATCH_MAX_CONCURRENCY", "4")), 1)
+
+# 업로드 허용 형식 (실제 바이트로 판별, HEIF는 pillow-heif가 있을 때만)
+UPLOAD_FORMATS = ("JPEG", "PNG", "HEIF") if HEIF_SUPPORTED else ("JPEG", "PNG")
+UPLOAD_CONTENT_TYPES = {"image/jpeg": "jpg", "image/jpg": "jpg", "image/png": "png"}
+# 용도별 직접 업로드 위치 (temp/{디렉토리}/)
+UPLOAD_DIRECTORIES = {"animate": "images", "characterize": "character"}
+
+CHARACTER_PROMPT = "Ghibli Studio style, Charming hand-drawn anime-style illustration"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """앱 시작/종료 시 공유 리소스 관리
+
+    무거운 준비 작업(warm-up)은 백그라운드로 돌리고 끝나면 /readyz가 200이 된다.
+    """
+    modelslab.check_webhook_config()
+    logging.info(f"업스트림 한도를 워커 {ADMISSION_WORKERS}개로 나눠 적용 (pid {os.getpid()})")
+    await init_http_session()
+    init_image_executor()
+    poll_scheduler.start()
+    temp_janitor.start()
+    lifecycle.start({
+        "image_codecs": warm_up_image_executor,
+        "openai": warm_up_openai,
+        "storage": lambda: get_blob_store().warm_up(),
+        "upstreams": lambda: preconnect([modelslab.MODELSLAB_BASE_URL, *WARMUP_URLS]),
+    })
+    # SIGTERM 직후부터 /readyz가 draining을 알리도록 (연결을 닫기 전에)
+    lifecycle.install_signal_handler()
+    try:
+        yield
+    finally:
+        await lifecycle.stop()
+        # 실행 중인 비동기 작업을 먼저 마무리 (폴링/업로드/임시 객체 정리 자원이 아직 살아 있어야 함)
+        await job_manager.drain()
+        await poll_scheduler.stop()
+        await temp_janitor.stop()
+        await close_openai_client()
+        await close_http_session()
+        shutdown_s3_executor()
+        shutdown_image_executor()
+        close_trace_output()
+        shutdown_logging()
+
 
 # FastAPI 앱 생성
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# 업로드 본문은 받는 중에 크기/형식 검사 (경로: (최대 파일 수, 앞부분 형식 검사 여부))
+# 일괄 업로드는 한 장이 잘못돼도 나머지는 처리하도록 형식 검사는 이미지별로 수행
+app.add_middleware(UploadLimitMiddleware, allowed_formats=UPLOAD_FORMATS, paths={
+    "/animate-image": (1, True),
+    "/characterize-image": (1, True),
+    "/characterize-images": (BATCH_MAX_IMAGES, False),
+})
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), name="static")
+
+
+@app.exception_handler(UploadRejected)
+async def upload_rejected_handler(request: Request, e: UploadRejected):
+    """업로드 검증 실패 (본문 수신 중 거절 포함)"""
+    return JSONResponse({"status": "error", "message": e.message}, status_code=e.status_code)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, e: Overloaded):
+    """업스트림 한도 초과 시 대기하지 않고 429/503 + Retry-After로 응답"""
+    log_rejection(e)
+    return JSONResponse({
+        "status": "error",
+        "message": "요청이 많아 지금은 처리할 수 없습니다. 잠시 후 다시 시도해주세요.",
+        "upstream": e.upstream
+    }, status_code=e.status_code, headers={"Retry-After": e.retry_after_header})
+
+
+def _validate_image(image_data: bytes):
+    """업로드 이미지 크기/형식/해상도 검증 (문제가 있으면 에러 응답 반환)
+
+    형식은 클라이언트가 보낸 Content-Type 대신 실제 바이트(매직 넘버)로 판별하고,
+    해상도가 너무 큰 이미지는 디코딩 전에 거절한다.
+    """
+    error_response = _validate_image_size(len(image_data))
+    if error_response:
+        return error_response
+
+    try:
+        check_image(image_data, UPLOAD_FORMATS)
+    except UploadRejected as e:
+        return JSONResponse({"status": "error", "message": e.message}, status_code=e.status_code)
+
+    return None
+
+
+def _validate_image_size(size: int):
+    # 최소 30KB, 최대 10MB
+    if size < UPLOAD_MIN_BYTES:
+        return JSONResponse({
+            "status": "error",
+            "message": "이미지 용량이 너무 작습니다. 최소 30KB 이상 이미지를 업로드해주세요."
+        }, status_code=400)
+
+    if size > UPLOAD_MAX_BYTES:
+        return JSONResponse({
+            "status": "error",
+            "message": "파일 크기가 너무 큽니다. 10MB 이하로 업로드해주세요."
+        }, status_code=400)
+
+    return None
+
+
+def _unsupported_format_response() -> JSONResponse:
+    return JSONResponse({
+        "status": "error",
+        "message": "지원하지 않는 파일 형식입니다. JPEG, PNG 파일만 업로드 가능합니다."
+    }, status_code=400)
+
+
+async def _normalize_image(image_data: bytes, profile: str, info: dict = None) -> tuple:
+    """모델 입력용 이미지로 정규화 (방향 수정, EXIF 제거, 모델 해상도로 축소)
+
+    (이미지 바이트, 확장자, SHA-256)을 반환. 이미 모델 입력 조건을 만족하면(EXIF 없는 작은 JPEG) 다시 인코딩하지 않는다.
+    multipart/직접 업로드 어느 경로로 와도 같은 이미지는 같은 해시가 되어 결과 캐시 키가 일치한다.
+    """
+    info = info if info is not None else sniff_image(image_data)
+    if info and is_model_ready(info, len(image_data), profile):
+        normalized, ext = image_data, "jpg"
+    else:
+        # 디코딩/회전/인코딩은 CPU 작업이므로 전처리 실행기에서 수행
+        with track_stage("preprocess"):
+            normalized, ext = await preprocess_image_async(image_data, profile)
+        logging.info(f"이미지 정규화 완료: {len(image_data)} -> {len(normalized)} bytes ({ext})")
+    return normalized, ext, hashlib.sha256(normalized).hexdigest()
+
+
+async def _upload_normalized_image(image_data: bytes, ext: str, directory: str) -> str:
+    """정규화한 이미지를 임시 저장소에 업로드하고 URL 반환 (임시 객체로 기록)"""
+    with track_stage("temp_upload"):
+        image_url = await upload_temp_image(image_data, directory, ext)
+    await temp_janitor.track_url(image_url, len(image_data))
+    logging.info(f"이미지 방향 수정 후 임시 업로드 완료: {image_url}")
+    return image_url
+
+
+async def _cached_response(kind: str, result: dict, async_mode: bool) -> JSONResponse:
+    """캐시된 결과 응답 (async_mode면 바로 끝나는 작업으로 접수해 응답 형식 유지)"""
+    if async_mode:
+        async def work(job):
+            return result
+
+        return await _accept_job(kind, work)
+    return JSONResponse(result)
+
+
+def _admit(upstream: str):
+    """업스트림 서킷이 열려 있거나 한도를 넘었으면 Overloaded (429/503)"""
+    get_circuit_breaker(upstream).check()
+    upstream_limiters[upstream].check()
+
+
+def _server_timing(timings: dict) -> str:
+    return ", ".join(f"{name};dur={duration}" for name, duration in timings.items())
+
+
+async def _accept_job(kind: str, work) -> JSONResponse:
+    """백그라운드 작업을 등록하고 바로 job_id 반환 (대기열/ModelsLab 접수 결과는 /jobs/{job_id}로 확인)"""
+    job = job_manager.submit(kind, work)
+    logging.info(f"비동기 작업 접수: {kind} {job.id}")
+    return JSONResponse({**job.to_dict(), "status_url": f"/jobs/{job.id}"}, status_code=202)
+
+
+def _fingerprint(*parts) -> str:
+    """요청 내용 해시 (동일 요청 판별용)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _is_replayable(response: Response) -> bool:
+    # 성공 응답만 재사용 (실패는 재시도 시 다시 처리)
+    if response.status_code >= 400:
+        return False
+    try:
+        return json.loads(response.body).get("status") != "error"
+    except Exception:
+        return False
+
+
+async def _coalesce(request: Request, endpoint: str, fingerprint: str, work) -> Response:
+    """Idempotency-Key 재사용 및 동일 요청 합치기
+
+    Idempotency-Key가 있으면 같은 키의 진행 중 요청에 합류하고, 완료된 성공 응답은 재사용한다.
+    키가 없으면 내용이 같은 요청이 동시에 진행 중일 때만 합친다.
+    """
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if idempotency_key:
+        key = f"{endpoint}:key:{idempotency_key}"
+        replayable = _is_replayable
+    elif IDEMPOTENCY_AUTO_COALESCE:
+        key = f"{endpoint}:auto:{fingerprint}"
+        replayable = None
+    else:
+        return await work()
+
+    try:
+        response, shared = await request_coalescer.run(key, fingerprint, work, replayable)
+    except IdempotencyConflict:
+        return JSONResponse({
+            "status": "error",
+            "message": "같은 Idempotency-Key로 내용이 다른 요청이 들어왔습니다."
+        }, status_code=422)
+
+    if not shared:
+        return response
+    # 다른 요청의 응답 객체를 복사해서 반환
+    headers = dict(response.headers)
+    headers["Idempotent-Replayed"] = "true"
+    return Response(content=response.body, status_code=response.status_code, headers=headers)
+
 
 # 일기 생성 API 요청 모델
 class DiaryRequest(BaseModel):
@@ -20,96 +273,91 @@ class DiaryRequest(BaseModel):
 
 
 @app.post("/generate-diary")
-async def generate_diary(req: DiaryRequest):
+async def generate_diary(req: DiaryRequest, request: Request):
     """일기 생성 API"""
     user_text = req.user_text
     logging.info(f"일기 생성 요청: {user_text[:50]}...")
+    _admit("openai_chat")
 
-    result = await DiaryAIService.generate_diary(user_text)
-    
-    logging.info(f"일기 생성 완료")
-    return JSONResponse(result)
+    async def work():
+        result = await DiaryAIService.generate_diary(user_text)
+        
+        logging.info(f"일기 생성 완료")
+        # 단계별 소요 시간은 본문 대신 Server-Timing 헤더로 전달
+        timings = result.pop("timings", {})
+        headers = {"Server-Timing": _server_timing(timings)} if timings else None
+        return JSONResponse(result, headers=headers)
+
+    return await _coalesce(request, "generate-diary", _fingerprint(user_text), work)
+
+
+@app.post("/generate-diary/stream")
+async def generate_diary_stream(req: DiaryRequest):
+    """일기 생성 스트리밍 API (Server-Sent Events)"""
+    user_text = req.user_text
+    logging.info(f"일기 스트리밍 생성 요청: {user_text[:50]}...")
+    _admit("openai_chat")
+
+    async def event_stream():
+        async for event, data in DiaryAIService.stream_diary(user_text):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        logging.info(f"일기 스트리밍 생성 완료")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.post("/animate-image")
 async def animate_image(
+    request: Request,
     image: UploadFile = File(..., description="영상화할 이미지 파일"),
-    prompt: str = Form(..., description="영상화 프롬프트")
+    prompt: str = Form(..., description="영상화 프롬프트"),
+    async_mode: bool = Form(False, description="true면 접수 직후 job_id를 반환하고 /jobs/{job_id}로 결과 조회")
 ):
     """사진 영상화 API"""
     try:
         # 이미지 파일 읽기
         image_data = await image.read()
-        logging.info(f"영상화 요청: {image.filename}, 프롬프트: {prompt[:50]}...")
-        logging.info(f"요청 content_type: {image.content_type}")
-        logging.info(f"요청 파일 크기: {len(image_data)} bytes")
-        logging.info(f"요청 프롬프트: {prompt}")
+        count_bytes("in", "client", len(image_data))
+    except Exception as e:
+        logging.error(f"영상화 처리 중 오류: {str(e)}")
+        return JSONResponse({
+            "status": "error",
+            "message": f"영상화 처리 중 오류가 발생했습니다: {str(e)}"
+        }, status_code=500)
 
-        # 최소 파일 크기 30KB 제한
-        if len(image_data) < 30 * 1024:  # 30KB
-            return JSONResponse({
-                "status": "error",
-                "message": "이미지 용량이 너무 작습니다. 최소 30KB 이상 이미지를 업로드해주세요."
-            }, status_code=400)
+    fingerprint = _fingerprint(image_data, prompt, async_mode)
+    return await _coalesce(
+        request, "animate-image", fingerprint,
+        lambda: _animate_image(image_data, image.filename, image.content_type, prompt, async_mode)
+    )
 
-        # 파일 크기 검증 (예: 10MB 제한)
-        if len(image_data) > 10 * 1024 * 1024:  # 10MB
-            return JSONResponse({
-                "status": "error",
-                "message": "파일 크기가 너무 큽니다. 10MB 이하로 업로드해주세요."
-            }, status_code=400)
 
-        # 파일 형식 검증
-        allowed_types = ["image/jpeg", "image/png", "image/jpg"]
-        if image.content_type not in allowed_types:
-            return JSONResponse({
-                "status": "error", 
-                "message": "지원하지 않는 파일 형식입니다. JPEG, PNG 파일만 업로드 가능합니다."
-            }, status_code=400)
+async def _animate_image(image_data: bytes, filename: str, content_type: str, prompt: str, async_mode: bool) -> JSONResponse:
+    try:
+        logging.info("영상화 요청: %s (%s, %d bytes), 프롬프트: %.50s", filename, content_type, len(image_data), prompt)
 
-        # 이미지 방향 수정 (EXIF 정보 제거)
-        from PIL import Image
-        import io
-        
-        # PIL로 이미지 열기
-        image = Image.open(io.BytesIO(image_data))
-        
-        # EXIF 정보 제거하고 올바른 방향으로 회전
-        if hasattr(image, '_getexif') and image._getexif() is not None:
-            exif = image._getexif()
-            orientation = exif.get(274)  # EXIF orientation tag
-            if orientation:
-                # 방향에 따라 회전
-                if orientation == 3:
-                    image = image.rotate(180, expand=True)
-                elif orientation == 6:
-                    image = image.rotate(270, expand=True)
-                elif orientation == 8:
-                    image = image.rotate(90, expand=True)
-        
-        # 이미지를 PNG로 변환 (EXIF 정보 제거)
-        output_buffer = io.BytesIO()
-        image.save(output_buffer, format='PNG')
-        corrected_image_data = output_buffer.getvalue()
-        
-        # 수정된 이미지를 S3에 임시 업로드
-        image_url = upload_image_to_s3(corrected_image_data, "images", "png")
-        logging.info(f"이미지 방향 수정 후 임시 업로드 완료: {image_url}")
+        # 파일 크기/형식 검증
+        error_response = _validate_image(image_data)
+        if error_response:
+            return error_response
 
-        # 영상화 처리 (비디오를 S3에 저장)
-        result = await VideoAIService.animate_image(image_url, prompt)
-        
-        # 영상화 완료 후 임시 이미지 삭제
-        if result.get('status') == 'success':
-            delete_success = delete_file_from_s3(image_url)
-            if delete_success:
-                logging.info(f"임시 이미지 삭제 완료: {image_url}")
-            else:
-                logging.warning(f"임시 이미지 삭제 실패: {image_url}")
-        
-        logging.info(f"영상화 완료: {result.get('status', 'unknown')}")
-        return JSONResponse(result)
+        # 한도를 넘었으면 전처리/업로드 전에 거절
+        _admit("modelslab_video")
+
+        # 정규화한 이미지로 캐시를 먼저 확인하고, 없을 때만 임시 업로드 후 영상화
+        normalized, ext, image_digest = await _normalize_image(image_data, "video")
+        cached = await VideoAIService.cached_result(image_digest, prompt)
+        if cached:
+            return await _cached_response("animate", cached, async_mode)
+        image_url = await _upload_normalized_image(normalized, ext, "images")
+        return await _run_animate(image_url, image_digest, prompt, async_mode)
 
+    except Overloaded:
+        raise
     except Exception as e:
         logging.error(f"영상화 처리 중 오류: {str(e)}")
         return JSONResponse({
@@ -118,88 +366,517 @@ async def animate_image(
         }, status_code=500)
 
 
+async def _run_animate(image_url: str, image_digest: str, prompt: str, async_mode: bool) -> JSONResponse:
+    """임시 이미지로 영상화 실행 (async_mode면 작업 접수 후 202)"""
+    if async_mode:
+        async def work(job):
+            try:
+                return await VideoAIService.animate_image(
+                    image_url, prompt, on_progress=job.update, image_digest=image_digest
+                )
+            finally:
+                temp_janitor.release_url(image_url)
+
+        return await _accept_job("animate", work)
+
+    # 영상화 처리 (비디오를 S3에 저장). 성공/실패와 관계없이 임시 이미지는 백그라운드에서 삭제
+    try:
+        result = await VideoAIService.animate_image(image_url, prompt, image_digest=image_digest)
+    finally:
+        temp_janitor.release_url(image_url)
+
+    logging.info(f"영상화 완료: {result.get('status', 'unknown')}")
+    return JSONResponse(result)
+
+
+async def _run_characterize(image_url: str, image_digest: str, async_mode: bool) -> JSONResponse:
+    """임시 이미지로 캐릭터화 실행 (async_mode면 작업 접수 후 202)"""
+    prompt = CHARACTER_PROMPT
+    if async_mode:
+        async def work(job):
+            try:
+                return await CharacterAIService.characterize_image(
+                    image_url, prompt, on_progress=job.update, image_digest=image_digest
+                )
+            finally:
+                temp_janitor.release_url(image_url)
+
+        return await _accept_job("characterize", work)
+
+    # 캐릭터화 처리. 성공/실패와 관계없이 임시 이미지는 백그라운드에서 삭제
+    try:
+        result = await CharacterAIService.characterize_image(image_url, prompt, image_digest=image_digest)
+    finally:
+        temp_janitor.release_url(image_url)
+
+    logging.info(f"캐릭터화 완료: {result.get('status', 'unknown')}")
+    return JSONResponse(result)
+
+
 @app.post("/characterize-image")
 async def characterize_image(
-    image: UploadFile = File(..., description="캐릭터화할 이미지 파일")
+    request: Request,
+    image: UploadFile = File(..., description="캐릭터화할 이미지 파일"),
+    async_mode: bool = Form(False, description="true면 접수 직후 job_id를 반환하고 /jobs/{job_id}로 결과 조회")
 ):
     """사진 캐릭터화 API"""
-    prompt = "Ghibli Studio style, Charming hand-drawn anime-style illustration"
     try:
         # 이미지 파일 읽기
         image_data = await image.read()
-        logging.info(f"캐릭터화 요청: {image.filename}, 프롬프트: {prompt[:50]}...")
-        logging.info(f"요청 content_type: {image.content_type}")
-        logging.info(f"요청 파일 크기: {len(image_data)} bytes")
-        logging.info(f"요청 프롬프트: {prompt}")
+        count_bytes("in", "client", len(image_data))
+    except Exception as e:
+        logging.error(f"캐릭터화 처리 중 오류: {str(e)}")
+        return JSONResponse({
+            "status": "error",
+            "message": f"캐릭터화 처리 중 오류가 발생했습니다: {str(e)}"
+        }, status_code=500)
+
+    fingerprint = _fingerprint(image_data, async_mode)
+    return await _coalesce(
+        request, "characterize-image", fingerprint,
+        lambda: _characterize_image(image_data, image.filename, image.content_type, async_mode)
+    )
+
+
+async def _characterize_image(image_data: bytes, filename: str, content_type: str, async_mode: bool) -> JSONResponse:
+    prompt = CHARACTER_PROMPT
+    try:
+        logging.info("캐릭터화 요청: %s (%s, %d bytes), 프롬프트: %.50s", filename, content_type, len(image_data), prompt)
+
+        # 파일 크기/형식 검증
+        error_response = _validate_image(image_data)
+        if error_response:
+            return error_response
 
-        # 최소 파일 크기 30KB 제한
-        if len(image_data) < 30 * 1024:  # 30KB
+        # 한도를 넘었으면 전처리/업로드 전에 거절
+        _admit("modelslab_controlnet")
+
+        # 정규화한 이미지로 캐시를 먼저 확인하고, 없을 때만 임시 업로드 후 캐릭터화
+        normalized, ext, image_digest = await _normalize_image(image_data, "character")
+        cached = await CharacterAIService.cached_result(image_digest, prompt)
+        if cached:
+            return await _cached_response("characterize", cached, async_mode)
+        image_url = await _upload_normalized_image(normalized, ext, "character")
+        return await _run_characterize(image_url, image_digest, async_mode)
+
+    except Overloaded:
+        raise
+    except Exception as e:
+        logging.error(f"캐릭터화 처리 중 오류: {str(e)}")
+        return JSONResponse({
+            "status": "error",
+            "message": f"캐릭터화 처리 중 오류가 발생했습니다: {str(e)}"
+        }, status_code=500)
+
+
+# S3 직접 업로드 요청 모델
+class PresignRequest(BaseModel):
+    purpose: Literal["animate", "characterize"] = Field(..., description="업로드 용도")
+    content_type: str = Field("image/jpeg", description="image/jpeg 또는 image/png")
+    method: Literal["post", "put"] = Field("post", description="post: 브라우저 폼 업로드(크기 제한 포함), put: 본문 그대로 업로드")
+
+
+class UploadedAnimateRequest(BaseModel):
+    key: str = Field(..., description="/uploads/presign으로 발급받아 업로드를 마친 S3 키")
+    prompt: str = Field(..., description="영상화 프롬프트")
+    async_mode: bool = Field(False, description="true면 접수 직후 job_id를 반환하고 /jobs/{job_id}로 결과 조회")
+
+
+class UploadedCharacterizeRequest(BaseModel):
+    key: str = Field(..., description="/uploads/presign으로 발급받아 업로드를 마친 S3 키")
+    async_mode: bool = Field(False, description="true면 접수 직후 job_id를 반환하고 /jobs/{job_id}로 결과 조회")
+
+
+@app.post("/uploads/presign")
+async def presign_upload(req: PresignRequest):
+    """S3 직접 업로드 URL 발급 API
+
+    클라이언트는 발급받은 URL로 사진을 S3에 바로 올린 뒤 key로 /animate-image/s3, /characterize-image/s3를 호출한다.
+    """
+    ext = UPLOAD_CONTENT_TYPES.get(req.content_type)
+    if ext is None:
+        return _unsupported_format_response()
+
+    content_type = "image/jpeg" if ext == "jpg" else req.content_type
+    key = new_key(f"temp/{UPLOAD_DIRECTORIES[req.purpose]}", ext)
+    try:
+        upload = get_blob_store().presign_upload(key, content_type, req.method, UPLOAD_MIN_BYTES, UPLOAD_MAX_BYTES)
+    except NotImplementedError:
+        return JSONResponse({
+            "status": "error",
+            "message": "현재 저장소는 직접 업로드를 지원하지 않습니다."
+        }, status_code=501)
+    # 업로드 후 사용하지 않은 객체도 고아로 회수되도록 발급 시점에 기록
+    await temp_janitor.track(get_blob_store(), key)
+    logging.info("직접 업로드 URL 발급: %s (%s)", upload["key"], upload["method"])
+    return JSONResponse({"status": "success", **upload})
+
+
+def _is_upload_key(key: str, directory: str) -> bool:
+    # presign으로 발급한 형식의 키만 허용 (다른 경로 접근 방지)
+    return re.fullmatch(rf"temp/{directory}/[0-9a-f]{{32}}\.(jpg|png)", key) is not None
+
+
+async def _validate_uploaded_image(key: str, directory: str) -> tuple:
+    """직접 업로드된 이미지를 앞부분만 읽어(Range GET) 검증
+
+    (에러 응답, 앞부분 정보)를 반환. 검증에 실패한 객체는 바로 삭제한다.
+    """
+    if not _is_upload_key(key, directory):
+        return JSONResponse({"status": "error", "message": "잘못된 업로드 키입니다."}, status_code=400), None
+
+    store = get_blob_store()
+    with track_stage("upload_inspect"):
+        blob = await store.get(key, 0, UPLOAD_SNIFF_BYTES)
+    if blob is None:
+        return JSONResponse({"status": "error", "message": "업로드된 이미지를 찾을 수 없습니다."}, status_code=404), None
+
+    head = {"size": blob.size, "etag": blob.etag}
+    error_response = _validate_image_size(blob.size)
+    if error_response is None:
+        body = bytes(blob.body)
+        try:
+            head["info"] = check_image(body, UPLOAD_FORMATS, complete=len(body) >= blob.size)
+        except UploadRejected as e:
+            logging.warning("업로드 이미지 거절: %s (%s)", key, e.message)
+            error_response = JSONResponse({"status": "error", "message": e.message}, status_code=e.status_code)
+
+    if error_response is not None:
+        temp_janitor.release(store, key)
+        return error_response, None
+    await temp_janitor.track(store, key, blob.size)
+    return None, head
+
+
+async def _normalize_uploaded_image(key: str, profile: str, head: dict) -> tuple:
+    """직접 업로드된 이미지를 받아 multipart 경로와 같은 방식으로 정규화
+
+    (원본 바이트, 정규화된 바이트, 확장자, SHA-256)을 반환.
+    """
+    with track_stage("upload_download"):
+        blob = await get_blob_store().get(key)
+    if blob is None:
+        raise UploadRejected(404, "업로드된 이미지를 찾을 수 없습니다.")
+    image_data = bytes(blob.body)
+    info = head["info"]
+    if info["width"] is None:
+        # 앞부분에서 해상도를 찾지 못한 경우 전체로 다시 검증 (큰 EXIF 썸네일 등)
+        info = check_image(image_data, UPLOAD_FORMATS)
+    normalized, ext, image_digest = await _normalize_image(image_data, profile, info)
+    return image_data, normalized, ext, image_digest
+
+
+async def _uploaded_image_url(key: str, directory: str, image_data: bytes, normalized: bytes, ext: str) -> str:
+    """직접 업로드된 이미지의 모델 입력 URL
+
+    이미 모델 입력 조건을 만족해 그대로 쓰는 경우 업로드된 객체를 바로 쓰고(다시 올리지 않음),
+    아니면 정규화한 이미지를 새 임시 이미지로 올리고 원본은 삭제한다.
+    """
+    store = get_blob_store()
+    if normalized is image_data:
+        logging.info("업로드 원본 사용: %s (%d bytes)", key, len(image_data))
+        return store.public_url(key)
+    image_url = await _upload_normalized_image(normalized, ext, directory)
+    temp_janitor.release(store, key)
+    return image_url
+
+
+@app.post("/animate-image/s3")
+async def animate_uploaded_image(req: UploadedAnimateRequest, request: Request):
+    """S3에 직접 업로드된 사진 영상화 API"""
+    async def work():
+        try:
+            logging.info("영상화 요청(직접 업로드): %s, 프롬프트: %.50s", req.key, req.prompt)
+            # 한도를 넘었으면 S3에서 읽기 전에 거절
+            _admit("modelslab_video")
+
+            error_response, head = await _validate_uploaded_image(req.key, "images")
+            if error_response:
+                return error_response
+
+            image_data, normalized, ext, image_digest = await _normalize_uploaded_image(req.key, "video", head)
+            cached = await VideoAIService.cached_result(image_digest, req.prompt)
+            if cached:
+                temp_janitor.release(get_blob_store(), req.key)
+                return await _cached_response("animate", cached, req.async_mode)
+            image_url = await _uploaded_image_url(req.key, "images", image_data, normalized, ext)
+            return await _run_animate(image_url, image_digest, req.prompt, req.async_mode)
+
+        except (Overloaded, UploadRejected):
+            raise
+        except Exception as e:
+            logging.error(f"영상화 처리 중 오류: {str(e)}")
             return JSONResponse({
                 "status": "error",
-                "message": "이미지 용량이 너무 작습니다. 최소 30KB 이상 이미지를 업로드해주세요."
-            }, status_code=400)
+                "message": f"영상화 처리 중 오류가 발생했습니다: {str(e)}"
+            }, status_code=500)
+
+    fingerprint = _fingerprint(req.key, req.prompt, req.async_mode)
+    return await _coalesce(request, "animate-image-s3", fingerprint, work)
 
-        # 파일 크기 검증 (예: 10MB 제한)
-        if len(image_data) > 10 * 1024 * 1024:  # 10MB
+
+@app.post("/characterize-image/s3")
+async def characterize_uploaded_image(req: UploadedCharacterizeRequest, request: Request):
+    """S3에 직접 업로드된 사진 캐릭터화 API"""
+    async def work():
+        try:
+            logging.info("캐릭터화 요청(직접 업로드): %s", req.key)
+            # 한도를 넘었으면 S3에서 읽기 전에 거절
+            _admit("modelslab_controlnet")
+
+            error_response, head = await _validate_uploaded_image(req.key, "character")
+            if error_response:
+                return error_response
+
+            image_data, normalized, ext, image_digest = await _normalize_uploaded_image(req.key, "character", head)
+            cached = await CharacterAIService.cached_result(image_digest, CHARACTER_PROMPT)
+            if cached:
+                temp_janitor.release(get_blob_store(), req.key)
+                return await _cached_response("characterize", cached, req.async_mode)
+            image_url = await _uploaded_image_url(req.key, "character", image_data, normalized, ext)
+            return await _run_characterize(image_url, image_digest, req.async_mode)
+
+        except (Overloaded, UploadRejected):
+            raise
+        except Exception as e:
+            logging.error(f"캐릭터화 처리 중 오류: {str(e)}")
             return JSONResponse({
                 "status": "error",
-                "message": "파일 크기가 너무 큽니다. 10MB 이하로 업로드해주세요."
-            }, status_code=400)
+                "message": f"캐릭터화 처리 중 오류가 발생했습니다: {str(e)}"
+            }, status_code=500)
 
-        # 파일 형식 검증
-        allowed_types = ["image/jpeg", "image/png", "image/jpg"]
-        if image.content_type not in allowed_types:
-            return JSONResponse({
-                "status": "error", 
-                "message": "지원하지 않는 파일 형식입니다. JPEG, PNG 파일만 업로드 가능합니다."
-            }, status_code=400)
+    fingerprint = _fingerprint(req.key, req.async_mode)
+    return await _coalesce(request, "characterize-image-s3", fingerprint, work)
 
-        # 이미지 방향 수정 (EXIF 정보 제거)
-        from PIL import Image
-        import io
-        
-        # PIL로 이미지 열기
-        image = Image.open(io.BytesIO(image_data))
-        
-        # EXIF 정보 제거하고 올바른 방향으로 회전
-        if hasattr(image, '_getexif') and image._getexif() is not None:
-            exif = image._getexif()
-            orientation = exif.get(274)  # EXIF orientation tag
-            if orientation:
-                # 방향에 따라 회전
-                if orientation == 3:
-                    image = image.rotate(180, expand=True)
-                elif orientation == 6:
-                    image = image.rotate(270, expand=True)
-                elif orientation == 8:
-                    image = image.rotate(90, expand=True)
-        
-        # 이미지를 PNG로 변환 (EXIF 정보 제거)
-        output_buffer = io.BytesIO()
-        image.save(output_buffer, format='PNG')
-        corrected_image_data = output_buffer.getvalue()
-        
-        # 수정된 이미지를 S3에 임시 업로드
-        image_url = upload_image_to_s3(corrected_image_data, "character", "png")
-        logging.info(f"이미지 방향 수정 후 임시 업로드 완료: {image_url}")
 
-        # 캐릭터화 처리
-        result = await CharacterAIService.characterize_image(image_url, prompt)
-        
-        # 캐릭터화 완료 후 임시 이미지 삭제
-        if result.get('status') == 'success':
-            delete_success = delete_file_from_s3(image_url)
-            if delete_success:
-                logging.info(f"임시 이미지 삭제 완료: {image_url}")
-            else:
-                logging.warning(f"임시 이미지 삭제 실패: {image_url}")
-        
-        logging.info(f"캐릭터화 완료: {result.get('status', 'unknown')}")
-        return JSONResponse(result)
+@app.post("/characterize-images")
+async def characterize_images(
+    images: List[UploadFile] = File(..., description="캐릭터화할 이미지 파일들"),
+    stream_format: str = Form("ndjson", description="결과 스트림 형식: ndjson 또는 sse")
+):
+    """여러 사진 일괄 캐릭터화 API
 
-    except Exception as e:
-        logging.error(f"캐릭터화 처리 중 오류: {str(e)}")
+    이미지들을 BATCH_MAX_CONCURRENCY개씩 동시에 처리하고, 끝나는 순서대로 한 건씩 결과를 스트리밍한다.
+    각 결과에는 업로드 순서(index)가 담기며, 마지막에 요약(done) 이벤트를 보낸다.
+    """
+    if stream_format not in ("ndjson", "sse"):
+        return JSONResponse({"status": "error", "message": "stream_format은 ndjson 또는 sse만 가능합니다."}, status_code=400)
+    if len(images) > BATCH_MAX_IMAGES:
         return JSONResponse({
             "status": "error",
-            "message": f"캐릭터화 처리 중 오류가 발생했습니다: {str(e)}"
-        }, status_code=500)
\ No newline at end of file
+            "message": f"한 번에 최대 {BATCH_MAX_IMAGES}장까지 업로드할 수 있습니다."
+        }, status_code=400)
+
+    # 스트리밍 응답이 시작되면 업로드 파일이 닫힐 수 있으므로 미리 읽어둠
+    items = []
+    for image in images:
+        image_data = await image.read()
+        count_bytes("in", "client", len(image_data))
+        items.append((image.filename, image.content_type, image_data))
+    logging.info("일괄 캐릭터화 요청: %d장", len(items))
+
+    # 서킷이 열려 있거나 대기열이 가득 찼으면 전체를 바로 거절
+    _admit("modelslab_controlnet")
+
+    return StreamingResponse(
+        _characterize_batch(items, stream_format),
+        media_type="text/event-stream" if stream_format == "sse" else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _characterize_batch(items: list, stream_format: str):
+    """이미지별 캐릭터화를 동시 실행하고 완료 순서대로 결과 줄을 생성"""
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    started = time.perf_counter()
+
+    async def characterize_one(index: int, filename: str, content_type: str, image_data: bytes) -> dict:
+        async with semaphore:
+            item_started = time.perf_counter()
+            try:
+                response = await _characterize_image(image_data, filename, content_type, False)
+                result = {"status_code": response.status_code, **json.loads(response.body)}
+            except Overloaded as e:
+                log_rejection(e)
+                result = {
+                    "status_code": e.status_code,
+                    "status": "error",
+                    "message": "요청이 많아 지금은 처리할 수 없습니다. 잠시 후 다시 시도해주세요.",
+                    "retry_after": int(e.retry_after_header)
+                }
+            return {"index": index, "filename": filename, **result,
+                    "elapsed": round(time.perf_counter() - item_started, 3)}
+
+    def encode(event: str, data: dict) -> str:
+        if stream_format == "sse":
+            return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        return json.dumps({"event": event, **data}, ensure_ascii=False) + "\n"
+
+    tasks = [asyncio.create_task(characterize_one(index, *item)) for index, item in enumerate(items)]
+    succeeded = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            if result.get("status") == "success":
+                succeeded += 1
+            yield encode("result", result)
+        elapsed = time.perf_counter() - started
+        logging.info("일괄 캐릭터화 완료: %d/%d장 성공, %.2fs", succeeded, len(items), elapsed)
+        yield encode("done", {"total": len(items), "succeeded": succeeded, "failed": len(items) - succeeded,
+                              "elapsed": round(elapsed, 3)})
+    finally:
+        # 클라이언트가 연결을 끊으면 남은 작업을 취소하고, 임시 이미지 정리까지 끝날 때까지 기다림
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="상태가 바뀔 때까지 최대 대기할 시간(초, 롱폴링)")
+):
+    """비동기 작업 상태 조회 API"""
+    job = await job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({
+            "status": "error",
+            "message": "작업을 찾을 수 없습니다."
+        }, status_code=404)
+
+    await job.wait_changed(min(wait, JOB_MAX_WAIT))
+    return JSONResponse(job.to_dict())
+
+
+@app.post("/webhooks/modelslab")
+async def modelslab_webhook(request: Request):
+    """ModelsLab 작업 완료 웹훅 수신 API (MODELSLAB_WEBHOOK_URL이 설정된 경우만)
+
+    본문의 track_id 서명이 맞는 웹훅만 대기 중인 작업을 완료시킨다.
+    """
+    if not modelslab.WEBHOOKS_ENABLED:
+        return JSONResponse({"status": "error", "message": "찾을 수 없습니다."}, status_code=404)
+
+    try:
+        payload = await request.json()
+    except Exception:
+        return JSONResponse({"status": "error", "message": "잘못된 웹훅 본문입니다."}, status_code=400)
+    if not isinstance(payload, dict) or not modelslab.verify_track_id(payload.get("track_id")):
+        logging.warning(f"서명이 맞지 않는 ModelsLab 웹훅 거절: id={payload.get('id') if isinstance(payload, dict) else None}")
+        return JSONResponse({"status": "error", "message": "잘못된 웹훅입니다."}, status_code=403)
+
+    matched = poll_scheduler.resolve_webhook(payload)
+    logging.info(f"ModelsLab 웹훅 수신: id={payload.get('id')}, status={payload.get('status')}, matched={matched}")
+    return JSONResponse({"status": "ok", "matched": matched})
+
+
+@app.get("/blobs/{store_name}/{key:path}")
+async def get_blob(store_name: str, key: str):
+    """local/memory 저장소 객체 제공 API (ModelsLab이 임시 이미지를 가져갈 때 사용)"""
+    store = served_store(store_name)
+    blob = await store.get(key) if store is not None else None
+    if blob is None:
+        return JSONResponse({"status": "error", "message": "파일을 찾을 수 없습니다."}, status_code=404)
+    return Response(bytes(blob.body), media_type=blob.content_type, headers={"ETag": f'"{blob.etag}"'})
+
+
+def _collect_stats():
+    """각 모듈의 stats()를 Prometheus 지표로 변환 (스크레이프 시점에만 실행)"""
+    poll = poll_scheduler.stats()
+    yield gauge("dearfam_modelslab_tracked_tasks", "결과를 기다리는 ModelsLab 작업 수", samples=[([], poll["tracked"])])
+    yield counter("dearfam_modelslab_fetches", "ModelsLab 결과 확인 요청 수", samples=[([], poll["fetches"])])
+    yield counter("dearfam_modelslab_resolved", "ModelsLab 작업 완료 수", ["via"],
+                  samples=[(["poll"], poll["resolved_by_poll"]), (["webhook"], poll["resolved_by_webhook"])])
+
+    admission = admission_stats()
+    yield gauge("dearfam_upstream_active", "업스트림별 실행 중 호출 수", ["upstream"],
+                samples=[([name], stats["active"]) for name, stats in admission.items()])
+    yield gauge("dearfam_upstream_waiting", "업스트림별 대기열 길이", ["upstream"],
+                samples=[([name], stats["waiting"]) for name, stats in admission.items()])
+    yield counter("dearfam_upstream_rejected", "업스트림 한도 초과로 거절한 요청 수", ["upstream", "reason"], samples=[
+        ([name, reason], stats[f"rejected_{reason}"])
+        for name, stats in admission.items() for reason in ("queue_full", "timeout", "rate")
+    ])
+
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    yield gauge("dearfam_circuit_state", "서킷 상태 (0: closed, 1: half_open, 2: open)", ["upstream"],
+                samples=[([name], states[stats["state"]]) for name, stats in circuit_stats().items()])
+
+    yield gauge("dearfam_jobs", "상태별 백그라운드 작업 수", ["status"],
+                samples=[([status], count) for status, count in job_manager.stats().items()])
+
+    log = logging_stats()
+    yield counter("dearfam_log_dropped", "로그 큐가 가득 차 버린 레코드 수", samples=[([], log["dropped"])])
+    yield gauge("dearfam_log_queued", "출력 대기 중인 로그 레코드 수", samples=[([], log["queued"])])
+
+    cache = result_cache.stats()
+    yield counter("dearfam_result_cache_lookups", "결과 캐시 조회 수", ["result"],
+                  samples=[(["hit"], cache["hits"]), (["miss"], cache["misses"])])
+
+    janitor = temp_janitor.stats()
+    yield gauge("dearfam_temp_objects_pending", "삭제 대기 중인 임시 객체 수", samples=[([], janitor["pending"])])
+    yield gauge("dearfam_temp_objects_tracked", "기록된(아직 삭제되지 않은) 임시 객체 수", samples=[([], janitor["tracked"])])
+    yield counter("dearfam_temp_objects_reclaimed", "삭제한 임시 객체 수", ["reason"],
+                  samples=[([reason], count) for reason, count in janitor["reclaimed_objects"].items()])
+    yield counter("dearfam_temp_reclaimed_bytes", "삭제한 임시 객체 크기 합", samples=[([], janitor["reclaimed_bytes"])])
+    yield counter("dearfam_temp_delete_failures", "임시 객체 삭제 실패 수", samples=[([], janitor["delete_failures"])])
+
+
+stats_collector.add(_collect_stats)
+
+
+@app.get("/healthz")
+async def healthz():
+    """프로세스 생존 확인 API (이벤트 루프가 응답하면 200)"""
+    return JSONResponse({"status": "ok"})
+
+
+@app.get("/readyz")
+async def readyz():
+    """트래픽 수신 가능 여부 API (warm-up 중/종료 중이거나 이미지 전처리 풀이 깨졌으면 503)"""
+    executor_ready = image_executor_ready()
+    stats = {**lifecycle.stats(), "image_executor": {**image_executor_stats(), "ready": executor_ready}}
+    return JSONResponse(stats, status_code=200 if lifecycle.ready and executor_ready else 503)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 지표 API"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """결과 캐시 적중/미스 통계 API"""
+    return JSONResponse(result_cache.stats())
+
+
+@app.get("/temp-objects/stats")
+async def get_temp_object_stats():
+    """임시 객체 정리 현황 API (삭제 대기/기록/회수량)"""
+    return JSONResponse(temp_janitor.stats())
+
+
+@app.get("/modelslab/stats")
+async def get_modelslab_stats():
+    """ModelsLab 결과 polling 대기열/요청 빈도 통계 API"""
+    return JSONResponse(poll_scheduler.stats())
+
+
+@app.get("/admission/stats")
+async def get_admission_stats():
+    """업스트림별 동시 실행/대기열/거절 통계 API"""
+    return JSONResponse(admission_stats())
+
+
+@app.get("/circuits")
+async def get_circuits():
+    """업스트림별 서킷 브레이커 상태 API"""
+    return JSONResponse(circuit_stats())
+
+
+@app.get("/idempotency/stats")
+async def get_idempotency_stats():
+    """요청 합치기/재사용 통계 API"""
+    return JSONResponse(request_coalescer.stats())
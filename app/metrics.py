@@ -0,0 +1,141 @@
+import time
+from contextlib import contextmanager
+from starlette.routing import Match
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST, disable_created_metrics
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+from .tracing import record_span
+
+# *_created 시계열은 쓰지 않으므로 생략
+disable_created_metrics()
+
+# 앱 전용 레지스트리 (기본 프로세스/GC 수집기는 제외해서 스크레이프 비용을 줄임)
+registry = CollectorRegistry()
+
+# 수 ms(메모리 작업)부터 수 분(ModelsLab 영상 생성)까지
+_STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 90, 120, 180, 300)
+
+STAGE_SECONDS = Histogram(
+    "dearfam_stage_seconds", "파이프라인 단계별 소요 시간", ["stage"],
+    buckets=_STAGE_BUCKETS, registry=registry
+)
+REQUEST_SECONDS = Histogram(
+    "dearfam_request_seconds", "API 요청 처리 시간", ["endpoint", "status"],
+    buckets=_STAGE_BUCKETS, registry=registry
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "dearfam_requests_in_flight", "처리 중인 API 요청 수", ["endpoint"], registry=registry
+)
+UPSTREAM_ERRORS = Counter(
+    "dearfam_upstream_errors_total", "업스트림 호출 오류 수", ["upstream", "type"], registry=registry
+)
+BYTES_TRANSFERRED = Counter(
+    "dearfam_bytes_total", "주고받은 바이트 수", ["direction", "peer"], registry=registry
+)
+
+
+def observe(stage: str, seconds: float):
+    """이미 측정한 단계 소요 시간을 히스토그램과 현재 요청의 스팬에 기록"""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    record_span(stage, time.time() - seconds, seconds)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """with 블록의 소요 시간을 stage 히스토그램과 현재 요청의 스팬에 기록 (예외가 나도 기록)"""
+    started_at = time.time()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(duration)
+        record_span(stage, started_at, duration)
+
+
+def count_bytes(direction: str, peer: str, size: int):
+    """direction: in/out, peer: client/s3/upstream"""
+    if size:
+        BYTES_TRANSFERRED.labels(direction, peer).inc(size)
+
+
+def count_error(upstream: str, error_type: str):
+    UPSTREAM_ERRORS.labels(upstream, error_type).inc()
+
+
+class StatsCollector:
+    """다른 모듈의 stats()를 스크레이프 시점에 읽어 노출 (요청 경로에는 비용 없음)"""
+
+    def __init__(self):
+        self._sources = []
+
+    def add(self, source):
+        # source()는 MetricFamily 목록을 반환
+        self._sources.append(source)
+
+    def collect(self):
+        for source in self._sources:
+            yield from source()
+
+
+stats_collector = StatsCollector()
+registry.register(stats_collector)
+
+
+def gauge(name: str, documentation: str, labels: list = None, samples: list = ()) -> GaugeMetricFamily:
+    family = GaugeMetricFamily(name, documentation, labels=labels or [])
+    for label_values, value in samples:
+        family.add_metric(label_values, value)
+    return family
+
+
+def counter(name: str, documentation: str, labels: list = None, samples: list = ()) -> CounterMetricFamily:
+    family = CounterMetricFamily(name, documentation, labels=labels or [])
+    for label_values, value in samples:
+        family.add_metric(label_values, value)
+    return family
+
+
+class MetricsMiddleware:
+    """엔드포인트별 처리 중 요청 수와 처리 시간 기록 (스트리밍 응답을 감싸지 않는 ASGI 미들웨어)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._endpoints = None
+
+    def _endpoint(self, scope) -> str:
+        # 라벨 수가 늘어나지 않도록 라우트 경로 템플릿으로 묶음
+        if self._endpoints is None:
+            app = scope.get("app")
+            self._endpoints = [route for route in getattr(app, "routes", []) if hasattr(route, "path_format")]
+        for route in self._endpoints:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path_format
+        return "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self._endpoint(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(endpoint)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            REQUEST_SECONDS.labels(endpoint, str(status["code"])).observe(time.perf_counter() - started)
+
+
+def render_metrics() -> tuple:
+    """(본문, Content-Type) 반환"""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
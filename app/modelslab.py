@@ -0,0 +1,97 @@
+import os
+import hmac
+import uuid
+import hashlib
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 로컬 가짜 서버 등으로 교체할 수 있도록 기본 URL을 환경 변수로 분리
+MODELSLAB_BASE_URL = os.getenv("MODELSLAB_BASE_URL", "https://modelslab.com").rstrip("/")
+
+# 결과 polling 설정: 응답의 eta를 우선 사용하고, 없으면 최소 간격부터 backoff 배수로 늘림
+MODELSLAB_POLL_MIN_INTERVAL = float(os.getenv("MODELSLAB_POLL_MIN_INTERVAL", "2"))
+MODELSLAB_POLL_MAX_INTERVAL = float(os.getenv("MODELSLAB_POLL_MAX_INTERVAL", "15"))
+MODELSLAB_POLL_BACKOFF = float(os.getenv("MODELSLAB_POLL_BACKOFF", "1.5"))
+MODELSLAB_POLL_DEADLINE = float(os.getenv("MODELSLAB_POLL_DEADLINE", "180"))  # 작업당 최대 대기 시간(초)
+
+# 웹훅: ModelsLab이 완료 시 호출할 이 서버의 공개 URL (/webhooks/modelslab). 비어 있으면 polling만 사용
+MODELSLAB_WEBHOOK_URL = os.getenv("MODELSLAB_WEBHOOK_URL", "")
+# 웹훅을 쓸 때 필수. track_id 서명 키로만 쓰이고 URL에는 넣지 않음 (쿼리 문자열은 접근 로그에 남으므로)
+MODELSLAB_WEBHOOK_SECRET = os.getenv("MODELSLAB_WEBHOOK_SECRET", "")
+WEBHOOKS_ENABLED = bool(MODELSLAB_WEBHOOK_URL)
+
+
+def api_url(path: str) -> str:
+    return f"{MODELSLAB_BASE_URL}{path}"
+
+
+def check_webhook_config():
+    """웹훅을 켰는데 서명 키가 없으면 시작 거부 (누구나 대기 중인 작업을 완료시킬 수 있게 되므로)"""
+    if WEBHOOKS_ENABLED and not MODELSLAB_WEBHOOK_SECRET:
+        raise RuntimeError("MODELSLAB_WEBHOOK_URL을 쓰려면 MODELSLAB_WEBHOOK_SECRET을 설정해야 합니다.")
+
+
+def _sign(nonce: str) -> str:
+    return hmac.new(MODELSLAB_WEBHOOK_SECRET.encode("utf-8"), nonce.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def webhook_fields() -> tuple:
+    """요청 본문에 추가할 웹훅 필드와 track_id 반환 (웹훅 미사용 시 ({}, None))
+
+    track_id는 "난수.HMAC(난수)" 형식이라 웹훅 본문에 그대로 돌아오면 이 서버가 발급한 것인지 확인할 수 있다.
+    """
+    if not WEBHOOKS_ENABLED:
+        return {}, None
+    nonce = uuid.uuid4().hex
+    track_id = f"{nonce}.{_sign(nonce)}"
+    return {"webhook": MODELSLAB_WEBHOOK_URL, "track_id": track_id}, track_id
+
+
+def verify_track_id(track_id) -> bool:
+    """웹훅 본문의 track_id가 webhook_fields()로 발급한 값인지 확인"""
+    if not isinstance(track_id, str) or not MODELSLAB_WEBHOOK_SECRET:
+        return False
+    nonce, _, signature = track_id.partition(".")
+    return bool(nonce) and hmac.compare_digest(signature, _sign(nonce))
+
+
+def parse_eta(value):
+    """응답의 eta(초)를 숫자로 변환 (없거나 잘못된 값이면 None)"""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if seconds > 0 else None
+
+
+def _clamp(seconds: float) -> float:
+    return min(max(seconds, MODELSLAB_POLL_MIN_INTERVAL), MODELSLAB_POLL_MAX_INTERVAL)
+
+
+def first_poll_delay(submit_result: dict) -> float:
+    """제출 응답의 eta로 첫 확인까지 대기 시간 계산"""
+    eta = parse_eta(submit_result.get("eta"))
+    return _clamp(eta) if eta else MODELSLAB_POLL_MIN_INTERVAL
+
+
+def next_poll_delay(previous_delay: float, result: dict) -> float:
+    """fetch 응답의 eta를 우선 사용하고, 없으면 이전 간격에 backoff 배수 적용"""
+    eta = parse_eta(result.get("eta"))
+    return _clamp(eta) if eta else _clamp(previous_delay * MODELSLAB_POLL_BACKOFF)
+
+
+def extract_output(result: dict, label: str):
+    """fetch/웹훅 응답 해석: 결과 URL, 처리 중이면 None, 실패면 예외"""
+    if result.get("status") == "error" or result.get("status") == "failed":
+        error_message = result.get("message", "알 수 없는 오류")
+        logging.error(f"{label} API polling 에러: {error_message}")
+        raise Exception(f"{label} API 처리 실패: {error_message}")
+
+    if result.get("output") and len(result.get("output", [])) > 0:
+        return result.get("output")[0]
+
+    if result.get("status") != "processing":
+        raise Exception(f"{label} API 처리 실패: {result.get('message', '알 수 없는 오류')}")
+    return None
@@ -0,0 +1,277 @@
+import os
+import time
+import logging
+import asyncio
+from collections import defaultdict, deque
+from dotenv import load_dotenv
+from .http_client import get_http_session
+from . import modelslab
+from .resilience import UpstreamError, is_retryable, error_type
+from .metrics import count_error
+from .logging_setup import poll_logger
+
+load_dotenv()
+
+POLL_SCHEDULER_TICK = float(os.getenv("POLL_SCHEDULER_TICK", "0.5"))  # 타이밍 휠 슬롯 간격(초)
+POLL_SCHEDULER_MAX_RPS = float(os.getenv("POLL_SCHEDULER_MAX_RPS", "10"))  # 전체 fetch 요청 초당 상한
+POLL_SCHEDULER_MAX_CONCURRENCY = int(os.getenv("POLL_SCHEDULER_MAX_CONCURRENCY", "8"))  # 동시 fetch 요청 수
+
+
+class _PollEntry:
+    """결과를 기다리는 ModelsLab 작업 하나"""
+
+    __slots__ = ("task_id", "fetch_url", "headers", "label", "keys", "delay", "deadline", "future", "polls", "waiters")
+
+    def __init__(self, task_id, fetch_url: str, headers: dict, label: str, keys: list, delay: float, deadline: float, future):
+        self.task_id = task_id
+        self.fetch_url = fetch_url
+        self.headers = headers
+        self.label = label
+        self.keys = keys
+        self.delay = delay
+        self.deadline = deadline
+        self.future = future
+        self.polls = 0
+        self.waiters = 0  # 결과를 기다리는 호출 수 (0이 되면 더 확인하지 않음)
+
+
+class PollScheduler:
+    """진행 중인 모든 ModelsLab 작업을 하나의 루프에서 polling 하는 스케줄러
+
+    작업별로 sleep 루프를 돌리는 대신, 다음 확인 시점을 타이밍 휠 슬롯에 넣고
+    단일 백그라운드 태스크가 초당 요청 수 제한 안에서 fetch 하여 작업별 Future를 완료시킨다.
+    웹훅이 먼저 도착하면 휠에서 빼고 즉시 완료시킨다.
+    """
+
+    def __init__(self, tick: float = POLL_SCHEDULER_TICK, max_rps: float = POLL_SCHEDULER_MAX_RPS,
+                 max_concurrency: int = POLL_SCHEDULER_MAX_CONCURRENCY):
+        self.tick = tick
+        self.max_rps = max_rps
+        self.max_concurrency = max_concurrency
+        self._wheel = defaultdict(list)  # 슬롯 번호 -> [_PollEntry]
+        self._entries = {}  # task_id/track_id -> _PollEntry
+        self._tracked = 0
+        self._cursor = None
+        self._runner = None
+        self._wakeup = None
+        self._semaphore = None
+        self._inflight = set()
+        self._next_fetch_at = 0.0
+        self._fetch_times = deque()
+        # 누적 통계
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.resolved_by_poll = 0
+        self.resolved_by_webhook = 0
+        self.timeouts = 0
+
+    def start(self):
+        """백그라운드 루프 시작 (이미 실행 중이면 무시)"""
+        if self._runner is None or self._runner.done():
+            self._wakeup = asyncio.Event()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._cursor = self._slot(time.monotonic())
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """루프 종료 및 대기 중인 작업 정리"""
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+        for task in list(self._inflight):
+            task.cancel()
+        await asyncio.gather(*self._inflight, return_exceptions=True)
+        for entry in set(self._entries.values()):
+            self._finish(entry, error=Exception(f"{entry.label} 결과 확인이 중단되었습니다 (서버 종료)"))
+        self._wheel.clear()
+
+    def _slot(self, when: float) -> int:
+        return int(when / self.tick)
+
+    def _schedule(self, entry: _PollEntry, delay: float):
+        due = min(time.monotonic() + delay, entry.deadline)
+        self._wheel[max(self._slot(due), self._cursor)].append(entry)
+        self._wakeup.set()
+
+    async def wait(self, task_id, fetch_url: str, headers: dict, submit_result: dict = None,
+                   track_id: str = None, label: str = "ModelsLab") -> str:
+        """작업 완료까지 기다려 결과 URL 반환 (실패/시간 초과 시 예외)"""
+        self.start()
+        submit_result = submit_result or {}
+        key = str(task_id)
+
+        existing = self._entries.get(key)
+        if existing is None:
+            keys = [key] + ([track_id] if track_id else [])
+            entry = _PollEntry(
+                task_id,
+                submit_result.get("fetch_result") or fetch_url,
+                headers,
+                label,
+                keys,
+                modelslab.first_poll_delay(submit_result),
+                time.monotonic() + modelslab.MODELSLAB_POLL_DEADLINE,
+                asyncio.get_running_loop().create_future()
+            )
+            for entry_key in keys:
+                self._entries[entry_key] = entry
+            self._tracked += 1
+            self._schedule(entry, entry.delay)
+        else:
+            # 같은 작업을 기다리는 요청은 하나의 polling을 공유
+            entry = existing
+            if track_id and track_id not in entry.keys:
+                entry.keys.append(track_id)
+                self._entries[track_id] = entry
+
+        entry.waiters += 1
+        try:
+            return await asyncio.shield(entry.future)
+        finally:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.future.done():
+                # 기다리는 쪽이 모두 취소됨: 마감까지 polling 하며 남아 있지 않도록 정리
+                self._discard(entry)
+
+    def resolve_webhook(self, payload: dict) -> bool:
+        """웹훅 payload로 대기 중인 작업 완료. 대기 중인 작업이 있었으면 True
+
+        추측 가능한 ModelsLab 작업 id가 아니라 이 서버가 발급한 track_id로만 찾는다.
+        """
+        track_id = payload.get("track_id")
+        entry = self._entries.get(track_id) if isinstance(track_id, str) else None
+        if entry is None or track_id not in entry.keys[1:]:
+            return False
+        try:
+            output = modelslab.extract_output(payload, entry.label)
+        except Exception as e:
+            self._finish(entry, error=e)
+            return True
+        if output:
+            logging.info(f"{entry.label} 웹훅으로 결과 수신 - task_id: {entry.task_id}")
+            self.resolved_by_webhook += 1
+            self._finish(entry, output=output)
+        return True
+
+    def _unregister(self, entry: _PollEntry):
+        for key in entry.keys:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+    def _discard(self, entry: _PollEntry):
+        """완료를 기다리지 않고 추적 중단 (휠에 남은 슬롯은 future가 끝났으므로 건너뜀)"""
+        self._unregister(entry)
+        self._tracked -= 1
+        entry.future.cancel()
+
+    def _finish(self, entry: _PollEntry, output: str = None, error: Exception = None):
+        self._unregister(entry)
+        if entry.future.done():
+            return
+        self._tracked -= 1
+        if error is not None:
+            entry.future.set_exception(error)
+            # 기다리는 쪽이 모두 취소된 경우 경고 방지
+            entry.future.exception()
+        else:
+            entry.future.set_result(output)
+
+    async def _run(self):
+        while True:
+            if not self._entries:
+                # 추적 중인 작업이 없으면 (웹훅으로 끝난 작업의 남은 슬롯 정리 후) 대기
+                self._wheel.clear()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                self._cursor = self._slot(time.monotonic())
+
+            current = self._slot(time.monotonic())
+            due = []
+            while self._cursor <= current:
+                due.extend(self._wheel.pop(self._cursor, ()))
+                self._cursor += 1
+
+            for entry in due:
+                if entry.future.done():
+                    continue
+                await self._throttle()
+                task = asyncio.create_task(self._poll(entry))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+            await asyncio.sleep(max((self._cursor * self.tick) - time.monotonic(), 0))
+
+    async def _throttle(self):
+        # 초당 요청 수 제한: fetch 시작 간격을 1/max_rps 이상으로 유지
+        now = time.monotonic()
+        if self._next_fetch_at > now:
+            await asyncio.sleep(self._next_fetch_at - now)
+            now = time.monotonic()
+        self._next_fetch_at = now + (1.0 / self.max_rps if self.max_rps > 0 else 0)
+
+    async def _poll(self, entry: _PollEntry):
+        async with self._semaphore:
+            if entry.future.done():
+                return
+            entry.polls += 1
+            self.fetches += 1
+            self._fetch_times.append(time.monotonic())
+            # 반복 로그는 샘플링/속도 제한 로거로 지연 포맷
+            poll_logger.info("%s 결과 확인 시도 %d - task_id: %s", entry.label, entry.polls, entry.task_id)
+            try:
+                session = get_http_session()
+                async with session.post(entry.fetch_url, headers=entry.headers) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        raise UpstreamError(f"{entry.label} fetch API 오류 ({response.status}): {error_text}", status=response.status)
+                    result = await response.json()
+                poll_logger.debug("%s Polling 응답: %s", entry.label, result)
+                output = modelslab.extract_output(result, entry.label)
+            except Exception as e:
+                self.fetch_errors += 1
+                count_error("modelslab_poll", error_type(e))
+                if is_retryable(e) and time.monotonic() < entry.deadline:
+                    # 일시적인 fetch 실패는 작업을 실패시키지 않고 다음 확인 때 다시 시도
+                    logging.warning(f"{entry.label} 결과 확인 실패, 다시 시도 예정: {e}")
+                    entry.delay = modelslab.next_poll_delay(entry.delay, {})
+                    self._schedule(entry, entry.delay)
+                else:
+                    self._finish(entry, error=e)
+                return
+
+        if entry.future.done():
+            return
+        if output:
+            logging.info(f"{entry.label} 결과 URL 받음: {output}")
+            self.resolved_by_poll += 1
+            self._finish(entry, output=output)
+        elif time.monotonic() >= entry.deadline:
+            self.timeouts += 1
+            # 작업은 ModelsLab에서 계속 진행 중일 수 있으므로 다시 접수하지 않음 (중복 과금)
+            self._finish(entry, error=UpstreamError(
+                f"{entry.label} API 처리 시간 초과 ({int(modelslab.MODELSLAB_POLL_DEADLINE)}초)", retryable=False, kind="timeout"
+            ))
+        else:
+            entry.delay = modelslab.next_poll_delay(entry.delay, result)
+            self._schedule(entry, entry.delay)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        while self._fetch_times and now - self._fetch_times[0] > 60:
+            self._fetch_times.popleft()
+        return {
+            "tracked": self._tracked,
+            "scheduled": sum(1 for slot in self._wheel.values() for entry in slot if not entry.future.done()),
+            "inflight_fetches": len(self._inflight),
+            "fetches_per_sec_1m": round(len(self._fetch_times) / 60, 3),
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "resolved_by_poll": self.resolved_by_poll,
+            "resolved_by_webhook": self.resolved_by_webhook,
+            "timeouts": self.timeouts,
+            "max_rps": self.max_rps
+        }
+
+
+poll_scheduler = PollScheduler()
@@ -0,0 +1,244 @@
+import os
+import time
+import random
+import logging
+import asyncio
+import sys
+import aiohttp
+from dotenv import load_dotenv
+from .admission import Overloaded, upstream_limiters
+from .metrics import count_error
+
+load_dotenv()
+
+# 재시도 설정: 지수 백오프(full jitter), 호출 하나당 전체 시간 예산 안에서만 재시도
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "10"))
+RETRY_DEADLINE = float(os.getenv("RETRY_DEADLINE", "300"))  # 재시도 포함 호출당 최대 시간(초)
+
+# 서킷 브레이커 설정: 연속 실패가 임계값을 넘으면 reset_timeout 동안 호출 차단
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+# 일시적인 것으로 보는 업스트림 응답 코드
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# ModelsLab이 입력 이미지로 생성하지 못할 때 돌려주는 메시지 (같은 입력은 다시 보내도 실패, 업스트림 장애 아님)
+INPUT_ERROR_MESSAGES = ("Failed to generate image",)
+
+
+def is_input_error(e: BaseException) -> bool:
+    return any(m in str(e) for m in INPUT_ERROR_MESSAGES)
+
+
+class UpstreamError(Exception):
+    """업스트림 호출 실패 (status: HTTP 응답 코드, retryable: 재시도 가능 여부)"""
+
+    def __init__(self, message: str, status: int = None, retryable: bool = None, kind: str = None):
+        super().__init__(message)
+        self.status = status
+        self.kind = kind or ("invalid_input" if is_input_error(self) else None)
+        if retryable is None:
+            retryable = status in RETRYABLE_STATUS and self.kind != "invalid_input"
+        self.retryable = retryable
+
+
+class CircuitOpen(Overloaded):
+    """업스트림 장애로 서킷이 열려 호출을 차단한 경우 (503)"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(upstream, 503, retry_after, "업스트림 장애로 일시 차단")
+
+
+def _openai_errors():
+    # openai는 클라이언트를 처음 만들 때 import 되므로, 아직 로드되지 않았다면 openai 예외일 수 없음
+    module = sys.modules.get("openai")
+    return module if hasattr(module, "APIStatusError") else None
+
+
+def is_retryable(e: BaseException) -> bool:
+    """일시적인 오류(재시도하면 성공할 수 있는 오류)인지 분류"""
+    if isinstance(e, Overloaded):
+        return False
+    if isinstance(e, UpstreamError):
+        return e.retryable
+    if isinstance(e, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)):
+        return True
+    openai = _openai_errors()
+    if openai is not None:
+        if isinstance(e, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+            return True
+        if isinstance(e, openai.APIStatusError):
+            return e.status_code in RETRYABLE_STATUS
+    return False
+
+
+def error_type(e: BaseException) -> str:
+    """메트릭 라벨용 오류 종류"""
+    if isinstance(e, Overloaded):
+        return "overloaded"
+    status = None
+    openai = _openai_errors()
+    if isinstance(e, UpstreamError):
+        if e.kind:
+            return e.kind
+        status = e.status
+    elif isinstance(e, asyncio.TimeoutError) or (openai is not None and isinstance(e, openai.APITimeoutError)):
+        return "timeout"
+    elif isinstance(e, aiohttp.ClientConnectionError) or (openai is not None and isinstance(e, openai.APIConnectionError)):
+        return "connection"
+    elif isinstance(e, aiohttp.ClientPayloadError):
+        return "payload"
+    elif openai is not None and isinstance(e, openai.APIStatusError):
+        status = e.status_code
+    if status == 429:
+        return "rate_limited"
+    if status is not None:
+        return f"http_{status // 100}xx"
+    if is_input_error(e):
+        return "invalid_input"
+    return "other"
+
+
+class CircuitBreaker:
+    """업스트림 하나에 대한 서킷 브레이커
+
+    closed: 정상 호출, open: reset_timeout 동안 즉시 거절, half_open: 한 번만 시험 호출 허용.
+    재시도 가능한 오류(업스트림 상태 문제)만 실패로 센다.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        # 누적 통계
+        self.opened_count = 0
+        self.short_circuited = 0
+
+    def _retry_after(self) -> float:
+        return max(self.opened_at + self.reset_timeout - time.monotonic(), 0)
+
+    def check(self):
+        """호출 가능 여부 확인 (차단 중이면 CircuitOpen)"""
+        if self.state == "open" and self._retry_after() <= 0:
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "open" or (self.state == "half_open" and self._probing):
+            self.short_circuited += 1
+            raise CircuitOpen(self.name, self._retry_after() or 1)
+
+    def before_call(self):
+        self.check()
+        if self.state == "half_open":
+            self._probing = True
+
+    def record_success(self):
+        if self.state != "closed":
+            logging.info(f"서킷 닫힘: {self.name}")
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened_count += 1
+                logging.warning(f"서킷 열림: {self.name} (연속 실패 {self.failures}회)")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        # 실패로 세지 않는 오류로 끝난 시험 호출 정리
+        self._probing = False
+
+    def stats(self) -> dict:
+        if self.state == "open" and self._retry_after() <= 0:
+            state = "half_open"
+        else:
+            state = self.state
+        return {
+            "state": state,
+            "consecutive_failures": self.failures,
+            "retry_after": round(self._retry_after(), 1) if state == "open" else 0,
+            "opened_count": self.opened_count,
+            "short_circuited": self.short_circuited
+        }
+
+
+# 한도 설정이 있는 업스트림은 처음부터 상태를 노출
+circuit_breakers = {name: CircuitBreaker(name) for name in upstream_limiters}
+
+
+def get_circuit_breaker(upstream: str) -> CircuitBreaker:
+    breaker = circuit_breakers.get(upstream)
+    if breaker is None:
+        breaker = circuit_breakers[upstream] = CircuitBreaker(upstream)
+    return breaker
+
+
+def circuit_stats() -> dict:
+    return {name: breaker.stats() for name, breaker in circuit_breakers.items()}
+
+
+def backoff_delay(attempt: int, base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY) -> float:
+    """attempt번째 실패 후 대기 시간 (full jitter)"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+
+async def call_with_retry(func, upstream: str = None, label: str = "업스트림 호출",
+                          max_attempts: int = RETRY_MAX_ATTEMPTS, deadline: float = RETRY_DEADLINE,
+                          on_attempt=None):
+    """func()를 재시도 정책과 서킷 브레이커 아래에서 실행
+
+    재시도 가능한 오류만 지수 백오프로 재시도하고, deadline(초)을 넘기면 중단한다.
+    upstream이 주어지면 해당 업스트림의 서킷 브레이커를 적용한다.
+    on_attempt(attempt)는 각 시도 직전에 호출된다.
+    """
+    breaker = get_circuit_breaker(upstream) if upstream else None
+    expires_at = time.monotonic() + deadline
+
+    for attempt in range(1, max_attempts + 1):
+        if breaker:
+            breaker.before_call()
+        if on_attempt:
+            on_attempt(attempt)
+
+        try:
+            remaining = expires_at - time.monotonic()
+            try:
+                result = await asyncio.wait_for(func(), remaining)
+            except asyncio.TimeoutError:
+                raise UpstreamError(f"{label} 시간 초과 ({int(deadline)}초)", retryable=True, kind="timeout")
+        except Exception as e:
+            retryable = is_retryable(e)
+            if not isinstance(e, Overloaded):
+                count_error(upstream or "transfer", error_type(e))
+            if breaker:
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    breaker.release()
+
+            delay = backoff_delay(attempt)
+            if not retryable or attempt >= max_attempts or time.monotonic() + delay >= expires_at:
+                raise
+            logging.warning(f"{label} 실패 (시도 {attempt}/{max_attempts}), {delay:.1f}초 후 재시도: {e}")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # 취소(클라이언트 연결 끊김, 배치 취소, 종료 시 작업 정리)는 실패로 세지 않되,
+            # half-open 시험 호출이었다면 풀어 줘야 서킷이 시험 중 상태로 계속 막히지 않음
+            if breaker:
+                breaker.release()
+            raise
+
+        if breaker:
+            breaker.record_success()
+        return result
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import asyncio
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from .blob_store import locate_url
+from .data_dir import data_path, ensure_parent_dir
+
+load_dotenv()
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))  # 메모리 LRU 최대 항목 수
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", data_path("result_cache.sqlite3"))  # 빈 값이면 영구 저장소 미사용
+# 결과는 temp/ 경로에 저장되어 저장소 수명 규칙으로 지워지므로 그 보관 기간보다 짧게 설정할 것
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "21600"))
+# 캐시 적중 시 결과 객체가 아직 저장소에 있는지 확인 (1바이트 범위 읽기). 지워졌으면 캐시에서 빼고 새로 생성
+RESULT_CACHE_VERIFY = os.getenv("RESULT_CACHE_VERIFY", "true").lower() == "true"
+
+
+def make_cache_key(image_digest: str, prompt: str, model_id: str, params: dict = None) -> str:
+    """정규화된 이미지 해시 + 프롬프트 + 모델/파라미터로 캐시 키 생성"""
+    payload = json.dumps({
+        "image": image_digest,
+        "prompt": prompt,
+        "model_id": model_id,
+        "params": params or {}
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """ModelsLab 결과 URL 캐시 (메모리 LRU + SQLite)"""
+
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE, path: str = RESULT_CACHE_PATH, ttl: int = RESULT_CACHE_TTL):
+        self.max_size = max_size
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0  # 적중했지만 객체가 지워져 버린 항목 수
+        self._memory = OrderedDict()
+        self._db = None
+        self._db_lock = threading.Lock()
+
+    def _connect(self):
+        if self._db is None:
+            ensure_parent_dir(self.path)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, url TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _db_get(self, key: str):
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT url, expires_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        return row
+
+    def _db_set(self, key: str, url: str, expires_at: float):
+        with self._db_lock:
+            db = self._connect()
+            db.execute("INSERT OR REPLACE INTO results (key, url, expires_at) VALUES (?, ?, ?)", (key, url, expires_at))
+            db.execute("DELETE FROM results WHERE expires_at < ?", (time.time(),))
+            db.commit()
+
+    def _db_delete(self, key: str):
+        with self._db_lock:
+            db = self._connect()
+            db.execute("DELETE FROM results WHERE key = ?", (key,))
+            db.commit()
+
+    async def _exists(self, url: str) -> bool:
+        """캐시된 URL의 객체가 저장소에 남아 있는지 (이 서버 저장소 URL이 아니면 확인하지 않음)"""
+        located = locate_url(url)
+        if located is None:
+            return True
+        store, key = located
+        try:
+            return await store.get(key, 0, 1) is not None
+        except Exception as e:
+            logging.warning(f"결과 캐시 객체 확인 실패: {e}")
+            return False
+
+    async def _forget(self, key: str):
+        self._memory.pop(key, None)
+        if self.path:
+            try:
+                await asyncio.to_thread(self._db_delete, key)
+            except Exception as e:
+                logging.warning(f"결과 캐시 삭제 실패: {e}")
+
+    def _remember(self, key: str, url: str, expires_at: float):
+        self._memory[key] = (url, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    async def _lookup(self, key: str, now: float):
+        entry = self._memory.get(key)
+        if entry and entry[1] > now:
+            self._memory.move_to_end(key)
+            return entry[0]
+        self._memory.pop(key, None)
+
+        if self.path:
+            try:
+                row = await asyncio.to_thread(self._db_get, key)
+            except Exception as e:
+                logging.warning(f"결과 캐시 조회 실패: {e}")
+                row = None
+            if row and row[1] > now:
+                self._remember(key, row[0], row[1])
+                return row[0]
+        return None
+
+    async def get(self, key: str):
+        """캐시된 결과 URL 반환 (없거나 만료되었거나 객체가 지워졌으면 None)"""
+        if not RESULT_CACHE_ENABLED:
+            return None
+        url = await self._lookup(key, time.time())
+        if url is not None and RESULT_CACHE_VERIFY and not await self._exists(url):
+            logging.info(f"결과 캐시 항목의 객체가 없어 무효화: {url}")
+            self.stale += 1
+            await self._forget(key)
+            url = None
+        if url is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return url
+
+    async def set(self, key: str, url: str):
+        """결과 URL 저장"""
+        if not RESULT_CACHE_ENABLED:
+            return
+        expires_at = time.time() + self.ttl
+        self._remember(key, url, expires_at)
+        if self.path:
+            try:
+                await asyncio.to_thread(self._db_set, key, url, expires_at)
+            except Exception as e:
+                logging.warning(f"결과 캐시 저장 실패: {e}")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": RESULT_CACHE_ENABLED,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+            "max_size": self.max_size,
+            "ttl": self.ttl
+        }
+
+
+result_cache = ResultCache()
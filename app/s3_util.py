@@ -1,10 +1,12 @@
 import os
-import boto3
 import logging
 from dotenv import load_dotenv
-import uuid
-import aiohttp
 import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from .blob_store import BlobStore, BlobObject
+from .metrics import track_stage, count_bytes
 
 load_dotenv()
 
@@ -13,116 +15,264 @@ AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_S3_BUCKET = os.getenv("S3_BUCKET")
 AWS_S3_REGION = os.getenv("S3_REGION")
 CDN_DOMAIN = os.getenv("CDN_DOMAIN")  # CloudFront 또는 CDN 도메인
+# S3 호환 엔드포인트 (로컬 벤치마크용 bench.fake_s3, MinIO 등). 설정하면 path-style 주소 사용
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
 
-if not all([AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_S3_BUCKET, AWS_S3_REGION]):
-    raise ValueError("AWS 환경변수가 누락되었습니다.")
-
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_S3_REGION
-)
-
-def upload_image_to_s3(image_bytes: bytes, directory: str, ext: str = "png") -> str:
-    # 예: posts/1/uuid.png
-    filename = f"temp/{directory}/{uuid.uuid4().hex}.{ext}"
-    
-    # Content-Type 매핑
-    content_type_map = {
-        "png": "image/png",
-        "jpg": "image/jpeg",
-        "jpeg": "image/jpeg"
-    }
-    
-    content_type = content_type_map.get(ext.lower(), f"image/{ext}")
-    
-    try:
-        # 모든 이미지는 private으로 업로드 (CDN을 통해서만 접근)
-        s3.put_object(
-            Bucket=AWS_S3_BUCKET,
-            Key=filename,
-            Body=image_bytes,
-            ContentType=content_type
-        )
-    except Exception as e:
-        raise RuntimeError(f"S3 업로드 실패: {e}")
-    
-    # CDN 도메인이 설정되어 있으면 CDN URL 반환
-    if CDN_DOMAIN:
-        url = f"https://{CDN_DOMAIN}/{filename}"
-    else:
-        # temp 디렉토리 이미지는 CDN이 필수 (ModelsLab API 접근용)
-        if directory == "temp":
-            raise RuntimeError("CDN_DOMAIN 환경변수가 설정되지 않았습니다. temp 이미지는 CDN을 통해서만 접근 가능합니다.")
-        url = f"https://{AWS_S3_BUCKET}.s3.{AWS_S3_REGION}.amazonaws.com/{filename}"
-    
-    return url
-
-
-def upload_video_to_s3(video_bytes: bytes, is_temp: bool = True) -> str:
-    directory = "temp/videos" if is_temp else "videos"
-    key = f"{directory}/{uuid.uuid4().hex}.mp4"
-
-    try:
-        s3.put_object(
-            Bucket=AWS_S3_BUCKET,
-            Key=key,
-            Body=video_bytes,
-            ContentType="video/mp4"
+# boto3 호출은 동기이므로 전용 스레드 풀에서 실행 (이벤트 루프 블로킹 방지)
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "16"))
+
+# 스트리밍 업로드 설정 (S3 멀티파트 최소 파트 크기는 5MB)
+S3_MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024
+S3_MULTIPART_PART_SIZE = max(int(os.getenv("S3_MULTIPART_PART_SIZE", str(8 * 1024 * 1024))), S3_MULTIPART_MIN_PART_SIZE)
+S3_MULTIPART_MAX_INFLIGHT = max(int(os.getenv("S3_MULTIPART_MAX_INFLIGHT", "2")), 1)  # 동시에 업로드 중인 파트 수
+
+# 클라이언트 직접 업로드용 presigned URL 유효 시간(초)
+S3_PRESIGN_EXPIRES = int(os.getenv("S3_PRESIGN_EXPIRES", "300"))
+# DeleteObjects 한 번에 지울 수 있는 최대 키 수
+S3_DELETE_BATCH_SIZE = 1000
+
+_client = None
+
+
+def get_s3_client():
+    """boto3 클라이언트 (처음 사용할 때 생성, 환경 변수가 없으면 ValueError)"""
+    global _client
+    if _client is None:
+        if not all([AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_S3_BUCKET, AWS_S3_REGION]):
+            raise ValueError("AWS 환경변수가 누락되었습니다.")
+        import boto3
+        from botocore.config import Config
+        _client = boto3.client(
+            "s3",
+            aws_access_key_id=AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+            region_name=AWS_S3_REGION,
+            endpoint_url=S3_ENDPOINT_URL or None,
+            config=Config(
+                max_pool_connections=S3_MAX_CONCURRENCY,
+                s3={"addressing_style": "path"} if S3_ENDPOINT_URL else None
+            )
         )
-    except Exception as e:
-        raise RuntimeError(f"S3 비디오 업로드 실패: {e}")
-    
-    # 비디오는 항상 S3 직접 URL 반환 (스프링부트에서 CDN 변환 처리)
-    url = f"https://{AWS_S3_BUCKET}.s3.{AWS_S3_REGION}.amazonaws.com/{key}"
-    return url
-
-
-async def download_and_upload_image_to_s3(image_url: str, is_temp: bool = True) -> str:
-    """이미지 URL을 다운로드하여 S3에 업로드"""
-    directory = "temp/diary" if is_temp else "diary"
-    key = f"{directory}/{uuid.uuid4().hex}.png"
-    
-    try:
-        logging.info(f"이미지 다운로드 시작: {image_url}")
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(image_url) as response:
-                if response.status != 200:
-                    raise Exception(f"이미지 다운로드 실패 ({response.status})")
-                
-                image_data = await response.read()
-                logging.info(f"이미지 다운로드 완료: {len(image_data)} bytes")
-                
-                # S3에 업로드
-                s3.put_object(
+    return _client
+
+
+_s3_executor = ThreadPoolExecutor(max_workers=S3_MAX_CONCURRENCY, thread_name_prefix="s3")
+
+
+async def _run_s3(func, /, *args, **kwargs):
+    """동기 boto3 호출을 S3 전용 스레드 풀에서 실행 (호출별 소요 시간/전송량 기록)"""
+    loop = asyncio.get_running_loop()
+    with track_stage(f"s3_{getattr(func, '__name__', 'call')}"):
+        result = await loop.run_in_executor(_s3_executor, partial(func, *args, **kwargs))
+    body = kwargs.get("Body")
+    if isinstance(body, (bytes, bytearray)):
+        count_bytes("out", "s3", len(body))
+    return result
+
+
+def shutdown_s3_executor():
+    """앱 종료 시 S3 스레드 풀 정리"""
+    _s3_executor.shutdown(wait=True)
+
+
+class S3BlobStore(BlobStore):
+    """S3 저장소 (모든 객체는 private, 외부 접근은 CDN을 통해서만)"""
+
+    name = "s3"
+
+    async def put(self, key: str, data: bytes, content_type: str):
+        s3 = get_s3_client()
+        await _run_s3(s3.put_object, Bucket=AWS_S3_BUCKET, Key=key, Body=data, ContentType=content_type)
+
+    async def put_stream(self, key: str, chunks, content_type: str) -> int:
+        """받는 청크를 S3 멀티파트 업로드로 바로 전달
+
+        메모리에는 작성 중인 파트와 업로드 중인 파트(최대 S3_MULTIPART_MAX_INFLIGHT개)만 유지된다.
+        전체 크기가 한 파트보다 작으면 단일 PUT으로 업로드한다. 업로드한 바이트 수를 반환.
+        """
+        s3 = get_s3_client()
+        buffer = bytearray()
+        total = 0
+        upload_id = None
+        parts = []
+        inflight = deque()
+
+        async def upload_part(part_number: int, body: bytes) -> dict:
+            call = asyncio.ensure_future(_run_s3(
+                s3.upload_part,
+                Bucket=AWS_S3_BUCKET,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=body
+            ))
+            try:
+                result = await asyncio.shield(call)
+            except asyncio.CancelledError:
+                # 스레드에서 이미 실행 중인 boto3 호출은 중단되지 않으므로 끝날 때까지 기다린 뒤 취소 전파
+                # (abort 뒤에 파트 업로드가 끝나면 그 파트가 남아 저장 요금이 계속 나감)
+                await asyncio.gather(call, return_exceptions=True)
+                raise
+            return {"PartNumber": part_number, "ETag": result["ETag"]}
+
+        async def flush_part():
+            nonlocal upload_id
+            if upload_id is None:
+                created = await _run_s3(
+                    s3.create_multipart_upload,
                     Bucket=AWS_S3_BUCKET,
                     Key=key,
-                    Body=image_data,
-                    ContentType="image/png"
+                    ContentType=content_type
                 )
-                
-                url = f"https://{AWS_S3_BUCKET}.s3.{AWS_S3_REGION}.amazonaws.com/{key}"
-                logging.info(f"이미지 S3 업로드 완료: {url}")
-                return url
-                
-    except Exception as e:
-        logging.error(f"이미지 다운로드/업로드 실패: {str(e)}")
-        raise Exception(f"이미지 처리 실패: {str(e)}")
-
-
-def delete_file_from_s3(file_url: str) -> bool:
-    try:
-        # CDN URL과 S3 직접 URL 모두 처리
-        if CDN_DOMAIN and file_url.startswith(f"https://{CDN_DOMAIN}/"):
-            key = file_url.replace(f"https://{CDN_DOMAIN}/", "")
+                upload_id = created["UploadId"]
+            # 업로드 중인 파트가 가득 차면 가장 오래된 파트 완료를 기다림
+            while len(inflight) >= S3_MULTIPART_MAX_INFLIGHT:
+                parts.append(await inflight.popleft())
+            part_number = len(parts) + len(inflight) + 1
+            inflight.append(asyncio.ensure_future(upload_part(part_number, bytes(buffer))))
+            buffer.clear()
+
+        try:
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                total += len(chunk)
+                if len(buffer) >= S3_MULTIPART_PART_SIZE:
+                    await flush_part()
+
+            if upload_id is None:
+                # 작은 객체는 단일 PUT
+                await self.put(key, bytes(buffer), content_type)
+                return total
+
+            if buffer:
+                await flush_part()
+            while inflight:
+                parts.append(await inflight.popleft())
+            await _run_s3(
+                s3.complete_multipart_upload,
+                Bucket=AWS_S3_BUCKET,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+            return total
+
+        except BaseException:
+            for task in inflight:
+                task.cancel()
+            # 업로드 중인 파트가 모두 끝난 뒤에 abort 해야 남는 파트가 없음
+            await asyncio.gather(*inflight, return_exceptions=True)
+            if upload_id is not None:
+                try:
+                    await _run_s3(s3.abort_multipart_upload, Bucket=AWS_S3_BUCKET, Key=key, UploadId=upload_id)
+                except Exception as abort_error:
+                    logging.error(f"S3 멀티파트 업로드 취소 실패: {abort_error}")
+            raise
+
+    async def get(self, key: str, start: int = 0, length: int = None):
+        from botocore.exceptions import ClientError
+
+        if length is not None:
+            byte_range = f"bytes={start}-{start + length - 1}"
         else:
-            key = file_url.replace(f"https://{AWS_S3_BUCKET}.s3.{AWS_S3_REGION}.amazonaws.com/", "")
-        
-        s3.delete_object(Bucket=AWS_S3_BUCKET, Key=key)
-        return True
-    except Exception as e:
-        logging.error(f"S3 파일 삭제 실패: {e}")
-        return False
+            byte_range = f"bytes={start}-" if start else None
+        try:
+            result = await _run_s3(get_object_body, key, byte_range)
+        except ClientError as e:
+            # 없는 키는 NoSuchKey, 빈 객체의 Range 요청은 InvalidRange(416)
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404", "InvalidRange"):
+                return None
+            raise
+        count_bytes("in", "s3", len(result.body))
+        return result
+
+    async def delete(self, key: str) -> bool:
+        try:
+            await _run_s3(get_s3_client().delete_object, Bucket=AWS_S3_BUCKET, Key=key)
+            return True
+        except Exception as e:
+            logging.error(f"S3 파일 삭제 실패: {e}")
+            return False
+
+    async def delete_many(self, keys: list) -> list:
+        """DeleteObjects로 최대 1000개씩 삭제. 삭제하지 못한 키 목록 반환"""
+        s3 = get_s3_client()
+        failed = []
+        for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            batch = keys[start:start + S3_DELETE_BATCH_SIZE]
+            try:
+                result = await _run_s3(
+                    s3.delete_objects,
+                    Bucket=AWS_S3_BUCKET,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+                )
+            except Exception as e:
+                logging.error(f"S3 일괄 삭제 실패 ({len(batch)}개): {e}")
+                failed.extend(batch)
+                continue
+            # Quiet 모드에서는 실패한 키만 Errors로 돌아옴
+            failed.extend(error["Key"] for error in result.get("Errors", []))
+        return failed
+
+    def url(self, key: str) -> str:
+        if S3_ENDPOINT_URL:
+            return f"{S3_ENDPOINT_URL.rstrip('/')}/{AWS_S3_BUCKET}/{key}"
+        return f"https://{AWS_S3_BUCKET}.s3.{AWS_S3_REGION}.amazonaws.com/{key}"
+
+    def public_url(self, key: str) -> str:
+        # CDN 도메인이 설정되어 있으면 CDN URL (버킷이 private이므로 ModelsLab은 CDN으로만 접근 가능)
+        if CDN_DOMAIN:
+            return f"https://{CDN_DOMAIN}/{key}"
+        return self.url(key)
+
+    def key_from_url(self, url: str):
+        # CDN URL과 S3 직접 URL 모두 처리
+        for base in (f"https://{CDN_DOMAIN}/" if CDN_DOMAIN else None, self.url("")):
+            if base and url.startswith(base):
+                return url[len(base):]
+        return None
+
+    async def warm_up(self):
+        """boto3 import/클라이언트 생성을 스레드에서 미리 하고 버킷 엔드포인트 커넥션을 열어 둠"""
+        from botocore.exceptions import ClientError
+
+        s3 = await asyncio.to_thread(get_s3_client)
+        try:
+            await _run_s3(s3.head_bucket, Bucket=AWS_S3_BUCKET)
+        except ClientError as e:
+            # 권한(403) 등으로 실패해도 DNS 조회/TLS 연결은 풀에 남음
+            logging.info(f"S3 사전 연결 응답: {e.response.get('Error', {}).get('Code')}")
+
+    def presign_upload(self, key: str, content_type: str, method: str, min_bytes: int, max_bytes: int) -> dict:
+        """presigned POST/PUT 발급 (서명은 로컬 계산이라 S3 호출 없음)
+
+        POST는 크기 범위와 Content-Type을 정책으로 강제하고, PUT은 Content-Type만 서명에 포함된다.
+        """
+        s3 = get_s3_client()
+        if method == "post":
+            presigned = s3.generate_presigned_post(
+                Bucket=AWS_S3_BUCKET,
+                Key=key,
+                Fields={"Content-Type": content_type},
+                Conditions=[{"Content-Type": content_type}, ["content-length-range", min_bytes, max_bytes]],
+                ExpiresIn=S3_PRESIGN_EXPIRES
+            )
+            return {"key": key, "method": "POST", "url": presigned["url"], "fields": presigned["fields"],
+                    "expires_in": S3_PRESIGN_EXPIRES}
+
+        url = s3.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": AWS_S3_BUCKET, "Key": key, "ContentType": content_type},
+            ExpiresIn=S3_PRESIGN_EXPIRES
+        )
+        return {"key": key, "method": "PUT", "url": url, "headers": {"Content-Type": content_type},
+                "expires_in": S3_PRESIGN_EXPIRES}
+
 
+def get_object_body(key: str, byte_range: str = None) -> BlobObject:
+    # 동기 호출 (_run_s3로 실행). 본문까지 읽어서 반환
+    response = get_s3_client().get_object(Bucket=AWS_S3_BUCKET, Key=key, **({"Range": byte_range} if byte_range else {}))
+    body = response["Body"].read()
+    content_range = response.get("ContentRange")
+    size = int(content_range.rsplit("/", 1)[1]) if content_range else len(body)
+    return BlobObject(body, size, response.get("ContentType"), response.get("ETag", "").strip('"'))
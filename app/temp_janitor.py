@@ -0,0 +1,230 @@
+import os
+import time
+import sqlite3
+import logging
+import asyncio
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from .blob_store import get_store, locate_url
+from .data_dir import data_path, ensure_parent_dir
+
+load_dotenv()
+
+# 만든 임시 객체 기록 (빈 값이면 프로세스 메모리에만 기록하므로 재시작 전 객체는 회수하지 못함)
+TEMP_JANITOR_PATH = os.getenv("TEMP_JANITOR_PATH", data_path("temp_objects.sqlite3"))
+TEMP_JANITOR_INTERVAL = float(os.getenv("TEMP_JANITOR_INTERVAL", "5"))  # 삭제 배치 주기(초)
+# 한 번에 삭제 요청할 키 수 (S3 DeleteObjects 상한 1000)
+TEMP_JANITOR_BATCH_SIZE = min(int(os.getenv("TEMP_JANITOR_BATCH_SIZE", "1000")), 1000)
+TEMP_JANITOR_MAX_ATTEMPTS = int(os.getenv("TEMP_JANITOR_MAX_ATTEMPTS", "3"))  # 삭제 실패 시 주기마다 재시도할 횟수 (넘으면 고아로 회수)
+# 해제되지 않은 채 이 시간(초)이 지난 임시 객체는 고아로 보고 회수 (가장 긴 작업보다 길어야 함)
+TEMP_ORPHAN_TTL = int(os.getenv("TEMP_ORPHAN_TTL", "3600"))
+TEMP_ORPHAN_SCAN_INTERVAL = float(os.getenv("TEMP_ORPHAN_SCAN_INTERVAL", "300"))  # 고아 확인 주기(초)
+TEMP_JANITOR_SHUTDOWN_TIMEOUT = float(os.getenv("TEMP_JANITOR_SHUTDOWN_TIMEOUT", "5"))  # 종료 시 남은 삭제 대기(초)
+_DB_KEYS_PER_QUERY = 500
+
+
+class TempObjectJanitor:
+    """ModelsLab 입력용 임시 객체 수명 관리
+
+    만든 임시 객체는 SQLite에 기록하고, 작업이 끝나면(성공/실패 무관) release로 삭제 대기열에 넣는다.
+    실제 삭제는 백그라운드 루프가 저장소별로 최대 1000개씩 묶어서(delete_many) 요청 경로 밖에서 수행한다.
+    release되지 않은 채 TEMP_ORPHAN_TTL이 지난 기록(실패 누락, 워커 비정상 종료 등)은 고아로 회수한다.
+    """
+
+    def __init__(self, path: str = TEMP_JANITOR_PATH):
+        self.path = path or ":memory:"
+        self.reclaimed_objects = {"released": 0, "orphan": 0}
+        self.reclaimed_bytes = 0
+        self.delete_failures = 0
+        self.tracked = 0
+        self._pending = OrderedDict()  # (저장소 종류, 키) -> [사유, 시도 횟수]
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._runner = None
+        self._wakeup = None
+        self._next_scan = 0.0
+
+    def _connect(self):
+        if self._db is None:
+            # 여러 워커가 같은 파일을 쓰므로 잠금 대기 허용
+            ensure_parent_dir(self.path)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS temp_objects ("
+                "store TEXT NOT NULL, key TEXT NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (store, key))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS temp_objects_created_at ON temp_objects (created_at)")
+            self._db.commit()
+        return self._db
+
+    def _db_track(self, store: str, key: str, size: int, created_at: float):
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO temp_objects (store, key, size, created_at) VALUES (?, ?, ?, ?)",
+                (store, key, size, created_at)
+            )
+            db.commit()
+
+    def _db_forget(self, store: str, keys: list) -> int:
+        """기록 삭제 후 지운 객체들의 크기 합 반환"""
+        size = 0
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                # SQLite 3.32 미만은 SQL 변수가 최대 999개이므로 나눠서 처리
+                for start in range(0, len(keys), _DB_KEYS_PER_QUERY):
+                    chunk = keys[start:start + _DB_KEYS_PER_QUERY]
+                    placeholders = ",".join("?" * len(chunk))
+                    size += db.execute(
+                        f"SELECT COALESCE(SUM(size), 0) FROM temp_objects WHERE store = ? AND key IN ({placeholders})",
+                        (store, *chunk)
+                    ).fetchone()[0]
+                    db.execute(f"DELETE FROM temp_objects WHERE store = ? AND key IN ({placeholders})", (store, *chunk))
+        return size
+
+    def _db_claim_orphans(self, before: float, now: float, limit: int) -> list:
+        # 가져간 기록은 created_at을 갱신해 다른 워커가 같은 객체를 동시에 회수하지 않게 함
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                rows = db.execute(
+                    "SELECT store, key FROM temp_objects WHERE created_at < ? ORDER BY created_at LIMIT ?",
+                    (before, limit)
+                ).fetchall()
+                db.executemany(
+                    "UPDATE temp_objects SET created_at = ? WHERE store = ? AND key = ?",
+                    [(now, store, key) for store, key in rows]
+                )
+            return rows
+
+    def _db_count(self) -> int:
+        with self._db_lock:
+            return self._connect().execute("SELECT COUNT(*) FROM temp_objects").fetchone()[0]
+
+    async def track(self, store, key: str, size: int = 0):
+        """임시 객체 생성 기록 (크기를 모르면 0)"""
+        try:
+            await asyncio.to_thread(self._db_track, store.name, key, size, time.time())
+        except Exception as e:
+            logging.warning(f"임시 객체 기록 실패: {key} ({e})")
+
+    async def track_url(self, url: str, size: int = 0):
+        located = locate_url(url)
+        if located is None:
+            logging.warning(f"기록할 임시 객체의 저장소를 찾을 수 없습니다: {url}")
+            return
+        await self.track(*located, size)
+
+    def release(self, store, key: str, reason: str = "released"):
+        """임시 객체를 삭제 대기열에 추가 (요청 경로에서는 대기열에 넣기만 함)"""
+        entry = (store.name, key)
+        if entry not in self._pending:
+            self._pending[entry] = [reason, 0]
+        if len(self._pending) >= TEMP_JANITOR_BATCH_SIZE and self._wakeup is not None:
+            self._wakeup.set()
+
+    def release_url(self, url: str):
+        located = locate_url(url)
+        if located is None:
+            logging.warning(f"삭제할 임시 객체의 저장소를 찾을 수 없습니다: {url}")
+            return
+        self.release(*located)
+
+    def start(self):
+        """백그라운드 루프 시작 (이미 실행 중이면 무시)"""
+        if self._runner is None or self._runner.done():
+            self._wakeup = asyncio.Event()
+            self._next_scan = 0.0  # 시작 직후 이전 프로세스가 남긴 고아부터 확인
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """루프 종료 후 대기열에 남은 객체 삭제 (시간 안에 못 지운 객체는 다음 실행 때 고아로 회수)"""
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+        if self._pending:
+            try:
+                await asyncio.wait_for(self.flush(), TEMP_JANITOR_SHUTDOWN_TIMEOUT)
+            except Exception as e:
+                logging.warning(f"종료 시 임시 객체 삭제 실패: {e!r}")
+        if self._pending:
+            logging.warning(f"종료 시 삭제하지 못한 임시 객체 {len(self._pending)}개 (다음 실행 때 고아로 회수)")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), TEMP_JANITOR_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                if time.monotonic() >= self._next_scan:
+                    self._next_scan = time.monotonic() + TEMP_ORPHAN_SCAN_INTERVAL
+                    await self.reclaim_orphans()
+                await self.flush()
+                self.tracked = await asyncio.to_thread(self._db_count)
+            except Exception as e:
+                logging.error(f"임시 객체 정리 실패: {e}")
+
+    async def reclaim_orphans(self) -> int:
+        """TEMP_ORPHAN_TTL이 지나도록 release되지 않은 기록을 삭제 대기열에 추가"""
+        now = time.time()
+        rows = await asyncio.to_thread(self._db_claim_orphans, now - TEMP_ORPHAN_TTL, now, TEMP_JANITOR_BATCH_SIZE * 10)
+        for store_name, key in rows:
+            self._pending.setdefault((store_name, key), ["orphan", 0])
+        if rows:
+            logging.info("고아 임시 객체 %d개 회수 예정", len(rows))
+        return len(rows)
+
+    async def flush(self):
+        """삭제 대기열을 저장소별 배치로 삭제 (실패한 객체는 다음 주기에 재시도)"""
+        batches = {}
+        for store_name, key in list(self._pending):
+            batches.setdefault(store_name, []).append(key)
+        for store_name, keys in batches.items():
+            for start in range(0, len(keys), TEMP_JANITOR_BATCH_SIZE):
+                await self._delete_batch(store_name, keys[start:start + TEMP_JANITOR_BATCH_SIZE])
+
+    async def _delete_batch(self, store_name: str, keys: list):
+        try:
+            failed = set(await get_store(store_name).delete_many(keys))
+        except Exception as e:
+            logging.error(f"임시 객체 일괄 삭제 실패 ({store_name}, {len(keys)}개): {e}")
+            failed = set(keys)
+
+        deleted = [key for key in keys if key not in failed]
+        for key in deleted:
+            reason, _ = self._pending.pop((store_name, key))
+            self.reclaimed_objects[reason] += 1
+        if deleted:
+            try:
+                self.reclaimed_bytes += await asyncio.to_thread(self._db_forget, store_name, deleted)
+            except Exception as e:
+                logging.warning(f"임시 객체 기록 삭제 실패: {e}")
+
+        for key in failed:
+            self.delete_failures += 1
+            entry = self._pending[(store_name, key)]
+            entry[1] += 1
+            if entry[1] >= TEMP_JANITOR_MAX_ATTEMPTS:
+                # 기록은 남겨 두었으므로 다음 고아 확인 때 다시 시도
+                del self._pending[(store_name, key)]
+        if failed:
+            logging.warning("임시 객체 %d개 삭제 실패 (%s)", len(failed), store_name)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "tracked": self.tracked,
+            "reclaimed_objects": dict(self.reclaimed_objects),
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "delete_failures": self.delete_failures,
+            "orphan_ttl": TEMP_ORPHAN_TTL
+        }
+
+
+temp_janitor = TempObjectJanitor()
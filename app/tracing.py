@@ -0,0 +1,206 @@
+import os
+import re
+import sys
+import json
+import time
+import queue
+import uuid
+import logging
+import itertools
+import threading
+from contextvars import ContextVar
+from starlette.datastructures import MutableHeaders
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 스팬 기록 위치: 빈 값이면 기록 안 함, "stdout"이면 표준 출력, 그 외에는 파일 경로
+# 파일은 Chrome Trace Event 형식(JSON 배열)으로 기록되어 chrome://tracing, Perfetto에서 바로 열 수 있다
+TRACE_OUTPUT = os.getenv("TRACE_OUTPUT", "")
+REQUEST_ID_HEADER = os.getenv("REQUEST_ID_HEADER", "X-Request-ID")
+# 기록 대기열 길이. 가득 차면(디스크가 느리면) 스팬을 버린다
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+
+_VALID_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+_current = ContextVar("trace", default=None)
+_trace_numbers = itertools.count(1)
+
+
+class Trace:
+    """요청 하나의 추적 정보 (trace_id와 단계별 스팬)"""
+
+    __slots__ = ("trace_id", "number", "spans")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.number = next(_trace_numbers)  # 트레이스 뷰어에서 요청별로 행을 나누기 위한 번호
+        self.spans = []  # (이름, 소요 시간(초))
+
+
+class _SpanSink:
+    """스팬을 JSON 레코드로 기록
+
+    파일 쓰기가 이벤트 루프를 막지 않도록 write()는 대기열에 넣기만 하고 전용 스레드가 직렬화와 기록을 한다.
+    """
+
+    _STOP = object()
+
+    def __init__(self, output: str, max_queue: int = TRACE_QUEUE_SIZE):
+        self.output = output
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self.output == "stdout":
+            return sys.stdout
+        new_file = not os.path.exists(self.output) or os.path.getsize(self.output) == 0
+        handle = open(self.output, "a", encoding="utf-8")
+        if new_file:
+            # 닫는 ]는 생략 가능한 형식이므로 여는 [만 기록
+            handle.write("[\n")
+        return handle
+
+    def _run(self):
+        separator = "\n" if self.output == "stdout" else ",\n"
+        handle = None
+        while True:
+            event = self._queue.get()
+            if event is self._STOP:
+                break
+            try:
+                if handle is None:
+                    handle = self._open()
+                handle.write(json.dumps(event, ensure_ascii=False) + separator)
+                # 대기열이 비었을 때만 flush해 몰릴 때는 한 번에 기록
+                if self._queue.empty():
+                    handle.flush()
+            except Exception as e:
+                logging.warning(f"트레이스 기록 실패: {e}")
+        if handle is not None and handle is not sys.stdout:
+            handle.close()
+        elif handle is not None:
+            handle.flush()
+
+    def write(self, event: dict):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logging.warning("트레이스 대기열이 가득 차 스팬을 버렸습니다 (누적 %d개)", self.dropped)
+
+    def close(self):
+        """대기 중인 스팬을 모두 기록하고 파일을 닫음"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(self._STOP)
+            thread.join()
+
+
+_sink = _SpanSink(TRACE_OUTPUT) if TRACE_OUTPUT else None
+
+
+def current_trace_id():
+    trace = _current.get()
+    return trace.trace_id if trace else None
+
+
+def record_span(name: str, started_at: float, duration: float, **attributes):
+    """현재 요청에 스팬 추가 (started_at: time.time() 기준 시작 시각, duration: 초)"""
+    trace = _current.get()
+    if trace is None:
+        return
+    trace.spans.append((name, duration))
+    if _sink is not None:
+        _sink.write({
+            "name": name,
+            "cat": "stage",
+            "ph": "X",
+            "ts": int(started_at * 1_000_000),
+            "dur": int(duration * 1_000_000),
+            "pid": os.getpid(),
+            "tid": trace.number,
+            "args": {"trace_id": trace.trace_id, **attributes}
+        })
+
+
+def close_trace_output():
+    if _sink is not None:
+        _sink.close()
+
+
+def _incoming_trace_id(scope) -> str:
+    # X-Request-ID를 우선 사용하고, 없으면 W3C traceparent의 trace-id 사용
+    request_id_header = REQUEST_ID_HEADER.lower().encode("latin-1")
+    traceparent = None
+    for name, value in scope.get("headers", ()):
+        if name == request_id_header:
+            candidate = value.decode("latin-1").strip()
+            if _VALID_ID.match(candidate):
+                return candidate
+        elif name == b"traceparent":
+            traceparent = value.decode("latin-1").split("-")
+    if traceparent and len(traceparent) >= 2 and _VALID_ID.match(traceparent[1]):
+        return traceparent[1]
+    return uuid.uuid4().hex
+
+
+def server_timing(spans: list, total: float) -> str:
+    """스팬을 Server-Timing 헤더 값으로 변환 (같은 이름은 합산, ms 단위)"""
+    durations = {}
+    for name, duration in spans:
+        durations[name] = durations.get(name, 0.0) + duration
+    durations["total"] = total
+    return ", ".join(f"{name};dur={duration * 1000:.1f}" for name, duration in durations.items())
+
+
+class TracingMiddleware:
+    """요청 id 전파, 응답의 Server-Timing/요청 id 헤더 추가, 요청 전체 스팬 기록"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(_incoming_trace_id(scope))
+        token = _current.set(trace)
+        started_at = time.time()
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers[REQUEST_ID_HEADER] = trace.trace_id
+                timing = server_timing(trace.spans, time.perf_counter() - started)
+                existing = headers.get("server-timing")
+                headers["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if _sink is not None:
+                _sink.write({
+                    "name": f"{scope['method']} {scope['path']}",
+                    "cat": "request",
+                    "ph": "X",
+                    "ts": int(started_at * 1_000_000),
+                    "dur": int((time.perf_counter() - started) * 1_000_000),
+                    "pid": os.getpid(),
+                    "tid": trace.number,
+                    "args": {"trace_id": trace.trace_id, "status": status["code"]}
+                })
@@ -0,0 +1,243 @@
+import os
+import struct
+import logging
+from fastapi import HTTPException
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 업로드 이미지 허용 범위 (파일 하나 기준)
+UPLOAD_MIN_BYTES = 30 * 1024
+UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+# 디코딩 전에 거절할 해상도 상한 (가로 x 세로 픽셀 수, 압축 폭탄 방지)
+UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", str(40_000_000)))
+# 형식/해상도 확인에 쓰는 앞부분 크기 (JPEG의 EXIF/해상도 정보는 대부분 이 안에 있음)
+UPLOAD_SNIFF_BYTES = int(os.getenv("UPLOAD_SNIFF_BYTES", str(64 * 1024)))
+# multipart 경계/폼 필드 등 파일 외 본문 여유분
+_FORM_OVERHEAD_BYTES = 64 * 1024
+
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_MODES = {1: "L", 3: "RGB", 4: "CMYK"}
+_PNG_MODES = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+_HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1"}
+
+
+class UploadRejected(HTTPException):
+    """업로드 검증 실패 (본문을 끝까지 받기 전에도 발생)"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(status_code=status_code, detail=message)
+        self.message = message
+
+
+def _sniff_jpeg(data: bytes) -> dict:
+    info = {"format": "JPEG", "mode": None, "width": None, "height": None, "has_exif": False}
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            raise ValueError("잘못된 JPEG 마커")
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # 채움 바이트
+            position += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            position += 2
+            continue
+        length = struct.unpack(">H", data[position + 2:position + 4])[0]
+        if marker == 0xE1 and data[position + 4:position + 10] == b"Exif\0\0":
+            info["has_exif"] = True
+        elif marker in _JPEG_SOF:
+            if position + 10 > len(data):
+                break
+            info["height"], info["width"] = struct.unpack(">HH", data[position + 5:position + 9])
+            info["mode"] = _JPEG_MODES.get(data[position + 9], "unknown")
+            return info
+        elif marker == 0xDA:
+            raise ValueError("해상도 정보(SOF) 없이 이미지 데이터 시작")
+        position += 2 + length
+    return info
+
+
+def _sniff_png(data: bytes) -> dict:
+    info = {"format": "PNG", "mode": None, "width": None, "height": None,
+            "has_exif": b"eXIf" in data[:UPLOAD_SNIFF_BYTES]}
+    if len(data) >= 26 and data[12:16] == b"IHDR":
+        info["width"], info["height"] = struct.unpack(">II", data[16:24])
+        info["mode"] = _PNG_MODES.get(data[25], "unknown")
+    return info
+
+
+def _sniff_heif(data: bytes) -> dict:
+    # 이미지 항목마다 ispe(가로/세로) 속성이 있으며, 가장 큰 값이 주 이미지(그리드 포함)
+    # 압축 데이터(mdat) 안의 우연한 일치를 피하기 위해 앞부분(meta 박스)만 확인
+    data = data[:UPLOAD_SNIFF_BYTES]
+    info = {"format": "HEIF", "mode": "RGB", "width": None, "height": None, "has_exif": b"Exif" in data}
+    position = data.find(b"ispe")
+    while position != -1 and position + 16 <= len(data):
+        width, height = struct.unpack(">II", data[position + 8:position + 16])
+        if info["width"] is None or width * height > info["width"] * info["height"]:
+            info["width"], info["height"] = width, height
+        position = data.find(b"ispe", position + 4)
+    return info
+
+
+def sniff_image(data: bytes) -> dict:
+    """파일 앞부분의 매직 바이트로 형식을, 헤더로 해상도/EXIF 유무를 확인 (픽셀 디코딩 없음)
+
+    format, mode, width, height, has_exif를 반환. 해상도가 data 범위 밖에 있으면 width/height는 None.
+    이미지가 아니면 None.
+    """
+    try:
+        if data.startswith(b"\xff\xd8\xff"):
+            return _sniff_jpeg(data)
+        if data.startswith(b"\x89PNG\r\n\x1a\n"):
+            return _sniff_png(data)
+        if data[4:8] == b"ftyp" and data[8:12] in _HEIF_BRANDS:
+            return _sniff_heif(data)
+    except (ValueError, struct.error):
+        return None
+    return None
+
+
+def check_image(data: bytes, allowed_formats: tuple, complete: bool = True) -> dict:
+    """sniff_image 결과 검증 (문제가 있으면 UploadRejected)
+
+    complete가 False면 data는 파일 앞부분이므로 해상도를 아직 못 찾은 경우는 통과시킨다.
+    """
+    info = sniff_image(data)
+    if info is None or info["format"] not in allowed_formats:
+        raise UploadRejected(400, "지원하지 않는 파일 형식입니다. JPEG, PNG 파일만 업로드 가능합니다.")
+    if info["width"] is None:
+        if complete:
+            raise UploadRejected(400, "이미지 해상도를 확인할 수 없습니다.")
+        return info
+    if not info["width"] or not info["height"] or info["width"] * info["height"] > UPLOAD_MAX_PIXELS:
+        raise UploadRejected(400, f"이미지 해상도가 너무 큽니다. {UPLOAD_MAX_PIXELS // 1_000_000}MP 이하로 업로드해주세요.")
+    return info
+
+
+class _UploadStreamChecker:
+    """multipart 본문을 받는 대로 파싱해 파일 파트별 크기 제한과 앞부분 형식 검사 수행"""
+
+    def __init__(self, boundary: bytes, allowed_formats: tuple, sniff: bool):
+        self.allowed_formats = allowed_formats
+        self.sniff = sniff
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._is_file = False
+        self._size = 0
+        self._head = bytearray()
+        self._sniffed = False
+        self._error = None
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": lambda data, start, end: self._header_field.extend(data[start:end]),
+            "on_header_value": lambda data, start, end: self._header_value.extend(data[start:end]),
+            "on_header_end": self._on_header_end,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._is_file = False
+        self._size = 0
+        self._head.clear()
+        self._sniffed = False
+
+    def _on_header_end(self):
+        if self._header_field.lower() == b"content-disposition":
+            _, options = parse_options_header(bytes(self._header_value))
+            self._is_file = b"filename" in options
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if not self._is_file or self._error:
+            return
+        self._size += end - start
+        if self._size > UPLOAD_MAX_BYTES:
+            self._error = UploadRejected(413, "파일 크기가 너무 큽니다. 10MB 이하로 업로드해주세요.")
+            return
+        if self.sniff and not self._sniffed:
+            self._head.extend(data[start:min(end, start + UPLOAD_SNIFF_BYTES - len(self._head))])
+            if len(self._head) >= UPLOAD_SNIFF_BYTES:
+                self._check_head(complete=False)
+
+    def _on_part_end(self):
+        if self._is_file and self.sniff and not self._sniffed and not self._error:
+            self._check_head(complete=True)
+
+    def _check_head(self, complete: bool):
+        self._sniffed = True
+        try:
+            check_image(bytes(self._head), self.allowed_formats, complete)
+        except UploadRejected as e:
+            self._error = e
+
+    def feed(self, chunk: bytes):
+        if self._parser is None:
+            return
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError:
+            # 형식이 깨진 본문은 앱의 폼 파서가 400으로 처리하도록 검사 중단
+            self._parser = None
+            return
+        if self._error:
+            raise self._error
+
+
+class UploadLimitMiddleware:
+    """이미지 업로드 본문을 받는 중에 검증하는 ASGI 미들웨어
+
+    - Content-Length가 상한을 넘으면 본문을 읽기 전에 413
+    - 받은 바이트가 상한을 넘는 순간 413 (Content-Length 없는 chunked 업로드 포함)
+    - sniff가 켜진 경로는 파일 파트 앞부분의 매직 바이트/해상도를 확인해 바로 400
+
+    paths: {경로: (최대 파일 수, 앞부분 검사 여부)}. 거절은 UploadRejected로 올려 앱의 예외 핸들러가 응답한다.
+    """
+
+    def __init__(self, app, paths: dict, allowed_formats: tuple):
+        self.app = app
+        self.paths = paths
+        self.allowed_formats = allowed_formats
+
+    async def __call__(self, scope, receive, send):
+        rule = self.paths.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        max_files, sniff = rule
+        limit = UPLOAD_MAX_BYTES * max_files + _FORM_OVERHEAD_BYTES
+        headers = dict(scope["headers"])
+        content_type, options = parse_options_header(headers.get(b"content-type", b""))
+        checker = None
+        if content_type == b"multipart/form-data" and options.get(b"boundary"):
+            checker = _UploadStreamChecker(options[b"boundary"], self.allowed_formats, sniff)
+        content_length = headers.get(b"content-length")
+        received = 0
+
+        async def checked_receive():
+            nonlocal received
+            if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+                logging.warning("업로드 거절: Content-Length %s > %d", content_length.decode(), limit)
+                raise UploadRejected(413, "파일 크기가 너무 큽니다. 10MB 이하로 업로드해주세요.")
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                received += len(chunk)
+                if received > limit:
+                    raise UploadRejected(413, "파일 크기가 너무 큽니다. 10MB 이하로 업로드해주세요.")
+                if checker is not None and chunk:
+                    try:
+                        checker.feed(chunk)
+                    except UploadRejected as e:
+                        logging.warning("업로드 거절: %s (%d bytes 수신 후)", e.message, received)
+                        raise
+            return message
+
+        await self.app(scope, checked_receive, send)
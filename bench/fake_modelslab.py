@@ -0,0 +1,137 @@
+"""ModelsLab v7 video-fusion / v5 controlnet 프로토콜을 흉내 내는 로컬 가짜 서버
+
+제출 -> processing(eta, fetch_result) -> fetch -> output 흐름과 웹훅 콜백을 재현한다.
+
+    python -m bench.fake_modelslab --port 9100 --delay 12 --error-rate 0.05
+    MODELSLAB_BASE_URL=http://127.0.0.1:9100 python run.py
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+
+import aiohttp
+from aiohttp import web
+
+
+class FakeModelsLab:
+    def __init__(self, delay: float = 10.0, jitter: float = 0.2, error_rate: float = 0.0,
+                 output_size: int = 2 * 1024 * 1024, report_eta: bool = True):
+        self.delay = delay
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.output_size = output_size
+        self.report_eta = report_eta
+        self.tasks = {}
+        self.submits = 0
+        self.fetches = 0
+        self._ids = itertools.count(1)
+        self._background = set()
+
+    def _base_url(self, request: web.Request) -> str:
+        return f"{request.scheme}://{request.host}"
+
+    async def submit_video(self, request: web.Request) -> web.Response:
+        return await self._submit(request, "video")
+
+    async def submit_controlnet(self, request: web.Request) -> web.Response:
+        return await self._submit(request, "controlnet")
+
+    async def _submit(self, request: web.Request, kind: str) -> web.Response:
+        data = await request.json()
+        self.submits += 1
+        if not data.get("key") and not request.headers.get("key"):
+            return web.json_response({"status": "error", "message": "Invalid API key"})
+        if random.random() < self.error_rate:
+            return web.json_response({"status": "error", "message": "Failed to generate image"})
+
+        task_id = next(self._ids)
+        duration = max(self.delay * random.uniform(1 - self.jitter, 1 + self.jitter), 0)
+        ext = "mp4" if kind == "video" else "png"
+        fetch_path = "/api/v7/video-fusion/fetch" if kind == "video" else "/api/v5/controlnet/fetch"
+        base = self._base_url(request)
+        self.tasks[task_id] = {
+            "ready_at": time.monotonic() + duration,
+            "output": f"{base}/files/{task_id}.{ext}",
+            "track_id": data.get("track_id"),
+        }
+
+        if data.get("webhook"):
+            task = asyncio.create_task(self._callback(task_id, data["webhook"], duration))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+        if duration == 0:
+            return web.json_response({"status": "success", "id": task_id, "output": [self.tasks[task_id]["output"]]})
+        body = {"status": "processing", "id": task_id, "fetch_result": f"{base}{fetch_path}/{task_id}"}
+        if self.report_eta:
+            body["eta"] = round(duration, 1)
+        return web.json_response(body)
+
+    def _state(self, task_id: int) -> dict:
+        task = self.tasks.get(task_id)
+        if task is None:
+            return {"status": "error", "message": "Task not found"}
+        remaining = task["ready_at"] - time.monotonic()
+        if remaining > 0:
+            body = {"status": "processing", "id": task_id}
+            if self.report_eta:
+                body["eta"] = round(remaining, 1)
+            return body
+        return {"status": "success", "id": task_id, "track_id": task["track_id"], "output": [task["output"]]}
+
+    async def fetch(self, request: web.Request) -> web.Response:
+        self.fetches += 1
+        return web.json_response(self._state(int(request.match_info["task_id"])))
+
+    async def _callback(self, task_id: int, webhook: str, duration: float):
+        await asyncio.sleep(duration)
+        async with aiohttp.ClientSession() as session:
+            try:
+                await session.post(webhook, json=self._state(task_id))
+            except aiohttp.ClientError:
+                pass
+
+    async def file(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Length": str(self.output_size)})
+        await response.prepare(request)
+        chunk = b"\0" * (64 * 1024)
+        remaining = self.output_size
+        while remaining > 0:
+            await response.write(chunk[:remaining])
+            remaining -= len(chunk)
+        await response.write_eof()
+        return response
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"submits": self.submits, "fetches": self.fetches, "tasks": len(self.tasks)})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/v7/video-fusion/image-to-video", self.submit_video)
+        app.router.add_post("/api/v7/video-fusion/fetch/{task_id}", self.fetch)
+        app.router.add_post("/api/v5/controlnet", self.submit_controlnet)
+        app.router.add_post("/api/v5/controlnet/fetch/{task_id}", self.fetch)
+        app.router.add_get("/files/{name}", self.file)
+        app.router.add_get("/__stats", self.stats)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--delay", type=float, default=10.0, help="작업 처리 시간(초)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="처리 시간 변동 비율")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output-size", type=int, default=2 * 1024 * 1024, help="결과 파일 크기(bytes)")
+    parser.add_argument("--no-eta", action="store_true", help="응답에 eta를 넣지 않음")
+    args = parser.parse_args()
+
+    fake = FakeModelsLab(args.delay, args.jitter, args.error_rate, args.output_size, not args.no_eta)
+    web.run_app(fake.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""OpenAI chat completions / images generations 엔드포인트를 흉내 내는 로컬 가짜 서버
+
+chat은 stream=true면 SSE 청크(data: ... / data: [DONE])로, 아니면 JSON 한 번에 응답한다.
+images는 자기 자신의 /files/ 아래 PNG URL을 돌려준다.
+
+    python -m bench.fake_openai --port 9200 --chat-delay 1.5 --image-delay 8
+    OPENAI_BASE_URL=http://127.0.0.1:9200/v1 python run.py
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import random
+import time
+
+from aiohttp import web
+from PIL import Image
+
+DIARY = {
+    "title": "따뜻한 주말 오후",
+    "content": "오늘은 가족과 함께 공원에 다녀왔다. 햇살이 좋아서 돗자리를 펴고 도시락을 먹었고, "
+               "아이들은 잔디밭을 뛰어다니며 한참을 웃었다. 오랜만에 모두가 함께한 시간이라 더 소중하게 느껴졌다."
+}
+
+
+def _png(size: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), (236, 220, 196)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeOpenAI:
+    def __init__(self, chat_delay: float = 1.0, image_delay: float = 5.0, jitter: float = 0.2,
+                 error_rate: float = 0.0, stream_chunks: int = 40, image_size: int = 1024):
+        self.chat_delay = chat_delay
+        self.image_delay = image_delay
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stream_chunks = stream_chunks
+        self.image = _png(image_size)
+        self.chats = 0
+        self.images = 0
+        self._ids = itertools.count(1)
+
+    def _duration(self, delay: float) -> float:
+        return max(delay * random.uniform(1 - self.jitter, 1 + self.jitter), 0)
+
+    def _server_error(self) -> web.Response:
+        return web.json_response(
+            {"error": {"message": "The server had an error while processing your request.", "type": "server_error"}},
+            status=500
+        )
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        data = await request.json()
+        self.chats += 1
+        if random.random() < self.error_rate:
+            return self._server_error()
+
+        completion_id = f"chatcmpl-{next(self._ids)}"
+        content = json.dumps(DIARY, ensure_ascii=False)
+        duration = self._duration(self.chat_delay)
+        base = {"id": completion_id, "created": int(time.time()), "model": data.get("model", "gpt-4o")}
+
+        if not data.get("stream"):
+            await asyncio.sleep(duration)
+            return web.json_response({
+                **base, "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 120, "completion_tokens": 180, "total_tokens": 300},
+            })
+
+        # 첫 토큰까지 시간의 비중을 크게 두고 나머지를 균등하게 흘려보냄
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        await asyncio.sleep(duration * 0.3)
+        step = max(len(content) // self.stream_chunks, 1)
+        pieces = [content[i:i + step] for i in range(0, len(content), step)]
+        for index, piece in enumerate(pieces):
+            delta = {"role": "assistant", "content": piece} if index == 0 else {"content": piece}
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+            await asyncio.sleep(duration * 0.7 / len(pieces))
+        final = {**base, "object": "chat.completion.chunk",
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        await response.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+        await response.write_eof()
+        return response
+
+    async def generate_image(self, request: web.Request) -> web.Response:
+        await request.json()
+        self.images += 1
+        if random.random() < self.error_rate:
+            return self._server_error()
+        await asyncio.sleep(self._duration(self.image_delay))
+        image_id = next(self._ids)
+        return web.json_response({
+            "created": int(time.time()),
+            "data": [{"url": f"{request.scheme}://{request.host}/files/{image_id}.png", "revised_prompt": ""}],
+        })
+
+    async def file(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.image, content_type="image/png")
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"chats": self.chats, "images": self.images})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat)
+        app.router.add_post("/v1/images/generations", self.generate_image)
+        app.router.add_get("/files/{name}", self.file)
+        app.router.add_get("/__stats", self.stats)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--chat-delay", type=float, default=1.0, help="chat 응답 시간(초)")
+    parser.add_argument("--image-delay", type=float, default=5.0, help="이미지 생성 시간(초)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="처리 시간 변동 비율")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(args.chat_delay, args.image_delay, args.jitter, args.error_rate)
+    web.run_app(fake.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
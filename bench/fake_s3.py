@@ -0,0 +1,216 @@
+"""S3 API 일부를 흉내 내는 로컬 가짜 서버 (path-style, 메모리 저장)
+
+put/get(Range)/head/delete, presigned POST 폼 업로드, 멀티파트 업로드, DeleteObjects, ListObjectsV2를 지원한다.
+
+    python -m bench.fake_s3 --port 9300
+    S3_ENDPOINT_URL=http://127.0.0.1:9300 python run.py
+"""
+import argparse
+import hashlib
+import itertools
+import re
+import time
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+_S3_NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+def _xml(body: str, status: int = 200) -> web.Response:
+    return web.Response(
+        text=f'<?xml version="1.0" encoding="UTF-8"?>\n{body}', status=status, content_type="application/xml"
+    )
+
+
+def _error(code: str, message: str, status: int) -> web.Response:
+    return _xml(f"<Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>", status)
+
+
+def _decode_aws_chunked(data: bytes) -> bytes:
+    # aws-chunked 본문: "<hex 크기>[;chunk-signature=...]\r\n<데이터>\r\n" 반복, 0 크기 청크 뒤 trailer
+    out = bytearray()
+    position = 0
+    while True:
+        line_end = data.index(b"\r\n", position)
+        size = int(data[position:line_end].split(b";")[0], 16)
+        if size == 0:
+            return bytes(out)
+        start = line_end + 2
+        out += data[start:start + size]
+        position = start + size + 2
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}  # (bucket, key) -> {"body", "content_type", "etag", "modified"}
+        self.uploads = {}  # upload_id -> {"bucket", "key", "content_type", "parts": {번호: bytes}}
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._ids = itertools.count(1)
+
+    async def _body(self, request: web.Request) -> bytes:
+        data = await request.read()
+        if "aws-chunked" in request.headers.get("Content-Encoding", "") or \
+                request.headers.get("x-amz-content-sha256", "").startswith("STREAMING-"):
+            data = _decode_aws_chunked(data)
+        self.bytes_in += len(data)
+        return data
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        bucket = request.match_info["bucket"]
+        key = request.match_info.get("key", "")
+        query = request.query
+
+        if not key:
+            if request.method == "POST" and "delete" in query:
+                return await self._delete_objects(request, bucket)
+            if request.method == "POST" and request.content_type == "multipart/form-data":
+                return await self._post_object(request, bucket)
+            if request.method == "GET":
+                return self._list_objects(bucket, query.get("prefix", ""), int(query.get("max-keys", "1000")))
+            return _error("NotImplemented", "bucket operation", 501)
+
+        if request.method == "PUT":
+            if "uploadId" in query:
+                upload = self.uploads.get(query["uploadId"])
+                if upload is None:
+                    return _error("NoSuchUpload", query["uploadId"], 404)
+                body = await self._body(request)
+                upload["parts"][int(query["partNumber"])] = body
+                return web.Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+            body = await self._body(request)
+            etag = self._store(bucket, key, body, request.headers.get("Content-Type", "binary/octet-stream"))
+            return web.Response(headers={"ETag": etag})
+
+        if request.method == "POST":
+            if "uploads" in query:
+                upload_id = f"upload-{next(self._ids)}"
+                self.uploads[upload_id] = {
+                    "bucket": bucket, "key": key, "parts": {},
+                    "content_type": request.headers.get("Content-Type", "binary/octet-stream"),
+                }
+                return _xml(
+                    f'<InitiateMultipartUploadResult xmlns="{_S3_NS}"><Bucket>{bucket}</Bucket>'
+                    f"<Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+                )
+            if "uploadId" in query:
+                upload = self.uploads.pop(query["uploadId"], None)
+                if upload is None:
+                    return _error("NoSuchUpload", query["uploadId"], 404)
+                await request.read()
+                body = b"".join(upload["parts"][number] for number in sorted(upload["parts"]))
+                etag = self._store(bucket, key, body, upload["content_type"])
+                return _xml(
+                    f'<CompleteMultipartUploadResult xmlns="{_S3_NS}"><Bucket>{bucket}</Bucket>'
+                    f"<Key>{escape(key)}</Key><ETag>{escape(etag)}</ETag></CompleteMultipartUploadResult>"
+                )
+            return _error("NotImplemented", "object POST", 501)
+
+        if request.method == "DELETE":
+            if "uploadId" in query:
+                self.uploads.pop(query["uploadId"], None)
+            else:
+                self.objects.pop((bucket, key), None)
+            return web.Response(status=204)
+
+        if request.method in ("GET", "HEAD"):
+            return self._get(request, bucket, key)
+        return _error("MethodNotAllowed", request.method, 405)
+
+    def _store(self, bucket: str, key: str, body: bytes, content_type: str) -> str:
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        self.objects[(bucket, key)] = {
+            "body": body, "content_type": content_type, "etag": etag, "modified": time.time()
+        }
+        return etag
+
+    async def _post_object(self, request: web.Request, bucket: str) -> web.Response:
+        # presigned POST 폼 업로드 (정책/서명은 검증하지 않음)
+        form = await request.post()
+        upload = form.get("file")
+        if upload is None or "key" not in form:
+            return _error("InvalidArgument", "key와 file 필드가 필요합니다", 400)
+        body = upload.file.read()
+        self.bytes_in += len(body)
+        key = form["key"].replace("${filename}", upload.filename or "")
+        etag = self._store(bucket, key, body, form.get("Content-Type", upload.content_type))
+        return web.Response(status=204, headers={"ETag": etag})
+
+    def _get(self, request: web.Request, bucket: str, key: str) -> web.Response:
+        obj = self.objects.get((bucket, key))
+        if obj is None:
+            if request.method == "HEAD":
+                return web.Response(status=404)
+            return _error("NoSuchKey", key, 404)
+        body = obj["body"]
+        headers = {
+            "ETag": obj["etag"], "Accept-Ranges": "bytes",
+            "Last-Modified": time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(obj["modified"])),
+        }
+        status = 200
+        match = re.match(r"bytes=(\d*)-(\d*)$", request.headers.get("Range", ""))
+        if match and body:
+            start = int(match.group(1)) if match.group(1) else max(len(body) - int(match.group(2)), 0)
+            end = int(match.group(2)) if match.group(1) and match.group(2) else len(body) - 1
+            end = min(end, len(body) - 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            body = body[start:end + 1]
+            status = 206
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            return web.Response(status=status, headers=headers, content_type=obj["content_type"])
+        self.bytes_out += len(body)
+        return web.Response(body=body, status=status, headers=headers, content_type=obj["content_type"])
+
+    async def _delete_objects(self, request: web.Request, bucket: str) -> web.Response:
+        root = ElementTree.fromstring(await request.read())
+        deleted = []
+        for element in root.iter():
+            if element.tag.endswith("Key"):
+                self.objects.pop((bucket, element.text), None)
+                deleted.append(f"<Deleted><Key>{escape(element.text)}</Key></Deleted>")
+        return _xml(f'<DeleteResult xmlns="{_S3_NS}">{"".join(deleted)}</DeleteResult>')
+
+    def _list_objects(self, bucket: str, prefix: str, max_keys: int) -> web.Response:
+        keys = sorted(key for (b, key) in self.objects if b == bucket and key.startswith(prefix))[:max_keys]
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key><Size>{len(self.objects[(bucket, key)]['body'])}</Size>"
+            f"<LastModified>{time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(self.objects[(bucket, key)]['modified']))}</LastModified>"
+            f"<ETag>{escape(self.objects[(bucket, key)]['etag'])}</ETag><StorageClass>STANDARD</StorageClass></Contents>"
+            for key in keys
+        )
+        return _xml(
+            f'<ListBucketResult xmlns="{_S3_NS}"><Name>{bucket}</Name><Prefix>{escape(prefix)}</Prefix>'
+            f"<KeyCount>{len(keys)}</KeyCount><MaxKeys>{max_keys}</MaxKeys><IsTruncated>false</IsTruncated>"
+            f"{contents}</ListBucketResult>"
+        )
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "requests": self.requests, "objects": len(self.objects), "uploads": len(self.uploads),
+            "bytes_in": self.bytes_in, "bytes_out": self.bytes_out,
+        })
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 ** 3)
+        app.router.add_get("/__stats", self.stats)
+        app.router.add_route("*", "/{bucket}", self.handle)
+        app.router.add_route("*", "/{bucket}/", self.handle)
+        app.router.add_route("*", "/{bucket}/{key:.+}", self.handle)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9300)
+    args = parser.parse_args()
+    web.run_app(FakeS3().app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""오프라인 부하 테스트: 가짜 OpenAI / ModelsLab / S3 서버를 띄우고 앱을 별도 프로세스로 실행해 엔드포인트별로 측정
+
+외부 API 키나 네트워크 없이 엔드포인트별 p50/p95/p99 지연, 처리량, 상태 코드 분포,
+서버 프로세스(자식 프로세스 포함) 최대 RSS를 출력한다. 변경 전후를 같은 조건으로 비교하기 위한 용도.
+
+    python -m bench.load_test --requests 40 --concurrency 10 --modelslab-delay 3
+    python -m bench.load_test --endpoints animate-image --env MODELSLAB_VIDEO_RPS=0 --json /tmp/before.json
+    python -m bench.load_test --workers 4 --endpoints characterize-image animate-image-async   # run.py 운영 모드
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from aiohttp import web
+from PIL import Image
+
+from bench.fake_modelslab import FakeModelsLab
+from bench.fake_openai import FakeOpenAI
+from bench.fake_s3 import FakeS3
+
+ENDPOINTS = ("generate-diary", "generate-diary-stream", "animate-image", "animate-image-async", "characterize-image",
+             "characterize-images")
+BUCKET = "bench-bucket"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def _process_tree_rss(pid: int) -> int:
+    """pid와 모든 자식 프로세스의 RSS 합계(bytes), /proc 기반 (Linux 전용)"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as children:
+                    pending.extend(int(child) for child in children.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+class RssSampler:
+    """측정 구간 동안 서버 프로세스 트리의 RSS를 주기적으로 기록"""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, _process_tree_rss(self.pid))
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = _process_tree_rss(self.pid)
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+        self.peak = max(self.peak, _process_tree_rss(self.pid))
+
+
+def _sample_image(index: int, side: int) -> bytes:
+    # 요청마다 다른 이미지 (결과 캐시/요청 병합이 측정을 가리지 않도록)
+    # 단색 이미지는 최소 업로드 크기(30KB)보다 작게 압축되므로 사진처럼 노이즈를 채움
+    rng = random.Random(index)
+    image = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def _request(client: httpx.AsyncClient, endpoint: str, index: int, image_side: int, batch_size: int) -> int:
+    if endpoint == "generate-diary":
+        response = await client.post("/generate-diary", json={"user_text": f"가족과 공원 나들이 {index}"})
+        return response.status_code
+    if endpoint == "generate-diary-stream":
+        async with client.stream("POST", "/generate-diary/stream", json={"user_text": f"가족 여행 {index}"}) as response:
+            async for _ in response.aiter_bytes():
+                pass
+            return response.status_code
+    if endpoint == "characterize-images":
+        # 한 요청에 batch_size장, 모든 이미지가 성공해야 성공으로 집계
+        files = [("images", (f"bench-{index}-{i}.jpg", _sample_image(index * 1000 + i, image_side), "image/jpeg"))
+                 for i in range(batch_size)]
+        async with client.stream("POST", "/characterize-images", files=files) as response:
+            lines = [json.loads(line) async for line in response.aiter_lines() if line]
+        if response.status_code == 200 and (not lines or lines[-1].get("succeeded") != batch_size):
+            return 502
+        return response.status_code
+    files = {"image": (f"bench-{index}.jpg", _sample_image(index, image_side), "image/jpeg")}
+    if endpoint == "animate-image-async":
+        response = await client.post("/animate-image", files=files,
+                                     data={"prompt": f"gentle camera move {index}", "async_mode": "true"})
+        if response.status_code != 202:
+            return response.status_code
+        job = response.json()
+        status_url = job["status_url"]
+        while job.get("status") not in ("completed", "failed"):
+            # 매번 새 연결로 조회해 다른 워커로 들어간 조회도 응답하는지 확인
+            response = await client.get(status_url, params={"wait": 30}, headers={"Connection": "close"})
+            if response.status_code != 200:
+                return response.status_code
+            job = response.json()
+        return 200 if job["status"] == "completed" else 502
+    if endpoint == "animate-image":
+        response = await client.post("/animate-image", files=files, data={"prompt": f"gentle camera move {index}"})
+    else:
+        response = await client.post("/characterize-image", files=files)
+    if response.status_code == 200 and response.json().get("status") == "error":
+        return 502  # 본문에 오류가 담긴 200 응답은 실패로 집계
+    return response.status_code
+
+
+async def run_endpoint(base_url: str, server_pid: int, endpoint: str, total: int, concurrency: int,
+                       image_side: int, batch_size: int, timeout: float) -> dict:
+    latencies = []
+    statuses = {}
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            for index in counter:
+                started = time.perf_counter()
+                try:
+                    status = await _request(client, endpoint, index, image_side, batch_size)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        with RssSampler(server_pid) as rss:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+    ok = statuses.get(200, 0)
+    return {
+        "endpoint": endpoint,
+        "requests": total,
+        "concurrency": concurrency,
+        "ok": ok,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "elapsed_s": round(elapsed, 2),
+        "peak_rss_mb": round(rss.peak / 1024 / 1024, 1),
+    }
+
+
+async def _start_fake(app: web.Application, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def _wait_ready(base_url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=2) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"앱 프로세스가 종료되었습니다 (exit code {process.returncode})")
+            try:
+                # warm-up이 끝난 뒤부터 측정
+                if (await client.get("/readyz")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("앱이 시작되지 않았습니다")
+
+
+def _server_env(args, ports: dict) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "CHAT_GPT_API_KEY": "bench",
+        "MODELSLAB_API_KEY": "bench",
+        "AWS_ACCESS_KEY_ID": "bench",
+        "AWS_SECRET_ACCESS_KEY": "bench",
+        "S3_BUCKET": BUCKET,
+        "S3_REGION": "ap-northeast-2",
+        "CDN_DOMAIN": "cdn.bench.local",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{ports['openai']}/v1",
+        "MODELSLAB_BASE_URL": f"http://127.0.0.1:{ports['modelslab']}",
+        "S3_ENDPOINT_URL": f"http://127.0.0.1:{ports['s3']}",
+        "RESULT_CACHE_ENABLED": "false",
+        "MODELSLAB_POLL_MIN_INTERVAL": "0.5",
+        "MODELSLAB_WEBHOOK_URL": "",
+        "TRACE_OUTPUT": "",
+        "TEMP_JANITOR_PATH": "",
+        "TEMP_JANITOR_INTERVAL": "1",
+        "JOB_STORE_PATH": os.path.join(tempfile.gettempdir(), "bench_jobs.sqlite3"),
+    })
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+async def main(args) -> list:
+    ports = {name: _free_port() for name in ("openai", "modelslab", "s3", "app")}
+    fakes = {
+        "openai": FakeOpenAI(args.chat_delay, args.image_delay, error_rate=args.error_rate),
+        "modelslab": FakeModelsLab(args.modelslab_delay, error_rate=args.error_rate, output_size=args.output_size),
+        "s3": FakeS3(),
+    }
+    runners = [await _start_fake(fake.app(), ports[name]) for name, fake in fakes.items()]
+
+    base_url = f"http://127.0.0.1:{ports['app']}"
+    log = open(args.server_log, "w")
+    if args.workers:
+        command = [sys.executable, "run.py", "--mode", "prod", "--workers", str(args.workers)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app"]
+    process = subprocess.Popen(
+        command + ["--host", "127.0.0.1", "--port", str(ports["app"]), "--no-access-log"],
+        env=_server_env(args, ports), stdout=log, stderr=subprocess.STDOUT
+    )
+    results = []
+    try:
+        await _wait_ready(base_url, process)
+        for endpoint in args.endpoints:
+            result = await run_endpoint(
+                base_url, process.pid, endpoint, args.requests, args.concurrency, args.image_side, args.batch_size,
+                args.timeout
+            )
+            results.append(result)
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            # 종료 중인 앱이 가짜 서버(같은 이벤트 루프)를 호출할 수 있으므로 루프를 막지 않고 대기
+            await asyncio.to_thread(process.wait, 30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
+        for runner in runners:
+            await runner.cleanup()
+
+    # 영상화 입력(temp/images)은 작업이 끝나면 모두 삭제되어야 함
+    leftover = sum(1 for _, key in fakes["s3"].objects if key.startswith("temp/images/"))
+    print(f"fake s3: {len(fakes['s3'].objects)} objects ({leftover} temp/images left), "
+          f"{fakes['s3'].bytes_in / 1024 / 1024:.1f} MB in / server log: {args.server_log}")
+    return results
+
+
+def _print_table(results: list):
+    header = f"{'endpoint':<24}{'ok/total':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>8}{'peak RSS MB':>13}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['endpoint']:<24}{r['ok']:>5}/{r['requests']:<4}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+              f"{r['p99_ms']:>10}{r['throughput_rps']:>8}{r['peak_rss_mb']:>13}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=20, help="엔드포인트별 요청 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수")
+    parser.add_argument("--timeout", type=float, default=300, help="요청당 최대 대기 시간(초)")
+    parser.add_argument("--image-side", type=int, default=1024, help="업로드 이미지 한 변 길이(px)")
+    parser.add_argument("--batch-size", type=int, default=8, help="characterize-images 요청당 이미지 수")
+    parser.add_argument("--chat-delay", type=float, default=1.0, help="가짜 OpenAI chat 응답 시간(초)")
+    parser.add_argument("--image-delay", type=float, default=3.0, help="가짜 OpenAI 이미지 생성 시간(초)")
+    parser.add_argument("--modelslab-delay", type=float, default=3.0, help="가짜 ModelsLab 작업 처리 시간(초)")
+    parser.add_argument("--output-size", type=int, default=2 * 1024 * 1024, help="가짜 ModelsLab 결과 파일 크기(bytes)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="가짜 업스트림 오류 비율")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="앱 프로세스 환경 변수 추가/변경")
+    parser.add_argument("--workers", type=int, default=0, help="0보다 크면 run.py 운영 모드로 워커 여러 개 실행")
+    parser.add_argument("--server-log", default="/tmp/load_test_server.log")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    _print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(results, output, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,158 @@
+"""로깅 벤치마크: 이벤트 루프에서 직접 출력(변경 전) vs 큐 + 지연 포맷 + 샘플링(변경 후)
+
+가짜 ModelsLab 작업 여러 개가 동시에 접수/polling 로그를 남기는 동안
+이벤트 루프 스레드가 로깅 호출 안에서 보낸 시간과 루프 지연(sleep 초과 시간)을 측정한다.
+
+    python -m bench.logging_bench --jobs 200 --polls 20 --output /tmp/logging_bench.log
+"""
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import statistics
+import sys
+import time
+from logging.handlers import QueueListener
+
+from multidict import CIMultiDict
+
+from app.logging_setup import JsonFormatter, RateLimitFilter, _LazyQueueHandler
+
+HEADERS = CIMultiDict({
+    "Content-Type": "application/json", "Content-Length": "812", "Connection": "keep-alive",
+    "Date": "Mon, 01 Jan 2024 00:00:00 GMT", "Server": "cloudflare", "CF-RAY": "8a1b2c3d4e5f6789-ICN",
+    "Cache-Control": "no-cache, private", "Vary": "Accept-Encoding", "X-RateLimit-Limit": "60",
+    "X-RateLimit-Remaining": "59", "Strict-Transport-Security": "max-age=31536000", "Alt-Svc": "h3=\":443\"",
+})
+PROMPT = "A warm family moment, soft light, gentle camera movement, cinematic, " * 4
+
+
+def poll_result(task_id: int, attempt: int) -> dict:
+    return {
+        "status": "processing", "id": task_id, "eta": 12, "tip": "Your image is processing",
+        "message": "Request processing", "fetch_result": f"https://modelslab.com/api/v7/video-fusion/fetch/{task_id}",
+        "future_links": [f"https://pub-cdn.modelslab.com/video/{task_id}-{i}.mp4" for i in range(2)],
+        "meta": {"prompt": PROMPT, "model_id": "seedance-i2v", "attempt": attempt, "seed": 1234567890,
+                 "width": 1280, "height": 720, "num_frames": 81, "fps": 16},
+    }
+
+
+def configure(mode: str, output: str):
+    """mode: sync(변경 전 basicConfig 방식) / queue(변경 후). 리스너(있으면) 반환"""
+    stream = open(output, "a", encoding="utf-8") if output != "stderr" else sys.stderr
+    handler = logging.StreamHandler(stream)
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    poll_logger = logging.getLogger("bench.poll")
+    poll_logger.filters.clear()
+
+    if mode == "sync":
+        handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+        root.addHandler(handler)
+        return None
+
+    handler.setFormatter(JsonFormatter())
+    queue_handler = _LazyQueueHandler(queue.Queue(10000))
+    root.addHandler(queue_handler)
+    poll_logger.addFilter(RateLimitFilter())
+    listener = QueueListener(queue_handler.queue, handler)
+    listener.start()
+    return listener
+
+
+def log_submit_old(task_id: int, image_url: str, result: dict):
+    logging.info(f"ModelsLab API 키 상태: 설정됨")
+    logging.info(f"ModelsLab API 키 길이: 32자")
+    logging.info(f"ModelsLab API 호출 시작: {image_url}")
+    logging.info(f"ModelsLab API 요청 데이터: {{'key': '***', 'model_id': 'seedance-i2v', 'init_image': '{image_url}', 'prompt': '{PROMPT}'}}")
+    logging.info(f"ModelsLab API 응답 상태: 200")
+    logging.info(f"ModelsLab API 응답 헤더: {dict(HEADERS)}")
+    logging.info(f"ModelsLab API 응답: {result}")
+    logging.info(f"ModelsLab API 처리 중 - task_id: {task_id}")
+
+
+def log_submit_new(task_id: int, image_url: str, result: dict):
+    logging.info("ModelsLab API 호출 시작: %s (model_id: %s)", image_url, "seedance-i2v")
+    logging.debug("ModelsLab API 응답 상태: %s, 헤더: %s", 200, HEADERS)
+    logging.debug("ModelsLab API 응답: %s", result)
+    logging.info("ModelsLab API 처리 중 - task_id: %s, eta: %s", task_id, result.get("eta"))
+
+
+def log_poll_old(task_id: int, attempt: int, result: dict):
+    logging.info(f"ModelsLab 결과 확인 시도 {attempt} - task_id: {task_id}")
+    logging.info(f"ModelsLab Polling 응답: {result}")
+
+
+def log_poll_new(task_id: int, attempt: int, result: dict):
+    poll_logger = logging.getLogger("bench.poll")
+    poll_logger.info("%s 결과 확인 시도 %d - task_id: %s", "ModelsLab", attempt, task_id)
+    poll_logger.debug("%s Polling 응답: %s", "ModelsLab", result)
+
+
+async def run(mode: str, jobs: int, polls: int, output: str) -> dict:
+    listener = configure(mode, output)
+    log_submit = log_submit_old if mode == "sync" else log_submit_new
+    log_poll = log_poll_old if mode == "sync" else log_poll_new
+    spent = [0.0]
+    lags = []
+    done = asyncio.Event()
+
+    def timed(func, *args):
+        started = time.perf_counter()
+        func(*args)
+        spent[0] += time.perf_counter() - started
+
+    async def job(task_id: int):
+        timed(log_submit, task_id, f"https://cdn.example.com/temp/images/{task_id}.jpg", poll_result(task_id, 0))
+        for attempt in range(1, polls + 1):
+            await asyncio.sleep(0.001)
+            timed(log_poll, task_id, attempt, poll_result(task_id, attempt))
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append((time.perf_counter() - started - 0.005) * 1000)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(job(i) for i in range(jobs)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+
+    flush_started = time.perf_counter()
+    if listener:
+        listener.stop()
+    flush = time.perf_counter() - flush_started
+
+    calls = jobs * (polls + 1)
+    return {
+        "loop_time_in_logging_ms": round(spent[0] * 1000, 1),
+        "per_call_us": round(spent[0] / calls * 1_000_000, 1),
+        "elapsed_s": round(elapsed, 3),
+        "lag_p50_ms": round(statistics.median(lags), 2) if lags else 0,
+        "lag_max_ms": round(max(lags), 2) if lags else 0,
+        "listener_flush_s": round(flush, 3),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=200, help="동시에 polling 하는 작업 수")
+    parser.add_argument("--polls", type=int, default=20, help="작업당 polling 횟수")
+    parser.add_argument("--output", default="/tmp/logging_bench.log", help="로그 출력 파일 (stderr 가능)")
+    args = parser.parse_args()
+
+    if args.output != "stderr" and os.path.exists(args.output):
+        os.remove(args.output)
+    for mode in ("sync", "queue"):
+        result = asyncio.run(run(mode, args.jobs, args.polls, args.output))
+        print(mode, result, file=sys.stdout if args.output != "stderr" else sys.__stdout__)
+
+
+if __name__ == "__main__":
+    main_cli()
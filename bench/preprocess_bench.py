@@ -0,0 +1,113 @@
+"""이미지 전처리 벤치마크: 이벤트 루프 인라인 실행 vs 전처리 실행기
+
+S3 업로드와 ModelsLab 호출은 가짜로 대체하고, 동시에 /animate-image 업로드를 보내
+초당 처리 요청 수와 그 사이 가벼운 요청(/jobs/{id})의 응답 지연을 측정한다.
+
+    python -m bench.preprocess_bench --requests 32 --concurrency 8
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("S3_BUCKET", "bench-bucket")
+os.environ.setdefault("S3_REGION", "ap-northeast-2")
+os.environ.setdefault("TEMP_JANITOR_PATH", "")
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from app import main, image_processing  # noqa: E402
+
+
+def make_photo(width: int, height: int) -> bytes:
+    """휴대폰 사진과 비슷한 크기의 JPEG 생성"""
+    image = Image.effect_noise((width // 4, height // 4), 64).convert("RGB").resize((width, height))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def fake_upload(image_bytes: bytes, directory: str, ext: str = "png") -> str:
+    return f"https://bench.invalid/temp/{directory}/bench.{ext}"
+
+
+async def fake_animate(image_url: str, prompt: str, on_progress=None, image_digest: str = None) -> dict:
+    await asyncio.sleep(0.05)
+    return {"video_url": "https://bench.invalid/video.mp4", "status": "success", "message": "ok"}
+
+
+async def inline_preprocess(image_data: bytes, profile: str = "video") -> tuple:
+    # 변경 전 동작: 이벤트 루프에서 직접 실행
+    return image_processing.preprocess_image(image_data, profile)
+
+
+async def run(photo: bytes, total: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=main.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    probe_latencies = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def upload():
+            async with semaphore:
+                response = await client.post(
+                    "/animate-image",
+                    files={"image": ("photo.jpg", photo, "image/jpeg")},
+                    data={"prompt": "bench"}
+                )
+                assert response.status_code == 200, response.text
+
+        async def probe():
+            # 대기 시간을 포함해 측정: 루프가 막히면 sleep이 늦게 깨어난 만큼 지연으로 잡힌다
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.02)
+                await client.get("/jobs/unknown")
+                probe_latencies.append((time.perf_counter() - started - 0.02) * 1000)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(upload() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    probe_latencies.sort()
+    return {
+        "requests_per_sec": round(total / elapsed, 2),
+        "probe_p50_ms": round(statistics.median(probe_latencies), 1),
+        "probe_max_ms": round(probe_latencies[-1], 1),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    args = parser.parse_args()
+
+    photo = make_photo(args.width, args.height)
+    print(f"photo: {len(photo)} bytes, executor: {image_processing.IMAGE_EXECUTOR} x {image_processing.IMAGE_WORKERS}")
+
+    main.upload_temp_image = fake_upload
+    main.VideoAIService.animate_image = staticmethod(fake_animate)
+
+    pooled = main.preprocess_image_async
+    for label, preprocess in (("inline (before)", inline_preprocess), ("executor (after)", pooled)):
+        main.preprocess_image_async = preprocess
+        image_processing.init_image_executor()
+        asyncio.run(image_processing.warm_up_image_executor())
+        result = asyncio.run(run(photo, args.requests, args.concurrency))
+        image_processing.shutdown_image_executor()
+        print(label, result)
+
+
+if __name__ == "__main__":
+    main_cli()
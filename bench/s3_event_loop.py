@@ -0,0 +1,78 @@
+"""S3 업로드 중 이벤트 루프가 다른 요청을 계속 처리하는지 확인하는 스크립트
+
+실제 AWS 대신 put_object가 지정한 시간만큼 블로킹되는 가짜 클라이언트를 사용한다.
+
+    python -m bench.s3_event_loop --upload-seconds 2
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("S3_BUCKET", "bench-bucket")
+os.environ.setdefault("S3_REGION", "ap-northeast-2")
+
+from app import s3_util  # noqa: E402
+
+
+class SlowS3Client:
+    """대용량 업로드를 흉내 내는 블로킹 클라이언트"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def put_object(self, **kwargs):
+        time.sleep(self.seconds)
+        return {}
+
+
+async def ticker(stop: asyncio.Event, interval: float, gaps: list):
+    """다른 요청을 흉내 내는 코루틴: 주기적으로 깨어나 지연을 기록"""
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        gaps.append(now - last - interval)
+        last = now
+
+
+async def measure(blocking: bool, upload_seconds: float, interval: float) -> dict:
+    stop = asyncio.Event()
+    gaps = []
+    task = asyncio.create_task(ticker(stop, interval, gaps))
+    await asyncio.sleep(interval * 2)
+
+    started = time.perf_counter()
+    if blocking:
+        # 기존 방식: 코루틴 안에서 boto3를 직접 호출
+        s3_util.get_s3_client().put_object(Bucket=s3_util.AWS_S3_BUCKET, Key="bench.mp4", Body=b"")
+    else:
+        await s3_util.S3BlobStore().put("bench.mp4", b"", "video/mp4")
+    elapsed = time.perf_counter() - started
+
+    await asyncio.sleep(interval * 2)
+    stop.set()
+    await task
+    return {
+        "upload_seconds": round(elapsed, 3),
+        "ticks": len(gaps),
+        "max_loop_stall_ms": round(max(gaps) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--upload-seconds", type=float, default=2.0)
+    parser.add_argument("--interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    s3_util._client = SlowS3Client(args.upload_seconds)
+    for blocking in (True, False):
+        label = "blocking boto3" if blocking else "async S3BlobStore"
+        print(label, asyncio.run(measure(blocking, args.upload_seconds, args.interval)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""앱 시작 프로파일: import 시간 분석과 프로세스 시작 후 healthz/readyz/첫 요청까지의 시간 측정
+
+1. `python -X importtime -c "import app.main"` 결과를 최상위 패키지별 self 시간으로 묶어 출력
+2. 가짜 업스트림과 함께 앱을 띄워 /healthz, /readyz가 200이 되는 시점과 첫/두 번째 요청 지연을 측정
+
+    python -m bench.startup_profile
+    python -m bench.startup_profile --compare-warmup --top 15
+"""
+import argparse
+import asyncio
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench.fake_modelslab import FakeModelsLab
+from bench.fake_openai import FakeOpenAI
+from bench.fake_s3 import FakeS3
+from bench.load_test import _free_port, _sample_image, _server_env, _start_fake
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(env: dict, top: int) -> dict:
+    """import app.main의 모듈별 import 시간(마이크로초)을 최상위 패키지 단위로 집계"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, capture_output=True, text=True, check=True
+    )
+    packages = {}
+    app_modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, name = int(match.group(1)), int(match.group(2)), match.group(4)
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+        if root == "app":
+            app_modules[name] = cumulative_us
+        if name == "app.main":
+            total = cumulative_us
+
+    wall = []
+    for _ in range(3):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import app.main"], env=env, capture_output=True, check=True)
+        wall.append(time.perf_counter() - started)
+
+    return {
+        "import_ms": round(total / 1000, 1),
+        "process_wall_ms": round(statistics.median(wall) * 1000, 1),
+        "packages": sorted(((name, round(us / 1000, 1)) for name, us in packages.items()), key=lambda item: -item[1])[:top],
+        "app_modules": sorted(((name, round(us / 1000, 1)) for name, us in app_modules.items()), key=lambda item: -item[1]),
+    }
+
+
+async def lifecycle_profile(args, extra_env: list) -> dict:
+    """프로세스 시작 → /healthz 200 → /readyz 200 → 첫 요청/두 번째 요청 지연"""
+    ports = {name: _free_port() for name in ("openai", "modelslab", "s3", "app")}
+    fakes = {
+        "openai": FakeOpenAI(0.1, 0.1),
+        "modelslab": FakeModelsLab(args.modelslab_delay, output_size=256 * 1024),
+        "s3": FakeS3(),
+    }
+    runners = [await _start_fake(fake.app(), ports[name]) for name, fake in fakes.items()]
+    env = _server_env(argparse.Namespace(env=args.env + extra_env), ports)
+
+    base_url = f"http://127.0.0.1:{ports['app']}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(ports["app"]),
+         "--no-access-log"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    result = {}
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            while "ready_ms" not in result:
+                if process.poll() is not None:
+                    raise RuntimeError(f"앱 프로세스가 종료되었습니다 (exit code {process.returncode})")
+                if time.perf_counter() - started > 60:
+                    raise RuntimeError("60초 안에 준비되지 않았습니다")
+                try:
+                    if "healthy_ms" not in result and (await client.get("/healthz")).status_code == 200:
+                        result["healthy_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                    if "healthy_ms" in result:
+                        response = await client.get("/readyz")
+                        if response.status_code == 200:
+                            result["ready_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                            result["warmup"] = response.json()
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.02)
+
+            for label in ("first_request_ms", "second_request_ms"):
+                files = {"image": (f"{label}.jpg", _sample_image(len(result), args.image_side), "image/jpeg")}
+                request_started = time.perf_counter()
+                response = await client.post("/characterize-image", files=files)
+                result[label] = round((time.perf_counter() - request_started) * 1000, 1)
+                result[f"{label[:-3]}_status"] = response.status_code
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.to_thread(process.wait, 30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        for runner in runners:
+            await runner.cleanup()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=12, help="출력할 패키지 수")
+    parser.add_argument("--image-side", type=int, default=1024)
+    parser.add_argument("--modelslab-delay", type=float, default=0.5)
+    parser.add_argument("--compare-warmup", action="store_true", help="WARMUP_ENABLED=false로도 측정해 비교")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="앱 프로세스 환경 변수 추가/변경")
+    args = parser.parse_args()
+
+    env = _server_env(argparse.Namespace(env=args.env), {name: 0 for name in ("openai", "modelslab", "s3")})
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    profile = import_profile(env, args.top)
+    print(f"import app.main: {profile['import_ms']}ms (프로세스 전체 {profile['process_wall_ms']}ms)")
+    print(f"{'package':<28}{'self ms':>10}")
+    for name, ms in profile["packages"]:
+        print(f"{name:<28}{ms:>10}")
+    print(f"\n{'app module':<28}{'cumulative ms':>14}")
+    for name, ms in profile["app_modules"]:
+        print(f"{name:<28}{ms:>14}")
+
+    runs = [("warm-up", [])] + ([("no warm-up", ["WARMUP_ENABLED=false"])] if args.compare_warmup else [])
+    for label, extra_env in runs:
+        result = asyncio.run(lifecycle_profile(args, extra_env))
+        steps = result.get("warmup", {}).get("steps", {})
+        print(f"\n[{label}] healthz {result['healthy_ms']}ms, readyz {result['ready_ms']}ms, "
+              f"첫 요청 {result['first_request_ms']}ms ({result['first_request_status']}), "
+              f"두 번째 요청 {result['second_request_ms']}ms ({result['second_request_status']})")
+        for name, step in steps.items():
+            print(f"  {name:<16}{step['status']:<10}{step['ms']:>8}ms {step.get('error', '')}")
+
+
+if __name__ == "__main__":
+    main()
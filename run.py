@@ -1,4 +1,118 @@
+"""서버 실행
+
+    python run.py                  개발: 코드 변경 시 자동 재시작, 프로세스 1개
+    python run.py --mode prod      운영: CPU 코어 수만큼 워커, uvloop/httptools, 종료 시 진행 중인 작업 마무리
+
+모든 옵션은 환경 변수로도 지정할 수 있다 (SERVER_MODE=prod, WEB_CONCURRENCY=4 등). 명령행 인자가 우선.
+실제로 띄우는 워커 수는 WEB_CONCURRENCY로 다시 내보내므로 워커의 업스트림 한도 분배(app.admission)와 항상 일치한다.
+"""
+import os
+import math
+import logging
+import argparse
+import importlib.util
 import uvicorn
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def available_cpus() -> int:
+    """이 프로세스가 쓸 수 있는 CPU 수 (CPU affinity와 컨테이너 cgroup v2 cpu.max 할당량 반영)"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            count = min(count, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(count, 1)
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def parse_args():
+    env = os.getenv
+    parser = argparse.ArgumentParser(description="Dearfam AI 서버 실행")
+    parser.add_argument("--mode", choices=("dev", "prod"), default=env("SERVER_MODE", "dev"))
+    parser.add_argument("--host", default=env("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(env("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(env("WEB_CONCURRENCY", "0")),
+                        help="워커 프로세스 수 (0이면 사용 가능한 CPU 코어 수, prod 모드만)")
+    # 로드밸런서 idle timeout(ALB 기본 60초)보다 길어야 재사용하려던 연결이 먼저 닫혀 502가 나지 않음
+    parser.add_argument("--keep-alive", type=int, default=int(env("SERVER_KEEPALIVE", "75")),
+                        help="keep-alive 연결 유지 시간(초)")
+    # 실제 대기열 길이는 커널의 net.core.somaxconn을 넘지 않음
+    parser.add_argument("--backlog", type=int, default=int(env("SERVER_BACKLOG", "2048")),
+                        help="accept 대기열 길이")
+    parser.add_argument("--max-requests", type=int, default=int(env("SERVER_MAX_REQUESTS", "0")),
+                        help="워커가 이 수만큼 요청을 처리하면 교체 (0이면 교체하지 않음)")
+    parser.add_argument("--max-requests-jitter", type=int, default=int(env("SERVER_MAX_REQUESTS_JITTER", "-1")),
+                        help="교체 기준에 더할 무작위 값 최대치 (워커가 동시에 교체되지 않게, 기본 max-requests의 10%%)")
+    # 종료 시 진행 중인 HTTP 요청(동기 영상화 등)을 기다리는 시간(초). 이후 백그라운드 작업은 JOB_DRAIN_TIMEOUT만큼 대기
+    parser.add_argument("--graceful-timeout", type=float, default=float(env("SERVER_GRACEFUL_TIMEOUT", "180")),
+                        help="종료 시 진행 중인 요청 대기 시간(초)")
+    parser.add_argument("--loop", choices=("uvloop", "asyncio"), default=env("SERVER_LOOP", "uvloop"))
+    parser.add_argument("--http", choices=("httptools", "h11"), default=env("SERVER_HTTP", "httptools"))
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false",
+                        default=env("SERVER_ACCESS_LOG", "true").lower() == "true")
+    return parser.parse_args()
+
+
+def run_dev(args):
+    os.environ["WEB_CONCURRENCY"] = "1"
+    uvicorn.run("app.main:app", host=args.host, port=args.port, reload=True, access_log=args.access_log)
+
+
+def run_prod(args):
+    cpus = available_cpus()
+    workers = args.workers if args.workers > 0 else cpus
+
+    loop, http = args.loop, args.http
+    if loop == "uvloop" and not _installed("uvloop"):
+        logging.warning("uvloop이 설치되어 있지 않아 asyncio 이벤트 루프를 사용합니다 (pip install uvicorn[standard])")
+        loop = "asyncio"
+    if http == "httptools" and not _installed("httptools"):
+        logging.warning("httptools가 설치되어 있지 않아 h11 HTTP 파서를 사용합니다 (pip install uvicorn[standard])")
+        http = "h11"
+
+    jitter = args.max_requests_jitter if args.max_requests_jitter >= 0 else args.max_requests // 10
+
+    # 워커 프로세스가 물려받는 설정: 워커 수(업스트림 한도를 워커별로 나눔)와 워커당 이미지 전처리 프로세스 수
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    os.environ.setdefault("IMAGE_WORKERS", str(max(1, min(cpus // workers, 4))))
+
+    logging.info(
+        "운영 모드 시작: workers=%d (CPU %d), loop=%s, http=%s, keep-alive=%ds, backlog=%d, max-requests=%d(+%d), "
+        "graceful-timeout=%.0fs", workers, cpus, loop, http, args.keep_alive, args.backlog, args.max_requests, jitter,
+        args.graceful_timeout
+    )
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=args.keep_alive,
+        backlog=args.backlog,
+        limit_max_requests=args.max_requests or None,
+        limit_max_requests_jitter=jitter,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=args.access_log,
+    )
+
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(message)s")
+    arguments = parse_args()
+    if arguments.mode == "prod":
+        run_prod(arguments)
+    else:
+        run_dev(arguments)
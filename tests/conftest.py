@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# app 모듈은 import 시점에 환경 변수를 읽으므로 먼저 테스트용 값을 지정 (실제 AWS/ModelsLab에는 연결하지 않음)
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+os.environ.setdefault("S3_BUCKET", "test-bucket")
+os.environ.setdefault("S3_REGION", "ap-northeast-2")
+os.environ.setdefault("MODELSLAB_API_KEY", "test")
+os.environ.setdefault("BLOB_STORE", "memory")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="dearfam-test-"))
+os.environ.setdefault("TRACE_OUTPUT", "")
+os.environ.setdefault("RESULT_CACHE_ENABLED", "false")
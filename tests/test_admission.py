@@ -0,0 +1,116 @@
+import asyncio
+import logging
+
+import pytest
+
+from app import admission
+from app.admission import Overloaded, UpstreamLimiter, split_limits
+
+
+def _limiter(**overrides) -> UpstreamLimiter:
+    options = {"max_concurrency": 2, "rate": 0, "burst": 1, "max_queue": 1, "queue_timeout": 5, "max_rate_wait": 5}
+    options.update(overrides)
+    return UpstreamLimiter("test", **options)
+
+
+async def _hold(limiter: UpstreamLimiter, release: asyncio.Event):
+    async with limiter.slot():
+        await release.wait()
+
+
+def test_concurrency_and_queue_limit():
+    async def scenario():
+        limiter = _limiter()
+        release = asyncio.Event()
+        holders = [asyncio.create_task(_hold(limiter, release)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert (limiter.stats()["active"], limiter.stats()["waiting"]) == (2, 1)
+
+        # 슬롯 2개 사용 중 + 대기열 1개 가득 참
+        with pytest.raises(Overloaded) as raised:
+            async with limiter.slot():
+                pass
+        assert raised.value.status_code == 503
+        assert int(raised.value.retry_after_header) >= 1
+
+        release.set()
+        await asyncio.gather(*holders)
+        assert limiter.stats()["admitted"] == 3
+        assert limiter.rejected_queue_full == 1
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout():
+    async def scenario():
+        limiter = _limiter(max_concurrency=1, queue_timeout=0.05)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(limiter, release))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded) as raised:
+            async with limiter.slot():
+                pass
+        assert raised.value.status_code == 503
+        assert limiter.rejected_timeout == 1
+        release.set()
+        await holder
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit():
+    async def scenario():
+        limiter = _limiter(rate=1, burst=1, max_rate_wait=0.1)
+        async with limiter.slot():
+            pass
+        # 토큰을 다 썼으므로 다음 토큰까지 약 1초: 허용 대기 시간(0.1초)을 넘어 429
+        with pytest.raises(Overloaded) as raised:
+            limiter.check()
+        assert raised.value.status_code == 429
+        assert limiter.rejected_rate == 1
+
+    asyncio.run(scenario())
+
+
+def test_rate_wait_within_budget():
+    async def scenario():
+        limiter = _limiter(rate=20, burst=1, max_rate_wait=1)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(3):
+            async with limiter.slot():
+                pass
+        # 첫 호출은 버스트, 나머지 둘은 초당 20회 간격으로 대기
+        assert loop.time() - started >= 0.09
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("workers, expected", [
+    (1, {"max_concurrency": 4, "rate": 2, "burst": 2, "max_queue": 32}),
+    (2, {"max_concurrency": 2, "rate": 1, "burst": 1, "max_queue": 16}),
+    (3, {"max_concurrency": 2, "rate": 2 / 3, "burst": 1, "max_queue": 11}),
+])
+def test_split_limits_across_workers(workers, expected):
+    assert split_limits(4, 2, 2, 32, workers) == pytest.approx(expected)
+
+
+def test_split_limits_keeps_one_slot_per_worker():
+    # 워커가 한도보다 많으면 워커당 1개: 서버 전체 동시 실행 수는 워커 수만큼
+    assert split_limits(2, 1, 1, 8, 4)["max_concurrency"] == 1
+
+
+def test_warns_when_workers_exceed_limit(monkeypatch, caplog):
+    monkeypatch.setattr(admission, "ADMISSION_WORKERS", 4)
+    monkeypatch.setenv("TEST_UPSTREAM_MAX_CONCURRENCY", "2")
+    with caplog.at_level(logging.WARNING):
+        limiter = admission._limiter_from_env("test", "TEST_UPSTREAM", 16, 1, 8)
+    assert limiter.max_concurrency == 1
+    assert "최대 4개" in caplog.text
+
+
+def test_no_warning_when_limit_divides_evenly(monkeypatch, caplog):
+    monkeypatch.setattr(admission, "ADMISSION_WORKERS", 2)
+    with caplog.at_level(logging.WARNING):
+        admission._limiter_from_env("test", "TEST_UPSTREAM", 4, 1, 8)
+    assert caplog.text == ""
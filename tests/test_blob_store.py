@@ -0,0 +1,46 @@
+import asyncio
+import os
+
+import pytest
+
+from app.blob_store import LocalBlobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalBlobStore(root=str(tmp_path), base_url="http://test/blobs/local")
+
+
+def _open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="/proc 필요")
+def test_read_returns_bytes_and_releases_file(store):
+    async def scenario():
+        await store.put("temp/images/a.jpg", b"0123456789", "image/jpeg")
+        before = _open_fds()
+        head = await store.get("temp/images/a.jpg", 2, 3)
+        whole = await store.get("temp/images/a.jpg")
+        # 돌려준 본문이 파일/매핑을 붙잡고 있지 않음
+        assert _open_fds() == before
+        assert isinstance(head.body, bytes) and head.body == b"234" and head.size == 10
+        assert whole.body == b"0123456789"
+
+        # 읽은 뒤 교체/삭제되어도 이미 받은 본문은 그대로
+        await store.put("temp/images/a.jpg", b"xy", "image/jpeg")
+        await store.delete("temp/images/a.jpg")
+        assert whole.body == b"0123456789"
+        assert await store.get("temp/images/a.jpg") is None
+
+    asyncio.run(scenario())
+
+
+def test_put_stream_removes_partial_file_on_failure(store, tmp_path):
+    async def chunks():
+        yield b"x" * 100
+        raise ConnectionError("upstream closed")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(store.put_stream("temp/videos/a.mp4", chunks(), "video/mp4"))
+    assert os.listdir(tmp_path / "temp" / "videos") == []
@@ -0,0 +1,36 @@
+import asyncio
+import gc
+import logging
+
+from app import main
+
+
+def test_disconnect_cancels_and_awaits_pending_items(monkeypatch, caplog):
+    started, finished = [], []
+
+    async def slow_characterize(image_data, filename, content_type, async_mode):
+        started.append(filename)
+        try:
+            await asyncio.sleep(10)
+        finally:
+            # 취소된 뒤에도 정리(임시 이미지 삭제 등)에 루프를 몇 번 더 도는 경우
+            await asyncio.sleep(0.05)
+            finished.append(filename)
+
+    monkeypatch.setattr(main, "_characterize_image", slow_characterize)
+
+    async def scenario():
+        stream = main._characterize_batch([(f"{i}.jpg", "image/jpeg", b"") for i in range(3)], "ndjson")
+        consumer = asyncio.create_task(stream.__anext__())
+        await asyncio.sleep(0.01)
+        # 클라이언트 연결 끊김: 응답 생성기가 취소되고 닫힘
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        # 생성기가 끝나기 전에 남은 작업의 정리(finally)가 모두 실행되어야 함
+        assert started and sorted(finished) == sorted(started)
+        await stream.aclose()
+
+    with caplog.at_level(logging.ERROR, logger="asyncio"):
+        asyncio.run(scenario())
+        gc.collect()
+    assert "Task was destroyed" not in caplog.text
@@ -0,0 +1,50 @@
+import asyncio
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app import image_processing
+
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    monkeypatch.setattr(image_processing, "IMAGE_EXECUTOR", "process")
+    monkeypatch.setattr(image_processing, "IMAGE_WORKERS", 1)
+    monkeypatch.setattr(image_processing, "_executor", None)
+    yield
+    image_processing.shutdown_image_executor()
+
+
+def _jpeg() -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (64, 48), "white").save(output, "JPEG")
+    return output.getvalue()
+
+
+def _break_pool():
+    # 워커 프로세스를 비정상 종료시켜 풀을 깨뜨림 (OOM/segfault 흉내)
+    executor = image_processing.init_image_executor()
+    with pytest.raises(Exception):
+        executor.submit(os._exit, 1).result(timeout=30)
+    return executor
+
+
+def test_broken_pool_is_replaced_and_retried(process_pool):
+    broken = _break_pool()
+
+    data, ext = asyncio.run(image_processing.preprocess_image_async(_jpeg()))
+
+    assert ext == "jpg" and data
+    assert image_processing._executor is not broken
+    assert image_processing.image_executor_stats()["restarts"] == 1
+
+
+def test_readiness_fails_while_pool_is_broken(process_pool):
+    broken = _break_pool()
+
+    assert not image_processing.image_executor_ready()
+    # 확인하면서 새 풀로 교체했으므로 다음 확인은 통과
+    assert image_processing._executor is not broken
+    assert image_processing.image_executor_ready()
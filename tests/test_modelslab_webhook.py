@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from app import modelslab
+from app.poll_scheduler import PollScheduler
+
+
+@pytest.fixture
+def webhooks(monkeypatch):
+    monkeypatch.setattr(modelslab, "MODELSLAB_WEBHOOK_URL", "https://api.example.com/modelslab/webhook")
+    monkeypatch.setattr(modelslab, "MODELSLAB_WEBHOOK_SECRET", "secret")
+    monkeypatch.setattr(modelslab, "WEBHOOKS_ENABLED", True)
+
+
+def test_track_id_signature(webhooks, monkeypatch):
+    fields, track_id = modelslab.webhook_fields()
+    assert fields["track_id"] == track_id
+    assert modelslab.verify_track_id(track_id)
+
+    nonce, _, signature = track_id.partition(".")
+    assert not modelslab.verify_track_id(nonce)
+    assert not modelslab.verify_track_id(f"{nonce}.{'0' * len(signature)}")
+    assert not modelslab.verify_track_id(12345)
+
+    monkeypatch.setattr(modelslab, "MODELSLAB_WEBHOOK_SECRET", "rotated")
+    assert not modelslab.verify_track_id(track_id)
+
+
+def test_webhook_requires_secret(webhooks, monkeypatch):
+    monkeypatch.setattr(modelslab, "MODELSLAB_WEBHOOK_SECRET", "")
+    with pytest.raises(RuntimeError):
+        modelslab.check_webhook_config()
+
+
+def test_webhook_resolves_only_by_track_id():
+    async def scenario():
+        scheduler = PollScheduler()
+        waiter = asyncio.create_task(
+            scheduler.wait(101, "https://modelslab.test/fetch/101", {}, {"eta": 60}, track_id="t-101")
+        )
+        await asyncio.sleep(0.01)
+        # 추측 가능한 ModelsLab 작업 id로는 완료시킬 수 없음
+        assert not scheduler.resolve_webhook({"track_id": "101", "status": "success", "output": ["x"]})
+        assert scheduler.resolve_webhook({"track_id": "t-101", "status": "success", "output": ["https://out"]})
+        assert await waiter == "https://out"
+        assert scheduler.stats()["tracked"] == 0
+        await scheduler.stop()
+
+    asyncio.run(scenario())
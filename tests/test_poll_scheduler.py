@@ -0,0 +1,25 @@
+import asyncio
+
+from app.poll_scheduler import PollScheduler
+
+
+def test_cancelled_waiters_drop_poll_entry():
+    async def scenario():
+        scheduler = PollScheduler()
+        waiters = [
+            asyncio.create_task(scheduler.wait(7, "https://modelslab.test/fetch/7", {}, {"eta": 60}, track_id="t-7"))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["tracked"] == 1
+
+        waiters[0].cancel()
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["tracked"] == 1
+        waiters[1].cancel()
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["tracked"] == 0
+        assert not scheduler._entries
+        await scheduler.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from app import resilience
+from app.admission import Overloaded
+from app.resilience import (
+    CircuitBreaker, CircuitOpen, UpstreamError, call_with_retry, error_type, get_circuit_breaker, is_retryable
+)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker("test_upstream", failure_threshold=2, reset_timeout=60)
+    monkeypatch.setitem(resilience.circuit_breakers, "test_upstream", breaker)
+    return breaker
+
+
+class Flaky:
+    """정해진 오류를 차례로 던지다가 성공하는 호출"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_classification():
+    assert is_retryable(UpstreamError("busy", status=503))
+    assert not is_retryable(UpstreamError("bad request", status=400))
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(ValueError("bug"))
+    assert not is_retryable(Overloaded("test", 503, 1, "대기열 가득 참"))
+    assert error_type(UpstreamError("limited", status=429)) == "rate_limited"
+    assert error_type(UpstreamError("down", status=502)) == "http_5xx"
+
+
+def test_input_error_is_not_retryable():
+    error = UpstreamError("ModelsLab 오류: Failed to generate image", status=200)
+    assert not is_retryable(error)
+    assert error_type(error) == "invalid_input"
+    # 5xx로 와도 같은 입력이면 다시 실패하므로 재시도하지 않음
+    assert not UpstreamError("Failed to generate image", status=500).retryable
+
+
+def test_retries_transient_errors_until_success(breaker):
+    func = Flaky(UpstreamError("busy", status=503))
+    assert asyncio.run(call_with_retry(func, upstream="test_upstream", max_attempts=3)) == "ok"
+    assert func.calls == 2
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_gives_up_after_max_attempts():
+    func = Flaky(*[UpstreamError("busy", status=503)] * 5)
+    with pytest.raises(UpstreamError):
+        asyncio.run(call_with_retry(func, max_attempts=3))
+    assert func.calls == 3
+
+
+def test_does_not_retry_permanent_errors(breaker):
+    func = Flaky(UpstreamError("Failed to generate image"))
+    with pytest.raises(UpstreamError):
+        asyncio.run(call_with_retry(func, upstream="test_upstream", max_attempts=3))
+    assert func.calls == 1
+    # 입력 오류는 업스트림 장애가 아니므로 서킷에 세지 않음
+    assert breaker.failures == 0
+
+
+def test_attempt_timeout_is_retried():
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(UpstreamError) as raised:
+        asyncio.run(call_with_retry(slow, max_attempts=2, deadline=0.05))
+    assert raised.value.kind == "timeout"
+
+
+def test_breaker_opens_and_short_circuits(breaker):
+    func = Flaky(*[UpstreamError("down", status=502)] * 10)
+    # 연속 2회 실패로 열린 뒤 세 번째 시도는 호출하지 않고 차단
+    with pytest.raises(CircuitOpen):
+        asyncio.run(call_with_retry(func, upstream="test_upstream", max_attempts=5))
+    assert func.calls == 2
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpen) as raised:
+        asyncio.run(call_with_retry(func, upstream="test_upstream"))
+    assert raised.value.status_code == 503
+    assert func.calls == 2
+    assert breaker.short_circuited >= 1
+
+
+def test_breaker_half_open_probe_closes_on_success(breaker):
+    breaker.reset_timeout = 0
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    assert asyncio.run(call_with_retry(Flaky(), upstream="test_upstream")) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_breaker_half_open_allows_single_probe():
+    breaker = CircuitBreaker("probe", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_get_circuit_breaker_is_shared():
+    assert get_circuit_breaker("test_shared") is get_circuit_breaker("test_shared")
+
+
+def test_cancelled_half_open_probe_releases_breaker(breaker):
+    breaker.reset_timeout = 0
+    breaker.record_failure()
+    breaker.record_failure()
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def scenario():
+        probe = asyncio.create_task(call_with_retry(hang, upstream="test_upstream"))
+        await asyncio.sleep(0.01)
+        assert breaker.state == "half_open" and breaker._probing
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # 취소된 시험 호출 뒤에도 다음 호출이 다시 시험할 수 있어야 함
+        return await call_with_retry(Flaky(), upstream="test_upstream")
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == "closed"
@@ -0,0 +1,71 @@
+import asyncio
+import io
+import random
+import uuid
+
+import httpx
+import pytest
+from PIL import Image
+
+from app import blob_store, image_processing, main, result_cache as result_cache_module
+from app.ai_services import VideoAIService
+from app.blob_store import MemoryBlobStore
+from app.result_cache import ResultCache, make_cache_key
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoryBlobStore()
+    monkeypatch.setitem(blob_store._stores, "memory", store)
+    monkeypatch.setattr(image_processing, "IMAGE_EXECUTOR", "thread")
+    monkeypatch.setattr(image_processing, "_executor", None)
+    monkeypatch.setattr(result_cache_module, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(result_cache_module, "result_cache", ResultCache(path=""))
+    monkeypatch.setattr("app.ai_services.result_cache", result_cache_module.result_cache)
+    yield store
+    image_processing.shutdown_image_executor()
+
+
+def _photo(size: tuple, exif_orientation: int = None) -> bytes:
+    # 무작위 픽셀로 UPLOAD_MIN_BYTES보다 큰 JPEG 생성
+    rng = random.Random(size[0])
+    image = Image.frombytes("RGB", size, bytes(rng.getrandbits(8) for _ in range(size[0] * size[1] * 3)))
+    output = io.BytesIO()
+    exif = Image.Exif()
+    if exif_orientation:
+        exif[0x0112] = exif_orientation
+    image.save(output, "JPEG", quality=95, exif=exif.tobytes() if exif_orientation else b"")
+    return output.getvalue()
+
+
+def _temp_keys(store: MemoryBlobStore) -> list:
+    return [key for key in store._objects if key.startswith("temp/images/")]
+
+
+@pytest.mark.parametrize("photo", [_photo((400, 300)), _photo((1600, 1200), exif_orientation=6)],
+                         ids=["model_ready", "needs_preprocess"])
+def test_cache_hit_skips_temp_upload_on_both_paths(store, photo):
+    async def scenario():
+        _, _, digest = await main._normalize_image(photo, "video")
+        await store.put("temp/videos/cached.mp4", b"video", "video/mp4")
+        cached_url = store.url("temp/videos/cached.mp4")
+        await result_cache_module.result_cache.set(make_cache_key(digest, "wave", VideoAIService.MODEL_ID), cached_url)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            response = await client.post(
+                "/animate-image", files={"image": ("photo.jpg", photo, "image/jpeg")}, data={"prompt": "wave"}
+            )
+            assert response.status_code == 200
+            assert response.json()["video_url"] == cached_url
+            # 캐시 적중이면 임시 이미지를 올리지 않음
+            assert _temp_keys(store) == []
+
+            # 직접 업로드 경로도 같은 정규화/해시를 거쳐 같은 캐시 항목에 적중
+            key = f"temp/images/{uuid.uuid4().hex}.jpg"
+            await store.put(key, photo, "image/jpeg")
+            response = await client.post("/animate-image/s3", json={"key": key, "prompt": "wave"})
+            assert response.status_code == 200
+            assert response.json()["video_url"] == cached_url
+        assert _temp_keys(store) == [key]
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import pytest
+
+from app import s3_util
+from bench.s3_event_loop import SlowS3Client, measure
+
+
+def test_put_does_not_block_event_loop(monkeypatch):
+    """boto3 호출이 블로킹되어도 업로드 중 이벤트 루프는 계속 돈다"""
+    monkeypatch.setattr(s3_util, "_client", SlowS3Client(0.5))
+
+    result = asyncio.run(measure(blocking=False, upload_seconds=0.5, interval=0.02))
+
+    assert result["upload_seconds"] >= 0.5
+    assert result["ticks"] >= 20
+    assert result["max_loop_stall_ms"] < 100
+
+
+class RecordingMultipartClient:
+    """파트 업로드가 느린 멀티파트 클라이언트 (호출 순서 기록)"""
+
+    def __init__(self, part_seconds: float):
+        self.part_seconds = part_seconds
+        self.events = []
+
+    def create_multipart_upload(self, **kwargs):
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, PartNumber, **kwargs):
+        self.events.append(("part_start", PartNumber))
+        time.sleep(self.part_seconds)
+        self.events.append(("part_end", PartNumber))
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def abort_multipart_upload(self, **kwargs):
+        self.events.append(("abort", None))
+
+
+def test_failed_stream_aborts_after_inflight_parts(monkeypatch):
+    """스트림이 중간에 실패하면 업로드 중인 파트가 끝난 뒤에 멀티파트 업로드를 abort"""
+    client = RecordingMultipartClient(0.2)
+    monkeypatch.setattr(s3_util, "_client", client)
+    monkeypatch.setattr(s3_util, "S3_MULTIPART_PART_SIZE", 1024)
+
+    async def chunks():
+        for _ in range(2):
+            yield b"x" * 1024
+        await asyncio.sleep(0.05)
+        raise ConnectionError("upstream closed")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(s3_util.S3BlobStore().put_stream("temp/videos/a.mp4", chunks(), "video/mp4"))
+
+    assert client.events[-1] == ("abort", None)
+    assert sorted(event for event in client.events if event[0] == "part_end") == [("part_end", 1), ("part_end", 2)]
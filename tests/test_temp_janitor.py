@@ -0,0 +1,131 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app import blob_store, temp_janitor as janitor_module
+from app.blob_store import BlobStore, MemoryBlobStore
+from app.temp_janitor import TempObjectJanitor
+
+
+class FailingStore(MemoryBlobStore):
+    """삭제가 항상 실패하는 저장소"""
+
+    name = "failing"
+
+    async def delete_many(self, keys: list) -> list:
+        return list(keys)
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    memory, failing = MemoryBlobStore(), FailingStore()
+    monkeypatch.setitem(blob_store._stores, "memory", memory)
+    monkeypatch.setitem(blob_store._stores, "failing", failing)
+    return memory, failing
+
+
+async def _put(store: BlobStore, key: str, data: bytes = b"image") -> str:
+    await store.put(key, data, "image/png")
+    return key
+
+
+def test_release_deletes_in_batch(stores):
+    memory, _ = stores
+
+    async def scenario():
+        janitor = TempObjectJanitor(path="")
+        keys = [await _put(memory, f"temp/images/{i}.png") for i in range(3)]
+        for key in keys:
+            await janitor.track(memory, key, size=5)
+        for key in keys:
+            janitor.release(memory, key)
+        # 한 번 release한 객체를 다시 넣어도 한 번만 삭제
+        janitor.release(memory, keys[0])
+        assert janitor.stats()["pending"] == 3
+
+        await janitor.flush()
+        assert [await memory.get(key) for key in keys] == [None, None, None]
+        stats = janitor.stats()
+        assert stats["pending"] == 0
+        assert stats["reclaimed_objects"]["released"] == 3
+        assert stats["reclaimed_bytes"] == 15
+        assert await asyncio.to_thread(janitor._db_count) == 0
+
+    asyncio.run(scenario())
+
+
+def test_release_url(stores):
+    memory, _ = stores
+
+    async def scenario():
+        janitor = TempObjectJanitor(path="")
+        key = await _put(memory, "temp/images/url.png")
+        await janitor.track_url(memory.url(key))
+        janitor.release_url(memory.url(key))
+        await janitor.flush()
+        assert await memory.get(key) is None
+        # 이 서버 저장소 URL이 아니면 무시
+        janitor.release_url("https://example.com/other.png")
+        assert janitor.stats()["pending"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_reclaims_orphans(stores, monkeypatch):
+    memory, _ = stores
+    monkeypatch.setattr(janitor_module, "TEMP_ORPHAN_TTL", 0)
+
+    async def scenario():
+        janitor = TempObjectJanitor(path="")
+        key = await _put(memory, "temp/images/orphan.png")
+        await janitor.track(memory, key)
+        await asyncio.sleep(0.01)
+
+        assert await janitor.reclaim_orphans() == 1
+        await janitor.flush()
+        assert await memory.get(key) is None
+        assert janitor.stats()["reclaimed_objects"]["orphan"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_deletes_give_up_but_keep_record(stores, monkeypatch):
+    _, failing = stores
+    monkeypatch.setattr(janitor_module, "TEMP_JANITOR_MAX_ATTEMPTS", 2)
+
+    async def scenario():
+        janitor = TempObjectJanitor(path="")
+        key = await _put(failing, "temp/images/stuck.png")
+        await janitor.track(failing, key)
+        janitor.release(failing, key)
+
+        await janitor.flush()
+        assert janitor.stats()["pending"] == 1
+        await janitor.flush()
+        # 재시도 횟수를 넘으면 대기열에서 빼고, 기록은 남겨 다음 고아 확인 때 다시 시도
+        assert janitor.stats()["pending"] == 0
+        assert janitor.stats()["delete_failures"] == 2
+        assert await asyncio.to_thread(janitor._db_count) == 1
+
+    asyncio.run(scenario())
+
+
+def test_forget_large_batch_stays_under_sqlite_variable_limit(stores, monkeypatch):
+    memory, _ = stores
+
+    async def scenario():
+        janitor = TempObjectJanitor(path="")
+        keys = [f"temp/images/{i}.png" for i in range(1000)]
+        for key in keys:
+            await janitor.track(memory, key, size=2)
+        # 오래된 SQLite(SQLITE_MAX_VARIABLE_NUMBER=999)처럼 변수 수를 제한
+        janitor._connect().setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        for key in keys:
+            janitor.release(memory, key)
+
+        await janitor.flush()
+        assert janitor.stats()["reclaimed_bytes"] == 2000
+        assert await asyncio.to_thread(janitor._db_count) == 0
+
+    asyncio.run(scenario())
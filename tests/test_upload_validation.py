@@ -0,0 +1,88 @@
+import io
+import struct
+import zlib
+
+import pytest
+from PIL import Image
+
+from app.upload_validation import (
+    UploadRejected, _UploadStreamChecker, check_image, sniff_image, UPLOAD_MAX_BYTES, UPLOAD_SNIFF_BYTES
+)
+
+ALLOWED = ("JPEG", "PNG")
+BOUNDARY = b"test-boundary"
+
+
+def _encode(fmt: str, size=(64, 48), mode="RGB", **params) -> bytes:
+    output = io.BytesIO()
+    Image.new(mode, size, "white").save(output, fmt, **params)
+    return output.getvalue()
+
+
+def _png_header(width: int, height: int) -> bytes:
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = b"IHDR" + ihdr
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+
+
+def _multipart_head(filename: str = "photo.jpg") -> bytes:
+    return (
+        b"--" + BOUNDARY + b"\r\n"
+        b'Content-Disposition: form-data; name="image"; filename="' + filename.encode() + b'"\r\n'
+        b"Content-Type: application/octet-stream\r\n\r\n"
+    )
+
+
+def test_sniff_jpeg_and_png():
+    jpeg = sniff_image(_encode("JPEG", exif=Image.Exif().tobytes()))
+    assert (jpeg["format"], jpeg["width"], jpeg["height"], jpeg["mode"]) == ("JPEG", 64, 48, "RGB")
+    png = sniff_image(_encode("PNG", size=(10, 20), mode="RGBA"))
+    assert (png["format"], png["width"], png["height"], png["mode"]) == ("PNG", 10, 20, "RGBA")
+
+
+def test_sniff_rejects_non_images():
+    assert sniff_image(b"GIF89a" + b"\0" * 100) is None
+    assert sniff_image(b"not an image") is None
+
+
+def test_check_image_rejects_unsupported_format():
+    with pytest.raises(UploadRejected) as raised:
+        check_image(_encode("GIF"), ALLOWED)
+    assert raised.value.status_code == 400
+
+
+def test_check_image_rejects_too_many_pixels():
+    with pytest.raises(UploadRejected) as raised:
+        check_image(_png_header(20000, 20000), ALLOWED)
+    assert raised.value.status_code == 400
+
+
+def test_check_image_partial_head():
+    # SOF 앞에서 잘린 JPEG: 앞부분 검사는 통과, 전체 파일이면 해상도를 확인할 수 없으므로 거절
+    head = b"\xff\xd8\xff\xe0" + struct.pack(">H", 16) + b"JFIF\0" + b"\0" * 9
+    assert check_image(head, ALLOWED, complete=False)["width"] is None
+    with pytest.raises(UploadRejected):
+        check_image(head, ALLOWED, complete=True)
+
+
+def test_stream_checker_rejects_bad_magic_after_sniff_window():
+    checker = _UploadStreamChecker(BOUNDARY, ALLOWED, sniff=True)
+    checker.feed(_multipart_head())
+    with pytest.raises(UploadRejected) as raised:
+        checker.feed(b"x" * UPLOAD_SNIFF_BYTES)
+    assert raised.value.status_code == 400
+
+
+def test_stream_checker_rejects_oversized_file_before_end():
+    checker = _UploadStreamChecker(BOUNDARY, ALLOWED, sniff=False)
+    checker.feed(_multipart_head())
+    chunk = b"\0" * (1024 * 1024)
+    with pytest.raises(UploadRejected) as raised:
+        for _ in range(UPLOAD_MAX_BYTES // len(chunk) + 1):
+            checker.feed(chunk)
+    assert raised.value.status_code == 413
+
+
+def test_stream_checker_accepts_valid_image():
+    checker = _UploadStreamChecker(BOUNDARY, ALLOWED, sniff=True)
+    checker.feed(_multipart_head() + _encode("PNG") + b"\r\n--" + BOUNDARY + b"--\r\n")